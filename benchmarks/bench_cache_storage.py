@@ -0,0 +1,44 @@
+"""Compare the excuses cache formats on the full sample: time to store a
+download, to read back (decompress) and to parse the cached file, and disk
+usage"""
+
+import io
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+from visual_excuses.ubuntu_excuses_loader import CACHE_FORMATS, CachedExcuses
+from visual_excuses.yaml_parser import load_excuses, open_excuses
+
+from .common import FULL_SAMPLE, best_of
+
+
+def main():
+    download = FULL_SAMPLE.read_bytes()
+    print(f"{'format':8} {'store':>10} {'read':>10} {'parse':>10} "
+          f"{'disk':>10}")
+    for cache_format in CACHE_FORMATS:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = CachedExcuses(
+                "http://localhost/update_excuses.yaml.xz", Path(cache_dir),
+                cache_format=cache_format)
+
+            def store():
+                cache.store(SimpleNamespace(
+                    raw=io.BytesIO(download), headers={"ETag": "bench"}))
+
+            def read():
+                with open_excuses(cache.yaml) as source:
+                    source.read()
+
+            stored = best_of(store, repeat=3)
+            read_back = best_of(read, repeat=3)
+            parsed = best_of(lambda: load_excuses(cache.yaml), repeat=3)
+            size = cache.yaml.stat().st_size
+            print(f"{cache_format:8} {stored * 1000:8.0f}ms "
+                  f"{read_back * 1000:8.0f}ms {parsed * 1000:8.0f}ms "
+                  f"{size / 1024:7.0f}KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Compare filtering and aggregating the excuses through their NumPy columns
+with the predicates and loops over Excuse objects.
+
+The sample can be replicated with renamed packages to emulate larger
+archives: python -m benchmarks.bench_columns [SCALE]
+"""
+
+import sys
+from collections import Counter
+
+from visual_excuses.excuse_collection import ExcuseCollection
+from visual_excuses.excuses_filter import select_excuses
+from visual_excuses.excuses_parser import ExcusesParser
+from visual_excuses.ubuntu_teams import UbuntuTeamMapping
+
+from .common import best_of, load_sample, scaled, synthetic_team_mapping
+
+QUERIES = (
+    ["--component", "universe", "--min-age", "7"],
+    ["--team", "team-3", "--ftbfs"],
+    ["--status", "autopkgtest-depends", "--regressed-arch", "amd64"],
+)
+
+
+def main():
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    excuses = scaled(load_sample(), scale)
+    teams = UbuntuTeamMapping.from_mapping(synthetic_team_mapping(excuses))
+    collection = ExcuseCollection(excuses)
+
+    build = best_of(lambda: ExcuseCollection(excuses).columns(teams))
+    columns = collection.columns(teams)
+    print(f"{len(excuses)} excuses")
+    print(f"columns build:      {build * 1000:8.2f} ms")
+
+    for argv in QUERIES:
+        args = ExcusesParser().parse_args(argv)
+        assert list(select_excuses(collection, args, teams)) == \
+            list(select_excuses(excuses, args, teams))
+        loop = best_of(lambda: list(select_excuses(excuses, args, teams)))
+        mask = best_of(lambda: list(select_excuses(collection, args, teams)))
+        print(f"{' '.join(argv)}")
+        print(f"  predicates:       {loop * 1000:8.2f} ms")
+        print(f"  masks:            {mask * 1000:8.2f} ms "
+              f"({loop / mask:.1f}x faster)")
+
+    def loop_counts():
+        return (
+            Counter(teams.default_team(e.item_name) for e in excuses),
+            Counter(e.component for e in excuses),
+            Counter(r for e in excuses for r in e.reasons),
+            Counter(a for e in excuses for a in e.missing_builds),
+        )
+
+    def column_counts():
+        return (
+            columns.team.counts(),
+            columns.component.counts(),
+            columns.reasons.counts(),
+            columns.missing_builds.counts(),
+        )
+
+    assert loop_counts() == column_counts()
+    loop = best_of(loop_counts)
+    vectorized = best_of(column_counts)
+    print("team, component, reason and missing build counts")
+    print(f"  loops:            {loop * 1000:8.2f} ms")
+    print(f"  columns:          {vectorized * 1000:8.2f} ms "
+          f"({loop / vectorized:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
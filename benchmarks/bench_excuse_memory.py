@@ -0,0 +1,93 @@
+"""Measure the memory retained by the excuses of the full sample, compared
+with the former unslotted Excuse holding the parser's lists as-is
+
+The first load also pays for growing the interpreter's table of interned
+strings, shared by the whole process, so the memory retained when the
+excuses are loaded again is given too."""
+
+import gc
+import lzma
+import tempfile
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import yaml
+
+from visual_excuses.yaml_parser import load_excuses
+
+from .common import FULL_SAMPLE
+
+
+@dataclass
+class LegacyExcuse:
+    item_name: str
+    component: str
+    old_version: str
+    new_version: str
+    missing_builds: List[str]
+    reasons: List[str] = field(default_factory=list)
+    age: Optional[int] = 0
+    excuse_bug: Optional[str] = ""
+    blocked_by: Optional[str] = ""
+    block_bug: Optional[str] = ""
+    migrate_after: List[str] = field(default_factory=list)
+    excuses: List[str] = field(default_factory=list)
+
+
+def load_legacy_excuses(path):
+    with open(path) as file:
+        data = yaml.load(file, Loader=yaml.CSafeLoader)
+    excuses = []
+    for entry in data["sources"]:
+        raw_age = entry.get('policy_info', {}).get('age', {}).get(
+            'current-age')
+        blocked_by = entry.get("dependencies", {}).get("blocked-by")
+        excuses.append(LegacyExcuse(
+            item_name=entry.get("item-name", ""),
+            component=entry.get("component", "main"),
+            old_version=str(entry.get("old-version", "")),
+            new_version=str(entry.get("new-version", "")),
+            missing_builds=(
+                entry.get("missing-builds", {}).get("on-architectures", [])),
+            reasons=entry.get("reason", []),
+            age=int(raw_age) if raw_age is not None else 0,
+            blocked_by=blocked_by[0] if blocked_by else "",
+            migrate_after=(
+                entry.get('dependencies', {}).get('migrate-after', [])),
+            excuses=entry.get("excuses", [])
+        ))
+    return excuses
+
+
+def retained_memory(load, path):
+    """Return the memory still allocated once load(path) has returned"""
+    gc.collect()
+    tracemalloc.start()
+    excuses = load(path)
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(excuses), retained, peak
+
+
+def main():
+    with tempfile.NamedTemporaryFile(suffix=".yaml") as target:
+        with lzma.open(FULL_SAMPLE) as source:
+            target.write(source.read())
+        target.flush()
+
+        for label, load in (
+            ("legacy dataclass", load_legacy_excuses),
+            ("slotted Excuse", load_excuses),
+        ):
+            count, retained, peak = retained_memory(load, target.name)
+            _, reloaded, _ = retained_memory(load, target.name)
+            print(f"{label:18} {count} excuses: "
+                  f"retained {retained / 1024:6.0f} KiB "
+                  f"({reloaded / 1024:.0f} KiB reloaded), "
+                  f"peak while loading {peak / 1024 / 1024:6.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Time graphing the full sample: building the graph, handing it over to
+pyvis and generating the HTML, compared with inserting the same nodes and
+edges one by one through the pyvis API.
+
+The sample can be replicated with renamed packages to emulate larger
+archives: python -m benchmarks.bench_graph [SCALE]
+"""
+
+import sys
+
+from pyvis.network import Network
+
+from visual_excuses.excuses_graph import build_excuses_graph
+from visual_excuses.pyvis_visual import pyvis_network
+from visual_excuses.ubuntu_teams import UbuntuTeamMapping
+
+from .common import best_of, load_sample, scaled, synthetic_team_mapping
+
+
+def incremental_network(graph):
+    """Insert the graph through the pyvis API, as the graph used to be
+    built"""
+    network = Network(directed=True)
+    for node_id, node in graph.nodes.items():
+        network.add_node(node_id, **{
+            name: value for name, value in node.items() if name != "id"})
+    for source, target in graph.edges:
+        network.add_edge(source, target)
+    return network
+
+
+def main():
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    excuses = scaled(load_sample(), scale)
+    teams = UbuntuTeamMapping.from_mapping(synthetic_team_mapping(excuses))
+
+    build = best_of(lambda: build_excuses_graph(excuses, teams))
+    graph = build_excuses_graph(excuses, teams)
+    handoff = best_of(lambda: pyvis_network(graph))
+    html = best_of(lambda: pyvis_network(graph).generate_html(), repeat=3)
+    incremental = best_of(lambda: incremental_network(graph), repeat=1)
+
+    print(f"{len(excuses)} excuses: {len(graph.nodes)} nodes, "
+          f"{len(graph.edges)} edges")
+    print(f"graph build:          {build * 1000:9.1f} ms")
+    print(f"pyvis hand-off:       {handoff * 1000:9.1f} ms")
+    print(f"html generation:      {html * 1000:9.1f} ms")
+    print(f"incremental pyvis:    {incremental * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
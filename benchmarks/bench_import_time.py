@@ -0,0 +1,53 @@
+"""Measure how long the command line entry points take to import, the
+startup cost paid by every run before any excuse is loaded"""
+
+import statistics
+import subprocess
+import sys
+from typing import Dict
+
+ENTRY_POINTS = (
+    "visual_excuses.ubuntu_excuses_cli",
+    "visual_excuses.visual_excuses_cmd",
+)
+
+
+def import_times(*args: str) -> Dict[str, int]:
+    """Run Python with -X importtime, returning the cumulative import time
+    of every module in microseconds"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, module = line.split("|")
+        if cumulative.strip().isdigit():
+            times[module.strip()] = int(cumulative)
+    return times
+
+
+def measure_import(module: str, repeat: int = 5) -> Dict[str, float]:
+    """Import module in repeat fresh interpreters, timing it in seconds like
+    benchmarks.run does its cases"""
+    timings = [
+        import_times("-c", f"import {module}")[module] / 1e6
+        for _ in range(repeat)
+    ]
+    return {
+        "best": min(timings),
+        "mean": statistics.mean(timings),
+        "loops": 1,
+        "repeat": repeat,
+    }
+
+
+def main():
+    for module in ENTRY_POINTS:
+        best = measure_import(module)["best"]
+        print(f"{module:36} {best * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Compare team lookups over the full sample excuses with the linear scan
+UbuntuTeamMapping used to do for every package, and loading the cached
+mapping from JSON with loading its prebuilt index"""
+
+import json
+import tempfile
+from pathlib import Path
+
+from visual_excuses.fetch import CachePolicy
+from visual_excuses.ubuntu_teams import UbuntuTeamMapping
+
+from .common import best_of, load_sample, synthetic_team_mapping
+
+
+def linear_default_team(mapping, package):
+    teams = [team for team, packages in mapping.items() if package in packages]
+    return teams[0] if teams else ""
+
+
+def main():
+    excuses = load_sample()
+    mapping = synthetic_team_mapping(excuses)
+    names = [excuse.item_name for excuse in excuses]
+
+    build = best_of(lambda: UbuntuTeamMapping.from_mapping(mapping))
+    teams = UbuntuTeamMapping.from_mapping(mapping)
+    assert [teams.default_team(n) for n in names] == \
+        [linear_default_team(mapping, n) for n in names]
+
+    linear = best_of(
+        lambda: [linear_default_team(mapping, n) for n in names])
+    indexed = best_of(lambda: [teams.default_team(n) for n in names])
+
+    print(f"{len(names)} excuses, {len(mapping)} teams, "
+          f"{sum(len(p) for p in mapping.values())} subscriptions")
+    print(f"index build:        {build * 1000:8.2f} ms")
+    print(f"linear lookups:     {linear * 1000:8.2f} ms")
+    print(f"indexed lookups:    {indexed * 1000:8.2f} ms "
+          f"({linear / indexed:.0f}x faster)")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache_dir = Path(cache_dir)
+        (cache_dir / "teams.json").write_text(json.dumps(mapping))
+        (cache_dir / "teams.json.etag").write_text("bench")
+        offline = CachePolicy(offline=True)
+
+        def load_json():
+            (cache_dir / "teams.pickle").unlink(missing_ok=True)
+            UbuntuTeamMapping(cache_dir, policy=offline)
+
+        from_json = best_of(load_json)
+        UbuntuTeamMapping(cache_dir, policy=offline)
+        from_index = best_of(
+            lambda: UbuntuTeamMapping(cache_dir, policy=offline))
+
+    print(f"load from JSON:     {from_json * 1000:8.2f} ms")
+    print(f"load from index:    {from_index * 1000:8.2f} ms "
+          f"({from_json / from_index:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
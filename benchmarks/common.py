@@ -0,0 +1,79 @@
+"""Shared helpers for the benchmarks, run from the top of the tree with
+``python -m benchmarks.<name>``"""
+
+import lzma
+import random
+import tempfile
+import time
+from dataclasses import replace
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from visual_excuses.excuse import Excuse
+from visual_excuses.yaml_parser import load_excuses
+
+SAMPLES_DIR = Path(__file__).resolve().parent.parent / "samples"
+FULL_SAMPLE = SAMPLES_DIR / "update_excuses.yaml.xz"
+LIGHT_SAMPLE = SAMPLES_DIR / "update_excuses_light.yaml.xz"
+
+
+def load_sample(sample: Path = FULL_SAMPLE) -> List[Excuse]:
+    """Decompress and parse one of the bundled excuses samples"""
+    with tempfile.NamedTemporaryFile(suffix=".yaml") as target:
+        with lzma.open(sample) as source:
+            target.write(source.read())
+        target.flush()
+        return load_excuses(target.name)
+
+
+def synthetic_team_mapping(
+    excuses: List[Excuse], teams: int = 40, packages_per_team: int = 500,
+    seed: int = 0
+) -> Dict[str, List[str]]:
+    """Build a team mapping shaped like the real one around the excuses.
+
+    Every team subscribes to a batch of unrelated packages, and most of
+    the excuses are subscribed to by one or two teams.
+    """
+    rng = random.Random(seed)
+    names = [f"team-{i}" for i in range(teams)]
+    mapping = {
+        name: [f"{name}-pkg-{i}" for i in range(packages_per_team)]
+        for name in names
+    }
+    for excuse in excuses:
+        if rng.random() < 0.9:
+            for name in rng.sample(names, rng.choice((1, 1, 1, 2))):
+                mapping[name].insert(
+                    rng.randrange(len(mapping[name]) + 1), excuse.item_name)
+    return mapping
+
+
+def best_of(func: Callable[[], object], repeat: int = 5) -> float:
+    """Return the best wall time of several runs of func, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def scaled(excuses, scale):
+    """Replicate the excuses scale times, renaming every package"""
+    if scale == 1:
+        return excuses
+
+    def rename(name, i):
+        return f"{name}-{i}" if name else name
+
+    return [
+        replace(
+            excuse,
+            item_name=rename(excuse.item_name, i),
+            source=rename(excuse.source, i),
+            blocked_by=rename(excuse.blocked_by, i),
+            migrate_after=tuple(rename(p, i) for p in excuse.migrate_after),
+        )
+        for i in range(scale) for excuse in excuses
+    ]
@@ -0,0 +1,223 @@
+"""Run the benchmark suite over the bundled samples and store the timings as
+JSON, optionally comparing them with a previous run:
+
+    python -m benchmarks.run --output after.json --compare before.json
+
+Every case is timed several times on each sample, and the best and mean
+wall times per call are recorded, along with the time the command line
+entry points take to import. With --compare, the command fails when a case
+got slower than --threshold times its previous best time.
+"""
+
+import argparse
+import io
+import json
+import lzma
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from visual_excuses.excuse_collection import ExcuseCollection
+from visual_excuses.excuses_filter import select_excuses
+from visual_excuses.excuses_graph import build_excuses_graph
+from visual_excuses.excuses_json import write_json
+from visual_excuses.excuses_parser import ExcusesParser
+from visual_excuses.graph_export import GRAPH_WRITERS
+from visual_excuses.table_visual import write_excuses
+from visual_excuses.ubuntu_teams import UbuntuTeamMapping
+from visual_excuses.yaml_parser import load_excuses
+
+from .bench_import_time import ENTRY_POINTS, measure_import
+from .common import FULL_SAMPLE, LIGHT_SAMPLE, synthetic_team_mapping
+
+SAMPLES = {"full": FULL_SAMPLE, "light": LIGHT_SAMPLE}
+
+# Common ExcusesParser flag combinations
+FILTERS = {
+    "none": [],
+    "component": ["--component", "universe"],
+    "team": ["--team", "team-1"],
+    "ftbfs-age": ["--ftbfs", "--min-age", "7"],
+    "name-limit": ["--name", "^lib", "--limit", "50"],
+    "status-reverse": ["--status", "depends", "--reverse"],
+}
+
+# Shortest time of a run of a case, in seconds
+MIN_TIME = 0.05
+
+Case = Tuple[str, Callable[[], object]]
+
+
+def cases(sample: Path, workdir: Path) -> Iterator[Case]:
+    """Yield the named benchmark cases of a sample"""
+    def decompress():
+        with lzma.open(sample) as source:
+            return source.read()
+
+    yield "decompress", decompress
+
+    yaml = workdir / "update_excuses.yaml"
+    yaml.write_bytes(decompress())
+    yield "load_excuses", lambda: load_excuses(yaml)
+
+    excuses = load_excuses(yaml)
+    mapping = synthetic_team_mapping(excuses)
+    teams = UbuntuTeamMapping.from_mapping(mapping)
+    names = [excuse.item_name for excuse in excuses]
+    yield "teams/index", lambda: UbuntuTeamMapping.from_mapping(mapping)
+    yield "teams/lookups", lambda: [teams.default_team(n) for n in names]
+
+    parser = ExcusesParser()
+    for name, argv in FILTERS.items():
+        args = parser.parse_args(argv)
+        yield f"filter/{name}", \
+            lambda args=args: list(select_excuses(excuses, args, teams))
+
+    yield "collection/index", lambda: ExcuseCollection(excuses)
+
+    def render(fmt):
+        return lambda: write_excuses(excuses, io.StringIO(), None, fmt)
+
+    yield "render/table", render("table")
+    yield "render/markdown", render("markdown")
+    yield "render/tsv", render("tsv")
+    yield "render/json", lambda: write_json(excuses, io.StringIO())
+
+    yield "graph/build", lambda: build_excuses_graph(excuses, teams)
+    graph = build_excuses_graph(excuses, teams)
+    for fmt, writer in GRAPH_WRITERS.items():
+        yield f"graph/{fmt}", \
+            lambda writer=writer: writer(graph, io.StringIO())
+
+    try:
+        from visual_excuses.pyvis_visual import pyvis_network
+    except ImportError:
+        return
+    yield "graph/pyvis", lambda: pyvis_network(graph)
+    network = pyvis_network(graph)
+    yield "graph/html", lambda: network.generate_html(notebook=False)
+
+
+def measure(func: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Time func, in seconds per call.
+
+    Quick cases are run in loops of at least MIN_TIME so that their timings
+    aren't dominated by the clock resolution and noise.
+    """
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_TIME:
+            break
+        loops *= 10
+
+    timings = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        timings.append((time.perf_counter() - start) / loops)
+    return {
+        "best": min(timings),
+        "mean": statistics.mean(timings),
+        "loops": loops,
+        "repeat": repeat,
+    }
+
+
+def run(
+    samples: List[str], repeat: int, only: str = ""
+) -> Dict[str, Dict[str, float]]:
+    """Run the benchmark cases matching only on the given samples, and
+    time the import of the entry points"""
+    results = {}
+    for sample in samples:
+        with tempfile.TemporaryDirectory() as workdir:
+            for name, func in cases(SAMPLES[sample], Path(workdir)):
+                key = f"{sample}/{name}"
+                if only not in key:
+                    continue
+                results[key] = measure(func, repeat)
+                print(f"{key:32} {results[key]['best'] * 1000:10.2f} ms",
+                      file=sys.stderr)
+    for module in ENTRY_POINTS:
+        key = f"import/{module}"
+        if only not in key:
+            continue
+        results[key] = measure_import(module, repeat)
+        print(f"{key:32} {results[key]['best'] * 1000:10.2f} ms",
+              file=sys.stderr)
+    return results
+
+
+def compare(
+    previous: Dict[str, Dict[str, float]],
+    current: Dict[str, Dict[str, float]],
+    threshold: float
+) -> List[str]:
+    """Return the cases slower than threshold times their previous time"""
+    regressions = []
+    for key, result in current.items():
+        if key not in previous:
+            continue
+        ratio = result["best"] / previous[key]["best"]
+        if ratio > threshold:
+            regressions.append(
+                f"{key}: {previous[key]['best'] * 1000:.2f} ms -> "
+                f"{result['best'] * 1000:.2f} ms ({ratio:.2f}x)")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sample", choices=SAMPLES, action="append",
+        help="Sample to run the cases on, may be repeated (default: all)")
+    parser.add_argument(
+        "--only", default="", metavar="TEXT",
+        help="Only run the cases whose name contains TEXT")
+    parser.add_argument(
+        "--repeat", type=int, default=5,
+        help="How many times to run each case (default: %(default)s)")
+    parser.add_argument(
+        "--output", type=Path, metavar="FILE",
+        help="Where to store the results as JSON (default: stdout)")
+    parser.add_argument(
+        "--compare", type=Path, metavar="FILE",
+        help="Results of a previous run to compare with")
+    parser.add_argument(
+        "--threshold", type=float, default=1.25,
+        help="Slowdown ratio considered a regression (default: "
+        "%(default)s)")
+    args = parser.parse_args(argv)
+
+    results = run(args.sample or list(SAMPLES), args.repeat, args.only)
+    report = json.dumps({
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "timestamp": time.time(),
+        "results": results,
+    }, indent=2)
+    if args.output:
+        args.output.write_text(report + "\n")
+    else:
+        print(report)
+
+    if args.compare:
+        previous = json.loads(args.compare.read_text())["results"]
+        regressions = compare(previous, results, args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
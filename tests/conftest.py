@@ -0,0 +1,103 @@
+import lzma
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from visual_excuses.yaml_parser import load_excuses
+
+SAMPLE = "samples/update_excuses.yaml.xz"
+
+
+@pytest.fixture(scope="session")
+def sample_excuses(tmp_path_factory):
+    """The excuses of the full bundled sample, parsed once per session"""
+    path = tmp_path_factory.mktemp("sample") / "update_excuses.yaml"
+    with lzma.open(SAMPLE) as source:
+        path.write_bytes(source.read())
+    return load_excuses(path)
+
+
+class FakeServer:
+    """Local stand-in for the archive and reports HTTP servers.
+
+    Routes map a path to a response, each one a dict with optional
+    "status", "headers", "body", "delay" and "length" keys, or to a list of
+    responses given in turn, the last one repeated. A "length" announces a
+    longer Content-Length than the body, which is then cut short. Every
+    request is recorded as a (method, path, headers) tuple, the client
+    address it came from in peers, and when it arrived and was answered in
+    timings, as a (path, arrived, answered) tuple. Connections are kept alive
+    between requests.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self.peers = []
+        self.timings = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_HEAD(self):
+                self.reply(send_body=False)
+
+            def do_GET(self):
+                self.reply(send_body=True)
+
+            def reply(self, send_body):
+                arrived = time.monotonic()
+                server.requests.append(
+                    (self.command, self.path, dict(self.headers)))
+                server.peers.append(self.client_address)
+                route = server.routes.get(self.path, {"status": 404})
+                if isinstance(route, list):
+                    route = route.pop(0) if len(route) > 1 else route[0]
+                time.sleep(route.get("delay", 0))
+                body = route.get("body", b"")
+                self.send_response(route.get("status", 200))
+                for name, value in route.get("headers", {}).items():
+                    self.send_header(name, value)
+                self.send_header(
+                    "Content-Length", str(route.get("length", len(body))))
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(body)
+                if "length" in route:
+                    # The body is cut short, hang up rather than leave the
+                    # client waiting for the rest
+                    self.close_connection = True
+                server.timings.append((self.path, arrived, time.monotonic()))
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever, args=(0.01,), daemon=True)
+
+    def url(self, path: str) -> str:
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}{path}"
+
+
+@pytest.fixture
+def fake_server():
+    server = FakeServer()
+    server.thread.start()
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
+
+
+@pytest.fixture
+def unreachable_url():
+    """URL of a local port nothing listens on"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        host, port = sock.getsockname()
+    return f"http://{host}:{port}/unreachable"
@@ -0,0 +1,43 @@
+import pytest
+
+from visual_excuses.config import cache_policies
+from visual_excuses.fetch import EXCUSES_MAX_AGE, TEAMS_MAX_AGE, CachePolicy
+
+
+def test_cache_policies_defaults(tmp_path):
+    excuses, teams = cache_policies(tmp_path / "missing.ini")
+
+    assert excuses == CachePolicy(None, EXCUSES_MAX_AGE, False)
+    assert teams == CachePolicy(None, TEAMS_MAX_AGE, False)
+
+
+def test_cache_policies_config_file(tmp_path):
+    config = tmp_path / "config.ini"
+    config.write_text(
+        "[cache]\nexcuses-max-age = 60\nteams-max-age = 3600\noffline = yes\n")
+
+    excuses, teams = cache_policies(config)
+    assert excuses == CachePolicy(60, EXCUSES_MAX_AGE, True)
+    assert teams == CachePolicy(3600, TEAMS_MAX_AGE, True)
+
+
+def test_cache_policies_command_line_wins(tmp_path):
+    config = tmp_path / "config.ini"
+    config.write_text("[cache]\nexcuses-max-age = 60\n")
+
+    excuses, teams = cache_policies(config, max_staleness=0, offline=True)
+    assert excuses == CachePolicy(0, EXCUSES_MAX_AGE, True)
+    assert teams == CachePolicy(0, TEAMS_MAX_AGE, True)
+
+
+@pytest.mark.parametrize("text", [
+    "[cache]\nexcuses-max-age = soon\n",
+    "[cache]\noffline = maybe\n",
+    "excuses-max-age = 60\n",
+])
+def test_cache_policies_invalid(tmp_path, text):
+    config = tmp_path / "config.ini"
+    config.write_text(text)
+
+    with pytest.raises(ValueError, match="Invalid configuration in"):
+        cache_policies(config)
@@ -0,0 +1,103 @@
+from visual_excuses.dependency_graph import DependencyGraph
+from visual_excuses.excuse import Excuse
+from visual_excuses.excuses_filter import filter_excuses, query_dependencies
+from visual_excuses.excuses_parser import ExcusesParser
+
+
+def excuse(name, blocked_by="", migrate_after=()):
+    return Excuse(
+        item_name=name,
+        component="main",
+        old_version="1.0",
+        new_version="1.1",
+        missing_builds=[],
+        reasons=("depends",),
+        blocked_by=blocked_by,
+        migrate_after=tuple(migrate_after),
+    )
+
+
+def query(*argv):
+    return ExcusesParser().parse_args(list(argv))
+
+
+# glibc <- gcc <- { binutils, llvm <- rustc }, and perl <-> python3 cycle
+EXCUSES = [
+    excuse("glibc"),
+    excuse("gcc", blocked_by="glibc"),
+    excuse("binutils", migrate_after=["gcc"]),
+    excuse("llvm", blocked_by="gcc"),
+    excuse("rustc", blocked_by="llvm", migrate_after=["gcc"]),
+    excuse("zlib", blocked_by="not-an-excuse"),
+    excuse("perl", migrate_after=["python3"]),
+    excuse("python3", blocked_by="perl"),
+    excuse("vim", migrate_after=["python3"]),
+]
+
+
+def names(excuses):
+    return [e.item_name for e in excuses]
+
+
+def test_dependency_graph_edges():
+    graph = DependencyGraph(EXCUSES)
+    assert graph.depends["rustc"] == ("llvm", "gcc")
+    assert graph.dependents["gcc"] == ["binutils", "llvm", "rustc"]
+    assert graph.dependents["not-an-excuse"] == ["zlib"]
+
+
+def test_dependency_graph_blocking_is_transitive():
+    graph = DependencyGraph(EXCUSES)
+    assert names(graph.blocking("glibc")) == [
+        "gcc", "binutils", "llvm", "rustc"
+    ]
+    assert names(graph.blocking("llvm")) == ["rustc"]
+    assert names(graph.blocking("not-an-excuse")) == ["zlib"]
+    assert graph.blocking("vim") == []
+    assert graph.blocking("unknown") == []
+
+
+def test_dependency_graph_blocking_in_cycle():
+    graph = DependencyGraph(EXCUSES)
+    assert names(graph.blocking("perl")) == ["python3", "vim"]
+
+
+def test_dependency_graph_cycles():
+    graph = DependencyGraph(EXCUSES)
+    assert [sorted(c) for c in graph.cycles()] == [["perl", "python3"]]
+
+    graph = DependencyGraph([excuse("loop", blocked_by="loop")])
+    assert graph.cycles() == [["loop"]]
+
+
+def test_dependency_graph_root_causes():
+    roots = DependencyGraph(EXCUSES).root_causes()
+    assert [(e.item_name, length) for e, length in roots] == [
+        ("glibc", 3), ("python3", 1), ("perl", 1)
+    ]
+
+
+def test_dependency_graph_handles_long_chains():
+    chain = [excuse("pkg0")] + [
+        excuse(f"pkg{i}", blocked_by=f"pkg{i - 1}") for i in range(1, 20000)
+    ]
+    graph = DependencyGraph(reversed(chain))
+    assert graph.root_causes() == [(chain[0], 19999)]
+    assert len(graph.blocking("pkg0")) == 19999
+    assert graph.cycles() == []
+
+
+def test_query_dependencies():
+    assert query_dependencies(EXCUSES, query()) is EXCUSES
+    assert names(query_dependencies(EXCUSES, query("--root-causes"))) == [
+        "glibc", "python3", "perl"
+    ]
+    assert names(query_dependencies(
+        EXCUSES, query("--blocking", "perl", "--root-causes"))) == ["python3"]
+
+
+def test_filter_excuses_cycles(capsys):
+    assert filter_excuses(EXCUSES, query("--cycles"), None) == []
+    assert sorted(capsys.readouterr().out.strip().split(", ")) == [
+        "perl", "python3"
+    ]
@@ -1,4 +1,9 @@
-from visual_excuses.excuse import Excuse
+import json
+from dataclasses import asdict, fields
+
+import pytest
+
+from visual_excuses.excuse import Excuse, Regression
 
 
 def test_excuse_is_ftbfs_with_missing_builds():
@@ -21,3 +26,71 @@ def test_excuse_is_not_ftbfs_with_no_missing_builds():
         missing_builds=[]
     )
     assert not excuse.ftbfs()
+
+
+def test_excuse_is_slotted():
+    excuse = Excuse(
+        item_name="example",
+        component="universe",
+        old_version="1.1",
+        new_version="1.2",
+        missing_builds=[]
+    )
+    assert not hasattr(excuse, "__dict__")
+
+
+def test_excuse_to_dict_matches_json_fields():
+    excuse = Excuse(
+        item_name="example",
+        component="universe",
+        old_version="1.1",
+        new_version="1.2",
+        missing_builds=["arm64"],
+        reasons=("autopkgtest", "depends"),
+        migrate_after=("other",),
+        excuses=("Migration status for example",)
+    )
+    data = excuse.to_dict()
+
+    assert list(data) == [f.name for f in fields(Excuse)]
+    assert data["reasons"] == ["autopkgtest", "depends"]
+    assert data["migrate_after"] == ["other"]
+    assert json.dumps(data, indent=2) == json.dumps(asdict(excuse), indent=2)
+
+
+@pytest.mark.parametrize("fields, status", [
+    ({}, "candidate"),
+    ({"reasons": ("block",)}, "default"),
+    ({"reasons": ("no-binaries",)}, "missing-builds"),
+    ({"reasons": ("autopkgtest",),
+      "regressions": (Regression("systemd", "amd64"),)},
+     "autopkgtest-depends"),
+    ({"reasons": ("autopkgtest",), "waiting": True}, "waiting"),
+    ({"reasons": ("depends",), "blocked_by": "glibc"}, "depends"),
+    ({"reasons": ("autopkgtest", "depends"),
+      "regressions": (Regression("systemd", "amd64"),),
+      "migrate_after": ("glibc",)},
+     "depends"),
+])
+def test_excuse_status(fields, status):
+    excuse = Excuse(
+        item_name="example",
+        component="universe",
+        old_version="1.1",
+        new_version="1.2",
+        missing_builds=[],
+        **fields
+    )
+    assert excuse.status == status
+    assert excuse.classify() == status
+
+
+@pytest.mark.parametrize("regression, url", [
+    (Regression("systemd", "amd64"), ""),
+    (Regression("systemd", "amd64", "plucky"),
+     "https://autopkgtest.ubuntu.com/packages/s/systemd/plucky/amd64"),
+    (Regression("libvirt", "s390x", "plucky"),
+     "https://autopkgtest.ubuntu.com/packages/libv/libvirt/plucky/s390x"),
+])
+def test_regression_url(regression, url):
+    assert regression.url == url
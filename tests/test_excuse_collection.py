@@ -0,0 +1,138 @@
+import re
+from unittest.mock import patch
+
+import pytest
+
+from visual_excuses.excuse import Excuse
+from visual_excuses.excuse_collection import ExcuseCollection, literal_prefix
+from visual_excuses.excuses_filter import filter_excuses
+from visual_excuses.excuses_parser import ExcusesParser
+
+
+def excuse(name, version="1.1", **fields):
+    return Excuse(
+        item_name=name,
+        component="main",
+        old_version="1.0",
+        new_version=version,
+        missing_builds=[],
+        **fields
+    )
+
+
+EXCUSES = [
+    excuse("linux-meta", blocked_by="linux"),
+    excuse("linux", migrate_after=("gcc-14",)),
+    excuse("gcc-14"),
+    excuse("linux-firmware"),
+    excuse("-libfoo", "-", source="libfoo"),
+    excuse("lib2geom"),
+]
+
+
+@pytest.fixture
+def collection():
+    return ExcuseCollection(EXCUSES)
+
+
+def names(excuses):
+    return [e.item_name for e in excuses]
+
+
+def test_collection_is_a_sequence(collection):
+    assert len(collection) == len(EXCUSES)
+    assert collection[1] is EXCUSES[1]
+    assert list(collection) == EXCUSES
+    assert list(reversed(collection)) == EXCUSES[::-1]
+    assert collection == EXCUSES
+
+
+def test_collection_lookups(collection):
+    assert collection.get("linux") is EXCUSES[1]
+    assert collection.get("vim") is None
+    assert collection.find("libfoo", "-") is EXCUSES[4]
+    assert collection.find("gcc-14", "1.1") is EXCUSES[2]
+    assert collection.find("gcc-14", "1.0") is None
+
+
+def test_collection_source_defaults_to_item_name():
+    assert excuse("bash").source == "bash"
+
+
+def test_collection_with_prefix(collection):
+    assert names(collection.with_prefix("linux")) == [
+        "linux", "linux-firmware", "linux-meta"
+    ]
+    assert names(collection.with_prefix("lib")) == ["lib2geom"]
+    assert collection.with_prefix("zsh") == []
+    assert len(collection.with_prefix("")) == len(EXCUSES)
+
+
+@pytest.mark.parametrize("pattern", [
+    "^linux-", "LINUX", "^lib", "^linux(-meta)?$", "^gcc-1[0-9]", "^gcc-14?",
+    "^l|^g", "^-lib", "^linux\\-firm",
+])
+def test_collection_matching_agrees_with_a_scan(collection, pattern):
+    search = re.compile(pattern, re.IGNORECASE).search
+    expected = [e.item_name for e in EXCUSES if search(e.item_name)]
+    assert names(collection.matching(pattern)) == expected
+
+
+@pytest.mark.parametrize("pattern, prefix", [
+    ("^libreoffice-.*", "libreoffice-"),
+    ("^python3?", "python"),
+    ("^Gcc-1[0-9]", "gcc-1"),
+    ("^lib\\+\\+", "lib++"),
+    ("linux", ""),
+    ("^a|^b", ""),
+])
+def test_literal_prefix(pattern, prefix):
+    assert literal_prefix(pattern) == prefix
+
+
+def test_collection_neighbourhood(collection):
+    assert collection.neighbourhood("linux") == {
+        "depends": ["gcc-14"], "dependents": ["linux-meta"]
+    }
+    assert collection.neighbourhood("vim") == {
+        "depends": [], "dependents": []
+    }
+    assert collection.graph is collection.graph
+
+
+def test_filter_excuses_inspect_several(collection, capsys):
+    args = ExcusesParser().parse_args(["--inspect", "linux", "vim"])
+    assert filter_excuses(collection, args, None) == []
+
+    output = capsys.readouterr().out
+    assert "Excuse vim can't be found in excuses list" in output
+    assert "Dependency neighbourhood:" in output
+    assert "linux-meta" in output and "gcc-14" in output
+    assert "linux-firmware" not in output
+
+
+def test_filter_excuses_inspect_source_version(collection, capsys):
+    args = ExcusesParser().parse_args(["--inspect", "libfoo/-", "gcc-14/1.0"])
+    assert filter_excuses(collection, args, None) == []
+
+    output = capsys.readouterr().out
+    assert '"item_name": "-libfoo"' in output
+    assert "Excuse gcc-14/1.0 can't be found in excuses list" in output
+
+
+@pytest.mark.parametrize("name", ["^linux-", "^LIN", "firm", "^lib2"])
+def test_filter_excuses_name_uses_index(collection, name):
+    args = ExcusesParser().parse_args(["--name", name])
+    search = re.compile(name, re.IGNORECASE).search
+    with patch.object(
+        collection, "matching", wraps=collection.matching
+    ) as matching:
+        selected = filter_excuses(collection, args, None)
+    matching.assert_called_once_with(name)
+    assert selected == [e for e in EXCUSES if search(e.item_name)]
+
+
+def test_filter_excuses_name_invalid(collection, capsys):
+    args = ExcusesParser().parse_args(["--name", "^lin("])
+    assert filter_excuses(collection, args, None) == []
+    assert "Invalid regex pattern" in capsys.readouterr().out
@@ -0,0 +1,134 @@
+from collections import Counter
+
+import pytest
+
+from visual_excuses import excuses_columns
+from visual_excuses.excuse_collection import ExcuseCollection
+from visual_excuses.excuses_filter import select_excuses
+from visual_excuses.excuses_parser import ExcusesParser
+from visual_excuses.ubuntu_teams import UbuntuTeamMapping
+
+numpy = pytest.importorskip("numpy")
+
+
+@pytest.fixture(scope="module")
+def collection(sample_excuses):
+    return ExcuseCollection(sample_excuses)
+
+
+@pytest.fixture(scope="module")
+def teams(sample_excuses):
+    names = [excuse.item_name for excuse in sample_excuses]
+    return UbuntuTeamMapping.from_mapping({
+        "team-a": names[::3],
+        "team-b": names[::2],
+        "team-c": ["unrelated"],
+    })
+
+
+@pytest.fixture(scope="module")
+def columns(collection, teams):
+    return collection.columns(teams)
+
+
+@pytest.mark.parametrize("argv", [
+    [],
+    ["--ftbfs"],
+    ["--with-bugs"],
+    ["--waiting"],
+    ["--status", "depends"],
+    ["--status", "candidate", "--component", "main"],
+    ["--component", "multiverse"],
+    ["--min-age", "3"],
+    ["--min-age", "2", "--max-age", "30"],
+    ["--team", "team-a"],
+    ["--team", "team-c"],
+    ["--team", "team-b", "--ftbfs"],
+    ["--name", "^LIB"],
+    ["--regressed-arch", "amd64"],
+    ["--regressed-test", "no-such-test"],
+    ["--component", "universe", "--max-age", "10", "--name", "py"],
+    ["--limit", "25"],
+    ["--reverse"],
+    ["--min-age", "5", "--reverse"],
+    ["--ftbfs", "--limit", "10", "--reverse"],
+])
+def test_columns_select_like_the_predicates(
+    sample_excuses, collection, teams, columns, argv
+):
+    args = ExcusesParser().parse_args(argv)
+    assert list(select_excuses(collection, args, teams)) == \
+        list(select_excuses(sample_excuses, args, teams))
+
+
+@pytest.mark.parametrize("argv, error", [
+    (["--team", "team-z"], "Team team-z is not a valid Ubuntu Team"),
+    (["--name", "("], "Invalid regex pattern"),
+])
+def test_columns_reject_invalid_filters(
+    collection, teams, columns, argv, error
+):
+    args = ExcusesParser().parse_args(argv)
+    with pytest.raises(ValueError, match=error):
+        list(select_excuses(collection, args, teams))
+
+
+def test_columns_are_built_once_per_team_mapping(sample_excuses, teams):
+    collection = ExcuseCollection(sample_excuses)
+    assert collection.columns(teams, build=False) is None
+    assert collection.columns(teams) is collection.columns(teams)
+    assert collection.columns(None, build=False) is None
+    assert collection.columns(None).teams is None
+
+
+def test_columns_counts(sample_excuses, teams, columns):
+    assert columns.component.counts() == \
+        Counter(e.component for e in sample_excuses)
+    assert columns.status.counts() == \
+        Counter(e.status for e in sample_excuses)
+    assert columns.team.counts() == \
+        Counter(teams.default_team(e.item_name) for e in sample_excuses)
+    assert columns.reasons.counts() == \
+        Counter(r for e in sample_excuses for r in e.reasons)
+
+
+def test_columns_counts_with_mask(sample_excuses, columns):
+    mask = columns.component.equals("universe")
+    universe = [e for e in sample_excuses if e.component == "universe"]
+    assert columns.reasons.counts(mask) == \
+        Counter(r for e in universe for r in e.reasons)
+    assert columns.missing_builds.counts(mask) == \
+        Counter(a for e in universe for a in e.missing_builds)
+
+
+def test_columns_age_histogram(sample_excuses, columns):
+    bins = (1, 7, 30, 365)
+    expected = [0] * len(bins)
+    for excuse in sample_excuses:
+        for i in reversed(range(len(bins))):
+            if excuse.age >= bins[i]:
+                expected[i] += 1
+                break
+    assert columns.age_histogram(bins) == expected
+
+
+def test_columns_ftbfs_rates(sample_excuses, columns):
+    missing = Counter(a for e in sample_excuses for a in e.missing_builds)
+    rates = columns.ftbfs_rates()
+    assert rates.keys() == missing.keys()
+    for arch, count in missing.items():
+        assert rates[arch] == pytest.approx(count / len(sample_excuses))
+    assert columns.ftbfs_rates(numpy.zeros(columns.size, dtype=bool)) == {}
+
+
+def test_select_excuses_without_numpy(
+    sample_excuses, teams, monkeypatch
+):
+    monkeypatch.setattr(excuses_columns, "numpy", None)
+    monkeypatch.setattr(excuses_columns, "_numpy_missing", True)
+    collection = ExcuseCollection(sample_excuses)
+    assert collection.columns(teams) is None
+
+    args = ExcusesParser().parse_args(["--ftbfs", "--team", "team-b"])
+    assert list(select_excuses(collection, args, teams)) == \
+        list(select_excuses(sample_excuses, args, teams))
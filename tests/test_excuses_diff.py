@@ -0,0 +1,122 @@
+import json
+
+from visual_excuses.excuse import Excuse
+from visual_excuses.excuses_diff import diff_excuses
+from visual_excuses.excuses_filter import filter_excuses
+from visual_excuses.excuses_parser import ExcusesParser
+from visual_excuses.ubuntu_teams import UbuntuTeamMapping
+
+
+def excuse(name, version, **fields):
+    return Excuse(
+        item_name=name,
+        component=fields.pop("component", "main"),
+        old_version="1.0",
+        new_version=version,
+        missing_builds=fields.pop("missing_builds", []),
+        **fields
+    )
+
+
+OLD = [
+    excuse("bash", "5.2", age=3),
+    excuse("dbus", "1.14", reasons=("autopkgtest",)),
+    excuse("glibc", "2.40"),
+    excuse("vim", "9.1", age=10),
+]
+
+NEW = [
+    excuse("bash", "5.2", age=4),
+    excuse("dbus", "1.14", reasons=("autopkgtest",), missing_builds=["s390x"]),
+    excuse("glibc", "2.41"),
+    excuse("vim", "9.1", age=10),
+    excuse("zsh", "5.9", component="universe"),
+]
+
+
+def test_diff_excuses():
+    diff = diff_excuses(OLD, NEW)
+
+    assert [e["item_name"] for e in diff["added"]] == ["glibc", "zsh"]
+    assert [e["new_version"] for e in diff["added"]] == ["2.41", "5.9"]
+    assert diff["removed"] == [OLD[2].to_dict()]
+    assert diff["changed"] == [
+        {
+            "item_name": "bash",
+            "new_version": "5.2",
+            "changes": {"age": [3, 4]},
+        },
+        {
+            "item_name": "dbus",
+            "new_version": "1.14",
+            "changes": {
+                "missing_builds": [[], ["s390x"]],
+                "status": ["default", "missing-builds"],
+            },
+        },
+    ]
+
+
+def test_diff_excuses_unchanged():
+    assert diff_excuses(OLD, OLD) == \
+        {"added": [], "removed": [], "changed": []}
+
+
+def test_filter_excuses_since_last(tmp_path, capsys):
+    teams = UbuntuTeamMapping.from_mapping({})
+    args = ExcusesParser().parse_args(
+        ["--since-last", "--component", "main", "--cache-dir", str(tmp_path)])
+
+    # Nothing was seen before, every excuse is new
+    assert filter_excuses(OLD, args, teams) == []
+    diff = json.loads(capsys.readouterr().out)
+    assert len(diff["added"]) == len(OLD)
+
+    assert filter_excuses(NEW, args, teams) == []
+    diff = json.loads(capsys.readouterr().out)
+    assert [e["item_name"] for e in diff["added"]] == ["glibc"]
+    assert [e["item_name"] for e in diff["removed"]] == ["glibc"]
+    assert [e["item_name"] for e in diff["changed"]] == ["bash", "dbus"]
+
+    assert filter_excuses(NEW, args, teams) == []
+    diff = json.loads(capsys.readouterr().out)
+    assert diff == {"added": [], "removed": [], "changed": []}
+
+
+def test_filter_excuses_since_last_invalid_team_keeps_baseline(
+    tmp_path, capsys
+):
+    teams = UbuntuTeamMapping.from_mapping({})
+    args = ExcusesParser().parse_args(
+        ["--since-last", "--cache-dir", str(tmp_path)])
+    filter_excuses(OLD, args, teams)
+    capsys.readouterr()
+
+    # The mistyped team is reported before the baseline is touched
+    invalid = ExcusesParser().parse_args(
+        ["--since-last", "--team", "nobody", "--cache-dir", str(tmp_path)])
+    assert filter_excuses(NEW, invalid, teams) == []
+    capsys.readouterr()
+
+    filter_excuses(OLD, args, teams)
+    diff = json.loads(capsys.readouterr().out)
+    assert diff == {"added": [], "removed": [], "changed": []}
+
+
+def test_filter_excuses_since_last_per_filters(tmp_path, capsys):
+    teams = UbuntuTeamMapping.from_mapping({})
+    everything = ExcusesParser().parse_args(
+        ["--since-last", "--cache-dir", str(tmp_path)])
+    main = ExcusesParser().parse_args(
+        ["--since-last", "--component", "main", "--cache-dir", str(tmp_path)])
+    filter_excuses(OLD, everything, teams)
+    filter_excuses(OLD, main, teams)
+    capsys.readouterr()
+
+    # A poller with other filters doesn't reset this one's baseline
+    filter_excuses(NEW, main, teams)
+    capsys.readouterr()
+    filter_excuses(NEW, everything, teams)
+    diff = json.loads(capsys.readouterr().out)
+    assert [e["item_name"] for e in diff["added"]] == ["glibc", "zsh"]
+    assert [e["item_name"] for e in diff["changed"]] == ["bash", "dbus"]
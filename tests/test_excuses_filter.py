@@ -0,0 +1,145 @@
+import re
+
+import pytest
+
+from visual_excuses.excuses_filter import filter_excuses, select_excuses
+from visual_excuses.excuses_parser import ExcusesParser
+from visual_excuses.ubuntu_teams import UbuntuTeamMapping
+
+
+@pytest.fixture(scope="module")
+def teams(sample_excuses):
+    names = [excuse.item_name for excuse in sample_excuses]
+    return UbuntuTeamMapping.from_mapping({
+        "team-a": names[::3],
+        "team-b": names[::2],
+        "team-c": ["unrelated"],
+    })
+
+
+def legacy_filter(excuses, args, teams):
+    """The multi-pass filter select_excuses replaced"""
+    if args.ftbfs:
+        excuses = [e for e in excuses if e.ftbfs()]
+    if args.with_bugs:
+        excuses = [e for e in excuses if e.excuse_bug]
+    if args.min_age is not None:
+        excuses = [
+            e for e in excuses if e.age is not None and e.age >= args.min_age
+        ]
+    if args.max_age is not None:
+        excuses = [
+            e for e in excuses if e.age is not None and e.age <= args.max_age
+        ]
+    if args.team:
+        excuses = [
+            e for e in excuses
+            if teams.default_team(e.item_name) == args.team
+        ]
+    if args.component:
+        excuses = [e for e in excuses if e.component == args.component]
+    if args.name:
+        pattern = re.compile(args.name, re.IGNORECASE)
+        excuses = [e for e in excuses if pattern.search(e.item_name)]
+    if args.limit:
+        excuses = excuses[:args.limit]
+    if args.reverse:
+        excuses.reverse()
+    return excuses
+
+
+@pytest.mark.parametrize("argv", [
+    [],
+    ["--ftbfs"],
+    ["--with-bugs"],
+    ["--min-age", "3"],
+    ["--min-age", "2", "--max-age", "30"],
+    ["--component", "main"],
+    ["--team", "team-a"],
+    ["--team", "team-b", "--ftbfs"],
+    ["--name", "^LIB"],
+    ["--component", "universe", "--max-age", "10", "--name", "py"],
+    ["--limit", "25"],
+    ["--reverse"],
+    ["--limit", "10", "--reverse"],
+    ["--ftbfs", "--min-age", "1", "--team", "team-b", "--component",
+     "universe", "--name", "[aeiou]", "--with-bugs", "--limit", "3",
+     "--reverse"],
+])
+def test_select_excuses_matches_legacy_filter(sample_excuses, teams, argv):
+    args = ExcusesParser().parse_args(argv)
+    assert list(select_excuses(sample_excuses, args, teams)) == \
+        legacy_filter(sample_excuses, args, teams)
+
+
+def test_select_excuses_stops_at_limit(sample_excuses, teams):
+    args = ExcusesParser().parse_args(["--limit", "2"])
+    consumed = []
+
+    def excuses():
+        for excuse in sample_excuses:
+            consumed.append(excuse)
+            yield excuse
+
+    assert list(select_excuses(excuses(), args, teams)) == \
+        sample_excuses[:2]
+    assert len(consumed) == 2
+
+
+@pytest.mark.parametrize("limit", ["-1", "two"])
+def test_parser_rejects_invalid_limit(limit, capsys):
+    with pytest.raises(SystemExit):
+        ExcusesParser().parse_args(["--limit", limit])
+    assert "argument --limit" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("argv", [
+    ["--graph-format", "dot"],
+    ["--graph-detail", "full"],
+    ["--output", "excuses.dot"],
+])
+def test_parser_graph_options_only_for_the_graph(argv, capsys):
+    with pytest.raises(SystemExit):
+        ExcusesParser().parse_args(argv)
+    assert "unrecognized arguments" in capsys.readouterr().err
+    assert ExcusesParser(graph=True).parse_args(argv)
+
+
+def test_select_excuses_reverse_from_iterator(sample_excuses, teams):
+    args = ExcusesParser().parse_args(["--reverse"])
+    assert list(select_excuses(iter(sample_excuses), args, teams)) == \
+        sample_excuses[::-1]
+
+
+def test_filter_excuses_unknown_team(sample_excuses, teams, capsys):
+    args = ExcusesParser().parse_args(["--team", "team-z"])
+    assert filter_excuses(sample_excuses, args, teams) == []
+    assert "team-z is not a valid Ubuntu Team" in capsys.readouterr().out
+
+
+def test_filter_excuses_invalid_regex(sample_excuses, teams, capsys):
+    args = ExcusesParser().parse_args(["--name", "("])
+    assert filter_excuses(sample_excuses, args, teams) == []
+    assert "Invalid regex pattern" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("argv, check", [
+    (["--status", "depends"], lambda e: e.status == "depends"),
+    (["--waiting"], lambda e: e.waiting),
+    (["--regressed-arch", "amd64"],
+     lambda e: "amd64" in {r.arch for r in e.regressions}),
+])
+def test_select_excuses_classification(sample_excuses, teams, argv, check):
+    args = ExcusesParser().parse_args(argv)
+    selected = list(select_excuses(sample_excuses, args, teams))
+    assert selected
+    assert selected == [e for e in sample_excuses if check(e)]
+
+
+def test_select_excuses_regressed_test(sample_excuses, teams):
+    test = next(e for e in sample_excuses if e.regressions).regressions[0]
+    args = ExcusesParser().parse_args(["--regressed-test", test.package])
+    selected = list(select_excuses(sample_excuses, args, teams))
+    assert selected
+    assert all(
+        test.package in {r.package for r in e.regressions} for e in selected)
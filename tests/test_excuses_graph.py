@@ -0,0 +1,226 @@
+import json
+from pathlib import Path
+
+from visual_excuses.excuse import Excuse, Regression
+from visual_excuses.excuses_graph import (
+    EXCUSE_REASON_COLORS, PHYSICS_NODES, TEAM_COLOR, ExcusesGraph,
+    build_excuses_graph, build_overview_graph, cluster_excuses
+)
+from visual_excuses.pyvis_visual import (
+    cluster_data, clustered_network, pyvis_network, visual_pyvis_excuses
+)
+from visual_excuses.ubuntu_teams import UbuntuTeamMapping
+
+REGRESSION = "autopkgtest for systemd: Regression on amd64"
+
+EXCUSES = [
+    Excuse(
+        item_name="bash",
+        component="main",
+        old_version="5.1",
+        new_version="5.2",
+        missing_builds=[],
+        reasons=("depends",),
+        age=3,
+        blocked_by="glibc"
+    ),
+    Excuse(
+        item_name="glibc",
+        component="main",
+        old_version="2.40",
+        new_version="2.41",
+        missing_builds=[],
+        reasons=("autopkgtest",),
+        age=2,
+        regressions=(Regression("systemd", "amd64"),)
+    ),
+    Excuse(
+        item_name="dbus",
+        component="main",
+        old_version="1.14",
+        new_version="1.16",
+        missing_builds=["s390x"],
+        reasons=("autopkgtest", "missing-builds"),
+        age=1,
+        regressions=(Regression("systemd", "amd64"),)
+    ),
+]
+
+TEAMS = UbuntuTeamMapping.from_mapping({
+    "foundations": ["bash", "glibc"],
+    "desktop": ["dbus"],
+})
+
+
+def test_build_excuses_graph_nodes():
+    graph = build_excuses_graph(EXCUSES, TEAMS)
+
+    assert list(graph.nodes) == \
+        ["foundations", "desktop", "bash", "glibc", "systemd", "dbus"]
+    assert graph.nodes["foundations"]["color"] == TEAM_COLOR
+    assert graph.nodes["foundations"]["shape"] == "box"
+    assert graph.nodes["bash"]["color"] == EXCUSE_REASON_COLORS["depends"]
+    assert graph.nodes["dbus"]["color"] == \
+        EXCUSE_REASON_COLORS["autopkgtest-depends"]
+
+
+def test_build_excuses_graph_merges_existing_nodes():
+    graph = build_excuses_graph(EXCUSES, TEAMS)
+
+    # glibc was first created as bash's dependency, then completed
+    assert graph.nodes["glibc"]["color"] == \
+        EXCUSE_REASON_COLORS["autopkgtest-depends"]
+    assert graph.nodes["glibc"]["title"] != "Unknown"
+    # Both regressions are reported on the systemd test node
+    assert graph.nodes["systemd"]["title"] == f"{REGRESSION}<br/>{REGRESSION}"
+
+
+def test_build_excuses_graph_edges():
+    graph = build_excuses_graph(EXCUSES, TEAMS)
+
+    assert graph.edges == [
+        ("foundations", "bash"),
+        ("bash", "glibc"),
+        ("foundations", "glibc"),
+        ("glibc", "systemd"),
+        ("desktop", "dbus"),
+    ]
+
+
+def test_pyvis_network():
+    graph = build_excuses_graph(EXCUSES, TEAMS)
+    network = pyvis_network(graph)
+
+    assert network.get_nodes() == list(graph.nodes)
+    assert network.get_node("bash") is graph.nodes["bash"]
+    assert network.get_edges()[0] == \
+        {"from": "foundations", "to": "bash", "arrows": "to"}
+
+
+def test_pyvis_network_physics():
+    graph = ExcusesGraph()
+    assert pyvis_network(graph).options.physics.enabled
+
+    for i in range(PHYSICS_NODES + 1):
+        graph.add_node(f"pkg{i}")
+    assert not pyvis_network(graph).options.physics.enabled
+
+
+def test_cluster_excuses():
+    clusters = cluster_excuses(EXCUSES, TEAMS)
+
+    assert list(clusters) == [
+        "foundations/depends",
+        "foundations/autopkgtest-depends",
+        "desktop/autopkgtest-depends",
+    ]
+    cluster = clusters["foundations/autopkgtest-depends"]
+    assert cluster.team == "foundations"
+    assert cluster.status == "autopkgtest-depends"
+    assert [e.item_name for e in cluster.excuses] == ["glibc"]
+
+
+def test_build_overview_graph():
+    unassigned = Excuse(
+        item_name="zsh",
+        component="main",
+        old_version="5.8",
+        new_version="5.9",
+        missing_builds=[],
+        reasons=(),
+        age=1
+    )
+    clusters = cluster_excuses(EXCUSES + [unassigned], TEAMS)
+    graph = build_overview_graph(clusters.values())
+
+    assert list(graph.nodes) == [
+        "foundations",
+        "desktop",
+        "foundations/depends",
+        "foundations/autopkgtest-depends",
+        "desktop/autopkgtest-depends",
+        "/candidate",
+    ]
+    assert graph.nodes["foundations"]["label"] == "foundations (2)"
+    assert graph.nodes["/candidate"]["label"] == "candidate (1)"
+    assert graph.nodes["/candidate"]["value"] == 1
+    assert graph.edges == [
+        ("foundations", "foundations/depends"),
+        ("foundations", "foundations/autopkgtest-depends"),
+        ("desktop", "desktop/autopkgtest-depends"),
+    ]
+
+
+def test_cluster_data():
+    cluster = cluster_excuses(EXCUSES, TEAMS)["foundations/depends"]
+    script = cluster_data(cluster, TEAMS)
+
+    assert script.startswith("visualExcuses.expand(")
+    data = json.loads(script[len("visualExcuses.expand("):-len(");\n")])
+    assert data["cluster"] == "foundations/depends"
+    assert [node["id"] for node in data["members"]] == ["bash"]
+    assert [node["id"] for node in data["related"]] == \
+        ["foundations", "glibc"]
+    assert data["edges"] == [
+        {"id": "foundations>bash", "from": "foundations", "to": "bash",
+         "arrows": "to"},
+        {"id": "bash>glibc", "from": "bash", "to": "glibc", "arrows": "to"},
+    ]
+
+
+def test_clustered_network(tmp_path):
+    network = clustered_network(EXCUSES, TEAMS, tmp_path / "excuses.html")
+
+    assert network.get_nodes() == [
+        "foundations",
+        "desktop",
+        "foundations/depends",
+        "foundations/autopkgtest-depends",
+        "desktop/autopkgtest-depends",
+    ]
+    data_dir = tmp_path / "excuses_files"
+    files = sorted(path.name for path in data_dir.iterdir())
+    assert files == ["cluster-0.js", "cluster-1.js", "cluster-2.js"]
+
+    html = network.generate_html()
+    assert '"foundations/depends": "excuses_files/cluster-0.js"' in html
+    assert html.index("var visualExcuses") < html.rindex("</body>")
+
+
+def test_clustered_network_replaces_previous_files(tmp_path):
+    data_dir = tmp_path / "excuses_files"
+    data_dir.mkdir()
+    (data_dir / "cluster-7.js").write_text("stale")
+    (data_dir / "notes.txt").write_text("kept")
+
+    clustered_network(EXCUSES, TEAMS, tmp_path / "excuses.html")
+
+    assert sorted(path.name for path in data_dir.iterdir()) == [
+        "cluster-0.js", "cluster-1.js", "cluster-2.js", "notes.txt"
+    ]
+
+
+def test_visual_pyvis_excuses_output_elsewhere(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    output = tmp_path / "out"
+    output.mkdir()
+
+    visual_pyvis_excuses(EXCUSES, TEAMS, "clusters", Path("out/graph.html"))
+
+    assert (output / "graph_files" / "cluster-0.js").exists()
+    assert not (tmp_path / "graph_files").exists()
+    assert not (tmp_path / "excuses_files").exists()
+
+
+def test_visual_pyvis_excuses_output(tmp_path):
+    path = tmp_path / "graph.html"
+    visual_pyvis_excuses(EXCUSES, TEAMS, "full", path)
+
+    html = path.read_text()
+    # Pages written elsewhere than the default embed vis.js
+    assert "lib/bindings/utils.js" not in html
+    assert '"bash"' in html
+    assert not (tmp_path / "graph_files").exists()
+
+    visual_pyvis_excuses(EXCUSES, TEAMS, "clusters", path)
+    assert (tmp_path / "graph_files" / "cluster-0.js").exists()
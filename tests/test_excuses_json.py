@@ -0,0 +1,64 @@
+import io
+import json
+
+import pytest
+
+from visual_excuses.excuses_filter import filter_excuses
+from visual_excuses.excuses_json import write_json, write_ndjson
+from visual_excuses.excuses_parser import ExcusesParser
+from visual_excuses.ubuntu_teams import UbuntuTeamMapping
+
+
+@pytest.mark.parametrize("count", [0, 1, 50, None])
+@pytest.mark.parametrize("indent", [2, 4, None])
+def test_write_json_matches_json_dumps(sample_excuses, count, indent):
+    excuses = sample_excuses[:count]
+    out = io.StringIO()
+
+    assert write_json(iter(excuses), out, indent) == len(excuses)
+    assert out.getvalue() == json.dumps(
+        [e.to_dict() for e in excuses], indent=indent) + "\n"
+
+
+def test_write_ndjson(sample_excuses):
+    out = io.StringIO()
+
+    assert write_ndjson(iter(sample_excuses), out) == len(sample_excuses)
+    lines = out.getvalue().splitlines()
+    assert [json.loads(line) for line in lines] == \
+        [json.loads(json.dumps(e.to_dict())) for e in sample_excuses]
+
+
+@pytest.mark.parametrize("write", [write_json, write_ndjson])
+def test_write_json_streams(sample_excuses, write):
+    out = io.StringIO()
+
+    def excuses():
+        for i, excuse in enumerate(sample_excuses[:3]):
+            # Every previous excuse was written already
+            assert out.getvalue().count('"item_name"') == i
+            yield excuse
+
+    assert write(excuses(), out) == 3
+
+
+@pytest.mark.parametrize("argv, indent", [
+    (["--json"], 2), (["--json", "--compact"], None),
+])
+def test_filter_excuses_json(sample_excuses, capsys, argv, indent):
+    args = ExcusesParser().parse_args(argv + ["--component", "main"])
+    teams = UbuntuTeamMapping.from_mapping({})
+    assert filter_excuses(sample_excuses, args, teams) == []
+
+    main = [e.to_dict() for e in sample_excuses if e.component == "main"]
+    assert capsys.readouterr().out == json.dumps(main, indent=indent) + "\n"
+
+
+def test_filter_excuses_ndjson(sample_excuses, capsys):
+    args = ExcusesParser().parse_args(["--ndjson", "--limit", "5"])
+    teams = UbuntuTeamMapping.from_mapping({})
+    assert filter_excuses(sample_excuses, args, teams) == []
+
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line)["item_name"] for line in lines] == \
+        [e.item_name for e in sample_excuses[:5]]
@@ -0,0 +1,220 @@
+import http.client
+import json
+import lzma
+import socket
+import threading
+from http import HTTPStatus
+from urllib.request import urlopen
+
+import pytest
+
+from visual_excuses.excuse import Excuse
+from visual_excuses.excuses_server import (
+    ExcusesService, QueryError, make_server, query_to_argv
+)
+from visual_excuses.ubuntu_teams import UbuntuTeamMapping
+
+EXCUSES = [
+    Excuse(
+        item_name="bash",
+        component="main",
+        old_version="5.1",
+        new_version="5.2",
+        missing_builds=["arm64"],
+        age=12
+    ),
+    Excuse(
+        item_name="gnome-shell",
+        component="main",
+        old_version="47.0",
+        new_version="47.1",
+        missing_builds=[],
+        reasons=("autopkgtest",),
+        age=3
+    ),
+    Excuse(
+        item_name="ptyxis",
+        component="universe",
+        old_version="1.0",
+        new_version="1.1",
+        missing_builds=[],
+        age=1
+    ),
+]
+
+TEAMS = {
+    "team-a": ["bash"],
+    "team-b": ["gnome-shell", "ptyxis"],
+}
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = ExcusesService(cache_dir=tmp_path)
+    service.set_data(EXCUSES, UbuntuTeamMapping.from_mapping(TEAMS))
+    return service
+
+
+def test_query_to_argv():
+    assert query_to_argv("team=foo&ftbfs&min_age=3") == \
+        ["--team=foo", "--ftbfs", "--min-age=3"]
+
+
+@pytest.mark.parametrize("query", ["cache-dir=/tmp", "cache=/tmp", "help"])
+def test_query_to_argv_excluded_options(query):
+    with pytest.raises(QueryError):
+        query_to_argv(query)
+
+
+def test_query_json(service):
+    status, content_type, body = service.query("/excuses?team=team-b&json")
+    assert status == HTTPStatus.OK
+    assert content_type == "application/json"
+    assert [e["item_name"] for e in json.loads(body)] == \
+        ["gnome-shell", "ptyxis"]
+
+
+def test_query_filters(service):
+    status, _, body = service.query("/excuses?component=main&ftbfs&json")
+    assert status == HTTPStatus.OK
+    assert [e["item_name"] for e in json.loads(body)] == ["bash"]
+
+
+def test_query_markdown_and_table(service):
+    status, content_type, body = service.query("/?md&max-age=5")
+    assert status == HTTPStatus.OK
+    assert content_type == "text/markdown"
+    assert "gnome-shell" in body and "bash" not in body
+
+    status, content_type, body = service.query("/")
+    assert content_type == "text/plain"
+    assert all(e.item_name in body for e in EXCUSES)
+
+
+def test_query_ndjson(service):
+    status, content_type, body = service.query("/?ndjson&component=main")
+    assert content_type == "application/x-ndjson"
+    assert [json.loads(line)["item_name"] for line in body.splitlines()] == \
+        ["bash", "gnome-shell"]
+
+
+def test_query_stats(service):
+    status, content_type, body = service.query("/?stats&json")
+    assert status == HTTPStatus.OK
+    assert content_type == "application/json"
+    assert json.loads(body)["total"] == len(EXCUSES)
+
+    status, content_type, body = service.query("/?stats&component=universe")
+    assert content_type == "text/plain"
+    assert "universe" in body and "main" not in body
+
+
+def test_query_inspect(service):
+    status, _, body = service.query("/?inspect=bash&json")
+    assert status == HTTPStatus.OK
+    assert json.loads(body) == [{
+        **EXCUSES[0].to_dict(), "depends": [], "dependents": []
+    }]
+
+    status, _, body = service.query("/?inspect=bash&inspect=ptyxis&json")
+    assert [e["item_name"] for e in json.loads(body)] == ["bash", "ptyxis"]
+
+    status, _, body = service.query("/?inspect=vim")
+    assert status == HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.parametrize("path", [
+    "/excuses?team=team-z",
+    "/excuses?name=(",
+    "/excuses?limit=many",
+    "/excuses?limit=-1",
+    "/excuses?unknown",
+    "/excuses?graph_format=dot",
+    "/excuses?output=/tmp/excuses.dot",
+])
+def test_query_bad_request(service, path):
+    status, _, _ = service.query(path)
+    assert status == HTTPStatus.BAD_REQUEST
+
+
+def test_refresh_skips_unchanged_data(tmp_path, fake_server):
+    excuses = lzma.compress(b"""
+sources:
+- item-name: bash
+  component: main
+  old-version: 5.1
+  new-version: 5.2
+""")
+    fake_server.routes["/excuses.yaml.xz"] = [
+        {"headers": {"ETag": "foo"}, "body": excuses},
+        {"status": 304},
+        {"headers": {"ETag": "bar"}, "body": excuses},
+    ]
+    fake_server.routes["/teams.json"] = {
+        "headers": {"ETag": "teams"}, "body": json.dumps(TEAMS).encode()}
+    service = ExcusesService(
+        cache_dir=tmp_path, url=fake_server.url("/excuses.yaml.xz"),
+        teams_url=fake_server.url("/teams.json"))
+
+    service.refresh()
+    served = service.excuses
+    assert served.names == ["bash"]
+    assert service.version == ("foo", "teams")
+
+    # Still the same version, what is served is kept as is
+    service.refresh()
+    assert service.excuses is served
+
+    service.refresh()
+    assert service.excuses is not served
+    assert service.excuses.names == ["bash"]
+
+
+def test_query_not_found(service):
+    status, _, _ = service.query("/nothing")
+    assert status == HTTPStatus.NOT_FOUND
+
+
+def test_health(service):
+    status, _, body = service.query("/health")
+    assert status == HTTPStatus.OK
+    assert json.loads(body)["excuses"] == len(EXCUSES)
+
+
+def test_http_server(service):
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        host, port = server.server_address
+        with urlopen(f"http://{host}:{port}/excuses?limit=1&json") as reply:
+            assert reply.status == 200
+            assert json.load(reply)[0]["item_name"] == "bash"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path):
+        super().__init__("localhost")
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+def test_unix_socket_server(service, tmp_path):
+    path = tmp_path / "excuses.sock"
+    server = make_server(service, socket_path=path)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        connection = UnixConnection(str(path))
+        connection.request("GET", "/health")
+        reply = connection.getresponse()
+        assert reply.status == 200
+        assert json.load(reply)["excuses"] == len(EXCUSES)
+        connection.close()
+    finally:
+        server.shutdown()
+        server.server_close()
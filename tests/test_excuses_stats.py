@@ -0,0 +1,125 @@
+import json
+
+import pytest
+
+from visual_excuses.excuse import Excuse
+from visual_excuses.excuse_collection import ExcuseCollection
+from visual_excuses.excuses_filter import filter_excuses, summarize_excuses
+from visual_excuses.excuses_parser import ExcusesParser
+from visual_excuses.excuses_stats import NO_TEAM, excuse_stats, percentile
+from visual_excuses.ubuntu_teams import UbuntuTeamMapping
+
+
+def excuse(name, age, component="main", **fields):
+    return Excuse(
+        item_name=name,
+        component=component,
+        old_version="1.0",
+        new_version="1.1",
+        missing_builds=fields.pop("missing_builds", []),
+        age=age,
+        **fields
+    )
+
+
+EXCUSES = [
+    excuse("bash", 3, reasons=("autopkgtest",)),
+    excuse("glibc", 40, missing_builds=["s390x", "riscv64"],
+           reasons=("missingbuild", "depends")),
+    excuse("zsh", 40, component="universe", missing_builds=["riscv64"],
+           reasons=("missingbuild",)),
+    excuse("vim", 7, reasons=("autopkgtest",)),
+    excuse("unknown-age", None, component="universe"),
+]
+
+TEAMS = UbuntuTeamMapping.from_mapping({
+    "foundations": ["bash", "glibc"],
+    "desktop": ["vim", "bash"],
+})
+
+
+def test_excuse_stats():
+    stats = excuse_stats(EXCUSES, TEAMS, top=2)
+
+    assert stats["total"] == 5
+    assert stats["teams"] == {NO_TEAM: 2, "foundations": 2, "desktop": 1}
+    assert stats["components"] == {"main": 3, "universe": 2}
+    assert stats["reasons"] == {
+        "autopkgtest": 2, "missingbuild": 2, "depends": 1
+    }
+    assert stats["missing_builds"] == {"riscv64": 2, "s390x": 1}
+    assert stats["ftbfs_rates"] == {"riscv64": 0.4, "s390x": 0.2}
+    assert stats["age_ranges"] == {
+        "0-6": 1, "7-29": 1, "30-89": 2, "90+": 0
+    }
+    assert stats["age"] == {
+        "min": 3, "max": 40, "mean": 22.5,
+        "p50": 23.5, "p75": 40.0, "p90": 40.0, "p99": 40.0,
+    }
+    assert stats["oldest"] == [
+        {"item_name": "glibc", "age": 40, "status": "missing-builds",
+         "team": "foundations"},
+        {"item_name": "zsh", "age": 40, "status": "missing-builds",
+         "team": NO_TEAM},
+    ]
+
+
+def test_excuse_stats_empty():
+    stats = excuse_stats([], TEAMS, top=0)
+    assert stats["total"] == 0
+    assert stats["age"]["p50"] is None
+    assert stats["ftbfs_rates"] == {}
+    assert set(stats["age_ranges"].values()) == {0}
+    assert stats["oldest"] == []
+
+
+@pytest.mark.parametrize("p, expected", [
+    (0, 1), (50, 2.5), (100, 4), (25, 1.75),
+])
+def test_percentile(p, expected):
+    assert percentile([1, 2, 3, 4], p) == expected
+
+
+@pytest.mark.parametrize("argv", [
+    [],
+    ["--component", "universe"],
+    ["--team", "team-a", "--top", "3"],
+    ["--ftbfs", "--min-age", "10", "--top", "0"],
+    ["--name", "no-such-package"],
+])
+def test_column_stats_match_excuse_stats(sample_excuses, argv):
+    pytest.importorskip("numpy")
+    names = [excuse.item_name for excuse in sample_excuses]
+    teams = UbuntuTeamMapping.from_mapping({
+        "team-a": names[::3], "team-b": names[::2],
+    })
+    collection = ExcuseCollection(sample_excuses)
+    args = ExcusesParser().parse_args(argv + ["--stats"])
+
+    expected = summarize_excuses(collection, args, teams)
+    collection.columns(teams)
+    assert summarize_excuses(collection, args, teams) == expected
+
+
+def test_filter_excuses_stats(capsys):
+    args = ExcusesParser().parse_args(["--stats", "--json", "--top", "1"])
+    assert filter_excuses(EXCUSES, args, TEAMS) == []
+    stats = json.loads(capsys.readouterr().out)
+    assert stats["total"] == 5
+    assert [e["item_name"] for e in stats["oldest"]] == ["glibc"]
+
+    args = ExcusesParser().parse_args(["--stats", "--md", "--ftbfs"])
+    filter_excuses(EXCUSES, args, TEAMS)
+    output = capsys.readouterr().out
+    assert "| riscv64" in output and "bash" not in output
+    assert "100.0%" in output and "| 30-89" in output
+
+    args = ExcusesParser().parse_args(["--stats", "--team", "nobody"])
+    filter_excuses(EXCUSES, args, TEAMS)
+    assert "Team nobody is not a valid Ubuntu Team" in capsys.readouterr().out
+
+
+def test_parser_rejects_negative_top(capsys):
+    with pytest.raises(SystemExit):
+        ExcusesParser().parse_args(["--stats", "--top", "-1"])
+    assert "argument --top" in capsys.readouterr().err
@@ -0,0 +1,160 @@
+import os
+import time
+
+import pytest
+import requests
+
+from visual_excuses.fetch import (
+    CachePolicy, FetchStats, Fetcher, format_size, server_max_age
+)
+
+BODY = b"x" * 4096
+
+
+@pytest.fixture
+def fetcher():
+    with Fetcher(backoff=0, jitter=0, read_timeout=0.2) as fetcher:
+        yield fetcher
+
+
+def test_fetch_stats(fetcher, fake_server):
+    fake_server.routes["/data"] = {"body": BODY}
+
+    with fetcher.get(fake_server.url("/data")) as response:
+        assert response.raw.read() == BODY
+
+    stats, = fetcher.stats
+    assert stats.url == fake_server.url("/data")
+    assert stats.status == 200
+    assert stats.retries == 0
+    assert stats.size == len(BODY)
+    assert stats.seconds > 0
+
+
+def test_fetch_stats_of_overlapping_responses(fetcher, fake_server):
+    fake_server.routes["/first"] = {"body": BODY}
+    fake_server.routes["/second"] = {"body": BODY[:10]}
+
+    with fetcher.get(fake_server.url("/first")) as first, \
+            fetcher.get(fake_server.url("/second")) as second:
+        first.raw.read()
+
+    assert first.stats.url == fake_server.url("/first")
+    assert first.stats.size == len(BODY)
+    assert second.stats.url == fake_server.url("/second")
+    assert second.stats.size == 0
+    assert fetcher.stats == [first.stats, second.stats]
+
+
+def test_fetch_keeps_connections_alive(fetcher, fake_server):
+    fake_server.routes["/data"] = {"body": BODY}
+
+    for _ in range(3):
+        with fetcher.get(fake_server.url("/data")) as response:
+            response.raw.read()
+
+    assert len(fake_server.peers) == 3
+    assert len(set(fake_server.peers)) == 1
+
+
+def test_fetch_retries_server_errors(fetcher, fake_server):
+    fake_server.routes["/data"] = [
+        {"status": 503}, {"status": 502}, {"body": BODY}]
+
+    with fetcher.get(fake_server.url("/data")) as response:
+        assert response.status_code == 200
+        assert response.raw.read() == BODY
+    assert len(fake_server.requests) == 3
+    assert fetcher.stats[0].retries == 2
+
+
+def test_fetch_gives_up_on_server_errors(fetcher, fake_server):
+    fake_server.routes["/data"] = {"status": 503}
+
+    with fetcher.get(fake_server.url("/data")) as response:
+        assert response.status_code == 503
+    # The first request and 3 retries
+    assert len(fake_server.requests) == 4
+
+
+def test_fetch_retries_timeouts(fetcher, fake_server):
+    fake_server.routes["/data"] = [{"delay": 0.5}, {"body": BODY}]
+
+    with fetcher.get(fake_server.url("/data")) as response:
+        assert response.raw.read() == BODY
+    assert fetcher.stats[0].retries == 1
+
+
+def test_fetch_does_not_retry_client_errors(fetcher, fake_server):
+    with fetcher.get(fake_server.url("/missing")) as response:
+        assert response.status_code == 404
+    assert len(fake_server.requests) == 1
+
+
+def test_fetch_unreachable(fetcher, unreachable_url):
+    with pytest.raises(requests.ConnectionError):
+        fetcher.get(unreachable_url)
+
+
+def test_fetch_stats_summary():
+    stats = FetchStats("http://host/file", 200, 2, 3 * 1024 ** 2, 2.0)
+    assert stats.rate == 1.5 * 1024 ** 2
+    assert stats.summary() == \
+        "http://host/file: 3.0 MiB in 2.0s (1.5 MiB/s, 2 retries)"
+
+
+@pytest.mark.parametrize("size, text", [
+    (0, "0.0 B"),
+    (1536, "1.5 KiB"),
+    (5 * 1024 ** 3, "5.0 GiB"),
+])
+def test_format_size(size, text):
+    assert format_size(size) == text
+
+
+@pytest.mark.parametrize("headers, max_age", [
+    ({}, None),
+    ({"Cache-Control": "public"}, None),
+    ({"Cache-Control": "public, max-age=600"}, 600),
+    ({"Cache-Control": "max-age=600", "Age": "100"}, 500),
+    ({"Cache-Control": "max-age=600", "Age": "900"}, 0),
+    ({"Cache-Control": "max-age=600, no-cache"}, 0),
+    ({"Cache-Control": "No-Store"}, 0),
+])
+def test_server_max_age(headers, max_age):
+    assert server_max_age(headers) == max_age
+
+
+def stamp_at(path, age, server_max_age=""):
+    path.write_text(server_max_age)
+    checked = time.time() - age
+    os.utime(path, (checked, checked))
+    return path
+
+
+@pytest.mark.parametrize("policy, age, server, fresh", [
+    # Defaults apply when the server sent no max-age
+    (CachePolicy(default_max_age=300), 100, "", True),
+    (CachePolicy(default_max_age=300), 400, "", False),
+    # The server's max-age wins over the defaults
+    (CachePolicy(default_max_age=300), 400, "600", True),
+    (CachePolicy(default_max_age=300), 100, "0", False),
+    # An explicit max-age wins over the server's
+    (CachePolicy(max_age=0, default_max_age=300), 100, "600", False),
+    (CachePolicy(max_age=3600), 1000, "600", True),
+    # Stamps from the future are not trusted
+    (CachePolicy(max_age=3600), -100, "", False),
+])
+def test_cache_policy_is_fresh(tmp_path, policy, age, server, fresh):
+    stamp = stamp_at(tmp_path / "stamp", age, server)
+    assert policy.is_fresh(stamp) is fresh
+
+
+def test_cache_policy_without_stamp(tmp_path):
+    assert not CachePolicy(max_age=3600).is_fresh(tmp_path / "stamp")
+
+
+def test_fetcher_is_lazy():
+    fetcher = Fetcher()
+    assert fetcher._session is None
+    fetcher.close()
@@ -0,0 +1,96 @@
+import io
+import json
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from visual_excuses.excuses_graph import ExcusesGraph, build_excuses_graph
+from visual_excuses.graph_export import (
+    write_dot, write_graph, write_graph_json, write_graphml
+)
+
+from tests.test_excuses_graph import EXCUSES, TEAMS
+
+GRAPHML = "{http://graphml.graphdrawing.org/xmlns}"
+
+
+def export(writer, graph) -> str:
+    out = io.StringIO()
+    writer(graph, out)
+    return out.getvalue()
+
+
+def test_write_graph_json():
+    graph = build_excuses_graph(EXCUSES, TEAMS)
+    data = json.loads(export(write_graph_json, graph))
+
+    assert data["directed"]
+    assert data["nodes"] == list(graph.nodes.values())
+    assert data["edges"] == [
+        {"source": source, "target": target}
+        for source, target in graph.edges
+    ]
+
+
+def test_write_graph_json_networkx():
+    networkx = pytest.importorskip("networkx")
+    graph = build_excuses_graph(EXCUSES, TEAMS)
+    data = json.loads(export(write_graph_json, graph))
+
+    read = networkx.node_link_graph(data, edges="edges")
+    assert read.is_directed()
+    assert list(read.nodes) == list(graph.nodes)
+    assert sorted(read.edges) == sorted(graph.edges)
+
+
+def test_write_graph_json_empty():
+    data = json.loads(export(write_graph_json, ExcusesGraph()))
+    assert data["nodes"] == []
+    assert data["edges"] == []
+
+
+def test_write_graphml():
+    graph = build_excuses_graph(EXCUSES, TEAMS)
+    root = ET.fromstring(export(write_graphml, graph))
+
+    nodes = root.findall(f"{GRAPHML}graph/{GRAPHML}node")
+    assert [node.get("id") for node in nodes] == list(graph.nodes)
+    data = {d.get("key"): d.text for d in nodes[0]}
+    assert data == {
+        "label": "foundations",
+        "title": "foundations",
+        "color": "#8B8985",
+        "shape": "box",
+        "size": "20",
+    }
+    # Tooltips are HTML, escaped in the XML
+    assert nodes[2].find(f"{GRAPHML}data[@key='title']").text \
+        .startswith("<a href=https://pad.lv/u/bash>")
+
+    edges = root.findall(f"{GRAPHML}graph/{GRAPHML}edge")
+    assert [(e.get("source"), e.get("target")) for e in edges] == \
+        graph.edges
+
+
+def test_write_dot():
+    graph = ExcusesGraph()
+    graph.add_node("team", color="#8B8985", shape="box")
+    graph.add_node("pkg", title='<a href="x">pkg</a>\\')
+    graph.add_edge("team", "pkg")
+
+    assert export(write_dot, graph) == (
+        'digraph excuses {\n'
+        '  node [style=filled];\n'
+        '  "team" [label="team", shape="box", fillcolor="#8B8985"];\n'
+        '  "pkg" [label="pkg", shape="ellipse", '
+        'tooltip="<a href=\\"x\\">pkg</a>\\\\"];\n'
+        '  "team" -> "pkg";\n'
+        '}\n'
+    )
+
+
+def test_write_graph():
+    graph = build_excuses_graph(EXCUSES, TEAMS)
+    out = io.StringIO()
+    write_graph(graph, out, "dot")
+    assert out.getvalue() == export(write_dot, graph)
@@ -0,0 +1,22 @@
+import pytest
+
+from benchmarks.bench_import_time import ENTRY_POINTS, import_times
+
+# Dependencies the command line must only import on the code paths that
+# need them
+HEAVY_MODULES = ("numpy", "pyvis", "requests", "tabulate", "yaml")
+
+
+@pytest.mark.parametrize("module", ENTRY_POINTS)
+def test_entry_points_skip_heavy_modules(module):
+    # How long the imports take is checked by benchmarks.run, wall times
+    # are too noisy to assert on
+    times = import_times("-c", f"import {module}")
+
+    for heavy in HEAVY_MODULES:
+        assert heavy not in times, f"{module} imports {heavy}"
+
+
+def test_help_skips_heavy_modules():
+    times = import_times("-m", "visual_excuses.ubuntu_excuses_cli", "--help")
+    assert not [heavy for heavy in HEAVY_MODULES if heavy in times]
@@ -0,0 +1,63 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from visual_excuses.excuse import Excuse
+from visual_excuses.snapshot import read_snapshot, write_snapshot
+
+EXCUSES = [
+    Excuse(
+        item_name="example",
+        component="universe",
+        old_version="1.1",
+        new_version="1.2",
+        missing_builds=["arm64"]
+    )
+]
+
+
+def test_snapshot_roundtrip(tmp_path):
+    path = tmp_path / "excuse.pickle"
+    write_snapshot(path, "foo", EXCUSES)
+    assert read_snapshot(path, "foo") == EXCUSES
+
+
+def test_snapshot_invalid_for_other_key(tmp_path):
+    path = tmp_path / "excuse.pickle"
+    write_snapshot(path, "foo", EXCUSES)
+    assert read_snapshot(path, "bar") is None
+
+
+def test_snapshot_schema_version(tmp_path, monkeypatch):
+    path = tmp_path / "excuse.pickle"
+    write_snapshot(path, "foo", EXCUSES)
+    monkeypatch.setattr("visual_excuses.snapshot.SNAPSHOT_VERSION", -1)
+    assert read_snapshot(path, "foo") is None
+
+
+def test_snapshot_missing_or_corrupted(tmp_path):
+    path = tmp_path / "excuse.pickle"
+    assert read_snapshot(path, "foo") is None
+    path.write_bytes(b"not a snapshot")
+    assert read_snapshot(path, "foo") is None
+
+
+def write_snapshots(path, count):
+    for _ in range(count):
+        write_snapshot(path, "foo", EXCUSES)
+
+
+def test_snapshot_concurrent_writers(tmp_path):
+    path = tmp_path / "excuse.pickle"
+    with ProcessPoolExecutor(4) as pool:
+        for future in [
+            pool.submit(write_snapshots, path, 50) for _ in range(4)
+        ]:
+            future.result()
+
+    assert read_snapshot(path, "foo") == EXCUSES
+    assert [p.name for p in tmp_path.iterdir()] == ["excuse.pickle"]
+
+
+def test_snapshot_write_failure_is_not_fatal(tmp_path, capsys):
+    path = tmp_path / "missing" / "excuse.pickle"
+    assert not write_snapshot(path, "foo", EXCUSES)
+    assert f"Couldn't write {path}" in capsys.readouterr().err
@@ -1,19 +1,27 @@
-# test against a large excuse file to make sure all corner cases are covered
+# test against the bundled samples to make sure all corner cases are covered
 
 import pytest
 from visual_excuses.yaml_parser import load_excuses
 
 
-EXCUSES_YAML = "tests/data/update_excuses.yaml"
+LIGHT_SAMPLE = "samples/update_excuses_light.yaml.xz"
 
 
-@pytest.mark.parametrize("excuse", load_excuses(EXCUSES_YAML))
-def test_excuse_consistency(excuse):
+@pytest.fixture(scope="module", params=["full", "light"])
+def excuses(request, sample_excuses):
+    if request.param == "full":
+        return sample_excuses
+    return load_excuses(LIGHT_SAMPLE)
+
+
+def test_excuse_consistency(excuses):
     """Stress test ftbfs using real data."""
-    result = excuse.ftbfs()
+    assert excuses
+    for excuse in excuses:
+        result = excuse.ftbfs()
 
-    # Check the ftbfs property matches the state of missing_builds
-    assert isinstance(result, bool)
-    assert result == (
-        len(excuse.missing_builds) > 0 or 'no-binaries' in excuse.reasons
-    )
+        # Check the ftbfs property matches the state of missing_builds
+        assert isinstance(result, bool)
+        assert result == (
+            len(excuse.missing_builds) > 0 or 'no-binaries' in excuse.reasons
+        ), excuse.item_name
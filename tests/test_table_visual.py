@@ -0,0 +1,95 @@
+import io
+
+import pytest
+from tabulate import tabulate
+
+from visual_excuses import table_visual
+from visual_excuses.excuses_parser import ExcusesParser
+from visual_excuses.table_visual import (
+    HEADERS, fit, render_excuses_markdown, render_excuses_table,
+    write_excuses
+)
+
+
+def legacy_rows(excuses, args, mark):
+    """The rows render_excuses_table and render_excuses_markdown built"""
+    rows = []
+    for e in excuses:
+        ftbfs_str = ""
+        if e.ftbfs():
+            if args and args.missing_builds:
+                ftbfs_str = e.missing_builds
+            else:
+                ftbfs_str = mark
+        rows.append([
+            e.age, e.item_name, e.component, e.new_version, ftbfs_str,
+            e.excuse_bug
+        ])
+    return rows
+
+
+@pytest.mark.parametrize("argv", [[], ["--missing-builds"]])
+def test_small_tables_use_tabulate(sample_excuses, argv):
+    args = ExcusesParser().parse_args(argv)
+    excuses = sample_excuses[:200]
+
+    assert render_excuses_table(excuses, args) == tabulate(
+        legacy_rows(excuses, args, "✅"), headers=list(HEADERS),
+        tablefmt="fancy_outline")
+    assert render_excuses_markdown(excuses, args) == tabulate(
+        legacy_rows(excuses, args, "yes"), headers=list(HEADERS),
+        tablefmt="github")
+
+
+def test_large_fancy_table_is_streamed(sample_excuses, monkeypatch):
+    monkeypatch.setattr(table_visual, "TABULATE_ROWS", 50)
+    lines = render_excuses_table(iter(sample_excuses)).splitlines()
+
+    assert len(lines) == len(sample_excuses) + 4
+    assert lines[0].startswith("╒") and lines[-1].startswith("╘")
+    assert len({len(line) for line in lines}) == 1
+    assert [cell.strip() for cell in lines[1].split("│")[1:-1]] == \
+        list(HEADERS)
+    width = widths(lines[0])[1]
+    assert all(
+        f"│ {fit(excuse.item_name, width).ljust(width)} │" in line
+        for excuse, line in zip(sample_excuses, lines[3:])
+    )
+
+
+def widths(border):
+    return [len(part) - 2 for part in border[1:-1].split("╤")]
+
+
+def test_streamed_cells_are_cut_short(sample_excuses, monkeypatch):
+    monkeypatch.setattr(table_visual, "TABULATE_ROWS", 0)
+    monkeypatch.setattr(table_visual, "MAX_WIDTHS", (4, 5, 5, 5, 5, 5))
+    lines = render_excuses_table(sample_excuses[:3]).splitlines()
+
+    assert widths(lines[0]) == [4, 5, 5, 5, 5, 5]
+    assert f"│ {sample_excuses[0].item_name[:4]}… │" in lines[3]
+
+
+def test_large_markdown_is_streamed(sample_excuses, monkeypatch):
+    monkeypatch.setattr(table_visual, "TABULATE_ROWS", 50)
+    lines = render_excuses_markdown(iter(sample_excuses)).splitlines()
+
+    assert lines[0] == "| " + " | ".join(HEADERS) + " |"
+    assert lines[1] == "|---:|---|---|---|---|---|"
+    assert len(lines) == len(sample_excuses) + 2
+    assert all(line.count(" | ") == len(HEADERS) - 1 for line in lines[2:])
+
+
+def test_write_tsv(sample_excuses):
+    args = ExcusesParser().parse_args(["--missing-builds"])
+    out = io.StringIO()
+    write_excuses(iter(sample_excuses), out, args, "tsv")
+    lines = out.getvalue().splitlines()
+
+    assert lines[0].split("\t") == list(HEADERS)
+    assert len(lines) == len(sample_excuses) + 1
+    for excuse, line in zip(sample_excuses, lines[1:]):
+        cells = line.split("\t")
+        assert cells[:2] == [str(excuse.age), excuse.item_name]
+        if excuse.missing_builds:
+            assert cells[4] == ",".join(excuse.missing_builds)
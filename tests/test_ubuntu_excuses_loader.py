@@ -1,11 +1,16 @@
-import io
 import lzma
-from unittest.mock import patch, Mock
+from unittest.mock import patch
 
 import pytest
+import requests
 
+from visual_excuses.fetch import CachePolicy, Fetcher
 from visual_excuses.ubuntu_excuses_loader \
-    import CachedExcuses, load_ubuntu_excuses
+    import CachedExcuses, load_ubuntu_data, load_ubuntu_excuses
+from visual_excuses.yaml_parser import load_excuses
+
+# Check the cache with the server every time
+CHECK = CachePolicy(max_age=0)
 
 
 @pytest.fixture(scope='session')
@@ -21,112 +26,350 @@ sources:
     return lzma.compress(data), data
 
 
-def test_cache_uncached(tmp_path, excuses_yaml):
-    compressed, uncompressed = excuses_yaml
-
-    with (
-        patch('visual_excuses.ubuntu_excuses_loader.requests.head') as head,
-        patch('visual_excuses.ubuntu_excuses_loader.requests.get') as get
-    ):
-        response = Mock()
-        response.status_code = 200
-        response.headers = {'ETag': 'foo'}
-        response.raise_for_status.return_value = None
-        head.return_value = response
-        response = Mock()
-        response.status_code = 200
-        response.headers = {'ETag': 'foo'}
-        response.raw = io.BytesIO(compressed)
-        response.raise_for_status.return_value = None
-        get.return_value = response
-
-        cache = CachedExcuses(
-            'http://example.com/excuses.yaml.xz', cache_dir=tmp_path)
-        assert not cache.etag.exists()
-        assert not cache.yaml.exists()
+def test_cache_uncached(tmp_path, excuses_yaml, fake_server):
+    compressed, uncompressed = excuses_yaml
+    fake_server.routes["/excuses.yaml.xz"] = {
+        "headers": {"ETag": "foo"}, "body": compressed}
+
+    cache = CachedExcuses(
+        fake_server.url("/excuses.yaml.xz"), cache_dir=tmp_path)
+    assert not cache.etag.exists()
+    assert not cache.yaml.exists()
+    cache.update()
+    assert [r[0] for r in fake_server.requests] == ["GET"]
+    assert cache.etag.exists()
+    assert cache.etag.read_text() == 'foo'
+    assert cache.yaml.exists()
+    assert cache.yaml.read_bytes() == uncompressed
+
+
+def test_cache_cached(tmp_path, excuses_yaml, fake_server):
+    compressed, uncompressed = excuses_yaml
+    fake_server.routes["/excuses.yaml.xz"] = {
+        "status": 304, "headers": {"ETag": "foo"}}
+
+    cache = CachedExcuses(
+        fake_server.url("/excuses.yaml.xz"), cache_dir=tmp_path)
+    cache.etag.write_text('foo')
+    cache.yaml.write_bytes(uncompressed)
+    cache.update()
+    assert fake_server.requests[0][2]["If-None-Match"] == "foo"
+    assert cache.etag.exists()
+    assert cache.etag.read_text() == 'foo'
+    assert cache.yaml.exists()
+    assert cache.yaml.read_bytes() == uncompressed
+
+
+def test_cache_unexpected(tmp_path, excuses_yaml, fake_server):
+    fake_server.routes["/excuses.yaml.xz"] = {
+        "status": 201, "headers": {"ETag": "foo"}}
+
+    cache = CachedExcuses(
+        fake_server.url("/excuses.yaml.xz"), cache_dir=tmp_path)
+    with pytest.raises(ValueError):
         cache.update()
-        assert cache.etag.exists()
-        assert cache.etag.read_text() == 'foo'
-        assert cache.yaml.exists()
-        assert cache.yaml.read_bytes() == uncompressed
-
-
-def test_cache_cached(tmp_path, excuses_yaml):
-    compressed, uncompressed = excuses_yaml
-
-    with (
-        patch('visual_excuses.ubuntu_excuses_loader.requests.head') as head,
-        patch('visual_excuses.ubuntu_excuses_loader.requests.get') as get
-    ):
-        response = Mock()
-        response.status_code = 304
-        response.headers = {'ETag': 'foo'}
-        response.raise_for_status.return_value = None
-        head.return_value = response
-        response = Mock()
-        response.status_code = 304
-        response.headers = {'ETag': 'foo'}
-        response.raw = io.BytesIO(b'')
-        response.raise_for_status.return_value = None
-        get.return_value = response
-
-        cache = CachedExcuses(
-            'http://example.com/excuses.yaml.xz', cache_dir=tmp_path)
-        cache.etag.write_text('foo')
-        cache.yaml.write_bytes(uncompressed)
+
+
+def test_load_ubuntu_excuses(tmp_path, excuses_yaml, fake_server):
+    compressed, uncompressed = excuses_yaml
+    fake_server.routes["/excuses.yaml.xz"] = {
+        "headers": {"ETag": "foo"}, "body": compressed}
+
+    excuses = load_ubuntu_excuses(
+        fake_server.url("/excuses.yaml.xz"), cache_dir=tmp_path)
+    assert len(excuses) == 1
+    assert excuses[0].component == 'universe'
+    assert excuses[0].new_version == '1.1'
+
+
+def test_load_ubuntu_excuses_uses_snapshot(
+        tmp_path, excuses_yaml, fake_server):
+    compressed, uncompressed = excuses_yaml
+    fake_server.routes["/excuses.yaml.xz"] = {
+        "headers": {"ETag": "foo"}, "body": compressed}
+
+    url = fake_server.url("/excuses.yaml.xz")
+    excuses = load_ubuntu_excuses(url, cache_dir=tmp_path)
+    assert (tmp_path / 'excuse.pickle').exists()
+
+    # Nothing changed on the server, the yaml must not be parsed again
+    fake_server.routes["/excuses.yaml.xz"] = {"status": 304}
+    with patch(
+        'visual_excuses.yaml_parser.load_excuses'
+    ) as load_excuses:
+        cached = load_ubuntu_excuses(url, cache_dir=tmp_path)
+        load_excuses.assert_not_called()
+    assert cached == excuses
+
+
+def test_load_ubuntu_excuses_rebuilds_snapshot(
+        tmp_path, excuses_yaml, fake_server):
+    compressed, uncompressed = excuses_yaml
+    fake_server.routes["/excuses.yaml.xz"] = {
+        "headers": {"ETag": "foo"}, "body": compressed}
+
+    url = fake_server.url("/excuses.yaml.xz")
+    load_ubuntu_excuses(url, cache_dir=tmp_path)
+
+    # A new version is published, the snapshot must follow it
+    fake_server.routes["/excuses.yaml.xz"] = {
+        "headers": {"ETag": "bar"},
+        "body": lzma.compress(uncompressed.replace(b'1.1', b'1.2'))}
+    excuses = load_ubuntu_excuses(url, cache_dir=tmp_path, policy=CHECK)
+    assert excuses[0].new_version == '1.2'
+
+    cache = CachedExcuses(url, cache_dir=tmp_path)
+    assert cache.load_snapshot() == excuses
+
+
+def test_load_ubuntu_excuses_without_connection_uses_stale_cache(
+        tmp_path, excuses_yaml, fake_server, unreachable_url, capsys):
+    compressed, uncompressed = excuses_yaml
+    fake_server.routes["/excuses.yaml.xz"] = {
+        "headers": {"ETag": "foo"}, "body": compressed}
+    excuses = load_ubuntu_excuses(
+        fake_server.url("/excuses.yaml.xz"), cache_dir=tmp_path)
+
+    stale = load_ubuntu_excuses(
+        unreachable_url, cache_dir=tmp_path,
+        fetcher=Fetcher(backoff=0, jitter=0), policy=CHECK)
+    assert stale == excuses
+    assert "using the data cached on" in capsys.readouterr().err
+
+
+def test_cache_without_connection_nor_data(tmp_path, unreachable_url):
+    cache = CachedExcuses(
+        unreachable_url, cache_dir=tmp_path,
+        fetcher=Fetcher(backoff=0, jitter=0))
+    with pytest.raises(requests.ConnectionError):
         cache.update()
-        assert cache.etag.exists()
-        assert cache.etag.read_text() == 'foo'
-        assert cache.yaml.exists()
-        assert cache.yaml.read_bytes() == uncompressed
-
-
-def test_cache_unexpected(tmp_path, excuses_yaml):
-    compressed, uncompressed = excuses_yaml
-
-    with (
-        patch('visual_excuses.ubuntu_excuses_loader.requests.head') as head,
-        patch('visual_excuses.ubuntu_excuses_loader.requests.get') as get
-    ):
-        response = Mock()
-        response.status_code = 201
-        response.headers = {'ETag': 'foo'}
-        response.raise_for_status.return_value = None
-        head.return_value = response
-        response = Mock()
-        response.status_code = 201
-        response.headers = {'ETag': 'foo'}
-        response.raw = io.BytesIO(b'')
-        response.raise_for_status.return_value = None
-        get.return_value = response
-
-        cache = CachedExcuses(
-            'http://example.com/excuses.yaml.xz', cache_dir=tmp_path)
-        with pytest.raises(ValueError):
-            cache.update()
-
-
-def test_load_ubuntu_excuses(tmp_path, excuses_yaml):
-    compressed, uncompressed = excuses_yaml
-
-    with (
-        patch('visual_excuses.ubuntu_excuses_loader.requests.head') as head,
-        patch('visual_excuses.ubuntu_excuses_loader.requests.get') as get
-    ):
-        response = Mock()
-        response.status_code = 200
-        response.headers = {'ETag': 'foo'}
-        response.raise_for_status.return_value = None
-        head.return_value = response
-        response = Mock()
-        response.status_code = 200
-        response.headers = {'ETag': 'foo'}
-        response.raw = io.BytesIO(compressed)
-        response.raise_for_status.return_value = None
-        get.return_value = response
-
-        excuses = load_ubuntu_excuses(
-            'http://example.com/excuses.yaml.xz', cache_dir=tmp_path)
-        assert len(excuses) == 1
-        assert excuses[0].component == 'universe'
-        assert excuses[0].new_version == '1.1'
+
+
+def test_load_ubuntu_data_fetches_concurrently(
+        tmp_path, excuses_yaml, fake_server):
+    compressed, uncompressed = excuses_yaml
+    fake_server.routes["/excuses.yaml.xz"] = {
+        "headers": {"ETag": "foo"}, "body": compressed, "delay": 0.4}
+    fake_server.routes["/teams.json"] = {
+        "headers": {"ETag": "bar"},
+        "body": b'{"team-a": ["example-package"]}', "delay": 0.4}
+
+    excuses, teams = load_ubuntu_data(
+        fake_server.url("/excuses.yaml.xz"), fake_server.url("/teams.json"),
+        cache_dir=tmp_path)
+
+    assert excuses[0].item_name == "example-package"
+    assert teams.default_team("example-package") == "team-a"
+    # Both requests reached the server before either was answered, the two
+    # must not have been serialized
+    (_, _, first_answered), (_, second_arrived, _) = sorted(
+        fake_server.timings, key=lambda timing: timing[1])
+    assert second_arrived < first_answered
+
+
+def test_cache_single_conditional_request(
+        tmp_path, excuses_yaml, fake_server):
+    compressed, uncompressed = excuses_yaml
+    fake_server.routes["/excuses.yaml.xz"] = {
+        "headers": {"ETag": "foo"}, "body": compressed}
+
+    cache = CachedExcuses(
+        fake_server.url("/excuses.yaml.xz"), cache_dir=tmp_path,
+        policy=CHECK)
+    cache.update()
+    assert [r[0] for r in fake_server.requests] == ["GET"]
+    assert cache.yaml.read_bytes() == uncompressed
+
+    fake_server.routes["/excuses.yaml.xz"] = {"status": 304}
+    cache.update()
+    assert [r[0] for r in fake_server.requests] == ["GET", "GET"]
+    assert fake_server.requests[1][2]["If-None-Match"] == "foo"
+    assert cache.yaml.read_bytes() == uncompressed
+
+
+def test_cache_without_etag_uses_last_modified(
+        tmp_path, excuses_yaml, fake_server):
+    compressed, uncompressed = excuses_yaml
+    last_modified = "Fri, 14 Mar 2025 21:47:02 GMT"
+    fake_server.routes["/excuses.yaml.xz"] = {
+        "headers": {"Last-Modified": last_modified}, "body": compressed}
+
+    cache = CachedExcuses(
+        fake_server.url("/excuses.yaml.xz"), cache_dir=tmp_path,
+        policy=CHECK)
+    cache.etag.write_text("stale")
+    cache.update()
+    assert cache.yaml.read_bytes() == uncompressed
+    assert not cache.etag.exists()
+    assert cache.version() is not None
+
+    fake_server.routes["/excuses.yaml.xz"] = {"status": 304}
+    cache.update()
+    headers = fake_server.requests[1][2]
+    assert "If-None-Match" not in headers
+    assert headers["If-Modified-Since"] == last_modified
+
+
+def test_load_ubuntu_excuses_snapshot_without_etag(
+        tmp_path, excuses_yaml, fake_server):
+    compressed, uncompressed = excuses_yaml
+    fake_server.routes["/excuses.yaml.xz"] = {
+        "headers": {"Last-Modified": "Fri, 14 Mar 2025 21:47:02 GMT"},
+        "body": compressed}
+
+    url = fake_server.url("/excuses.yaml.xz")
+    excuses = load_ubuntu_excuses(url, cache_dir=tmp_path)
+
+    fake_server.routes["/excuses.yaml.xz"] = {"status": 304}
+    with patch(
+        'visual_excuses.yaml_parser.load_excuses'
+    ) as load_excuses:
+        assert load_ubuntu_excuses(url, cache_dir=tmp_path) == excuses
+        load_excuses.assert_not_called()
+
+
+def test_cache_interrupted_download_keeps_previous(
+        tmp_path, excuses_yaml, fake_server, capsys):
+    compressed, uncompressed = excuses_yaml
+    fake_server.routes["/excuses.yaml.xz"] = {
+        "headers": {"ETag": "bar"}, "body": compressed[:len(compressed) // 2]}
+
+    cache = CachedExcuses(
+        fake_server.url("/excuses.yaml.xz"), cache_dir=tmp_path)
+    cache.yaml.write_bytes(uncompressed)
+    cache.etag.write_text("foo")
+    assert not cache.update()
+
+    assert cache.yaml.read_bytes() == uncompressed
+    assert cache.etag.read_text() == "foo"
+    assert sorted(p.name for p in tmp_path.iterdir()) == \
+        ["excuse.yaml", "excuse.yaml.etag"]
+    assert "using the data cached on" in capsys.readouterr().err
+
+
+def test_load_ubuntu_excuses_connection_lost_uses_stale_cache(
+        tmp_path, excuses_yaml, fake_server, capsys):
+    compressed, uncompressed = excuses_yaml
+    url = fake_server.url("/excuses.yaml.xz")
+    fake_server.routes["/excuses.yaml.xz"] = {
+        "headers": {"ETag": "foo"}, "body": compressed}
+    excuses = load_ubuntu_excuses(url, cache_dir=tmp_path)
+
+    # The server hangs up halfway through the new excuses
+    fake_server.routes["/excuses.yaml.xz"] = {
+        "headers": {"ETag": "bar"}, "body": compressed[:len(compressed) // 2],
+        "length": len(compressed)}
+    assert load_ubuntu_excuses(
+        url, cache_dir=tmp_path, policy=CHECK) == excuses
+    assert "using the data cached on" in capsys.readouterr().err
+
+
+def test_cache_error_status_uses_stale_cache(
+        tmp_path, excuses_yaml, fake_server, capsys):
+    compressed, uncompressed = excuses_yaml
+    fake_server.routes["/excuses.yaml.xz"] = {"status": 403}
+
+    cache = CachedExcuses(
+        fake_server.url("/excuses.yaml.xz"), cache_dir=tmp_path)
+    with pytest.raises(requests.HTTPError):
+        cache.update()
+
+    cache.yaml.write_bytes(uncompressed)
+    assert not cache.update()
+    assert cache.yaml.read_bytes() == uncompressed
+    assert "403" in capsys.readouterr().err
+
+
+def test_cache_interrupted_before_etag_invalidates_snapshot(
+        tmp_path, excuses_yaml, fake_server):
+    compressed, uncompressed = excuses_yaml
+    fake_server.routes["/excuses.yaml.xz"] = {
+        "headers": {"ETag": "bar"}, "body": compressed}
+
+    cache = CachedExcuses(
+        fake_server.url("/excuses.yaml.xz"), cache_dir=tmp_path,
+        policy=CHECK)
+    cache.yaml.write_text("sources: []\n")
+    cache.etag.write_text("foo")
+    cache.save_snapshot([])
+
+    # Interrupted once the data is in place, when writing the new ETag
+    with patch(
+        "pathlib.Path.write_text", side_effect=KeyboardInterrupt
+    ), pytest.raises(KeyboardInterrupt):
+        cache.update()
+
+    assert cache.yaml.read_bytes() == uncompressed
+    assert not cache.etag.exists()
+    assert cache.load_snapshot() is None
+
+
+@pytest.mark.parametrize("cache_format, name", [
+    ("yaml", "excuse.yaml"),
+    ("xz", "excuse.yaml.xz"),
+    ("gzip", "excuse.yaml.gz"),
+])
+def test_cache_formats(tmp_path, excuses_yaml, fake_server, cache_format,
+                       name):
+    compressed, uncompressed = excuses_yaml
+    fake_server.routes["/excuses.yaml.xz"] = {
+        "headers": {"ETag": "foo"}, "body": compressed}
+
+    excuses = load_ubuntu_excuses(
+        fake_server.url("/excuses.yaml.xz"), cache_dir=tmp_path,
+        cache_format=cache_format)
+    assert excuses[0].item_name == "example-package"
+
+    cache = CachedExcuses(
+        fake_server.url("/excuses.yaml.xz"), cache_dir=tmp_path,
+        cache_format=cache_format)
+    assert cache.yaml.name == name
+    assert cache.etag.name == f"{name}.etag"
+    if cache_format == "xz":
+        assert cache.yaml.read_bytes() == compressed
+    # Parse the cached file itself, not the snapshot
+    assert load_excuses(cache.yaml) == excuses
+
+
+def test_cache_fresh_skips_network(tmp_path, excuses_yaml, fake_server):
+    compressed, uncompressed = excuses_yaml
+    fake_server.routes["/excuses.yaml.xz"] = {
+        "headers": {"ETag": "foo"}, "body": compressed}
+
+    url = fake_server.url("/excuses.yaml.xz")
+    excuses = load_ubuntu_excuses(url, cache_dir=tmp_path)
+    assert load_ubuntu_excuses(url, cache_dir=tmp_path) == excuses
+    assert len(fake_server.requests) == 1
+
+
+def test_cache_honours_cache_control(tmp_path, excuses_yaml, fake_server):
+    compressed, uncompressed = excuses_yaml
+    fake_server.routes["/excuses.yaml.xz"] = {
+        "headers": {"ETag": "foo", "Cache-Control": "max-age=0"},
+        "body": compressed}
+
+    cache = CachedExcuses(
+        fake_server.url("/excuses.yaml.xz"), cache_dir=tmp_path)
+    cache.update()
+    assert cache.checked.read_text() == "0"
+
+    fake_server.routes["/excuses.yaml.xz"] = {
+        "status": 304, "headers": {"Cache-Control": "max-age=3600"}}
+    cache.update()
+    cache.update()
+    assert len(fake_server.requests) == 2
+    assert cache.checked.read_text() == "3600"
+
+
+def test_cache_offline(tmp_path, excuses_yaml, fake_server, unreachable_url):
+    compressed, uncompressed = excuses_yaml
+    fake_server.routes["/excuses.yaml.xz"] = {
+        "headers": {"ETag": "foo"}, "body": compressed}
+    excuses = load_ubuntu_excuses(
+        fake_server.url("/excuses.yaml.xz"), cache_dir=tmp_path)
+
+    offline = CachePolicy(max_age=0, offline=True)
+    assert load_ubuntu_excuses(
+        unreachable_url, cache_dir=tmp_path, policy=offline) == excuses
+    assert len(load_ubuntu_excuses(
+        unreachable_url, cache_dir=tmp_path / "empty", policy=offline)) == 0
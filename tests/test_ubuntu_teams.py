@@ -1,9 +1,10 @@
-import io
 import json
-from unittest.mock import patch, Mock
+from unittest.mock import patch
 
 import pytest
+import requests
 
+from visual_excuses.fetch import CachePolicy, Fetcher
 from visual_excuses.ubuntu_teams import UbuntuTeamMapping
 
 FAKE_MAPPING = {
@@ -15,44 +16,96 @@ FAKE_MAPPING_RAW = json.dumps(FAKE_MAPPING).encode('utf-8')
 
 
 @pytest.fixture
-def mock_requests_get():
-    with patch("requests.get") as mock_get:
-        yield mock_get
+def teams_url(fake_server):
+    fake_server.routes["/teams.json"] = {
+        "headers": {"ETag": "foo"}, "body": FAKE_MAPPING_RAW}
+    return fake_server.url("/teams.json")
 
 
-def test_init_succes_with_mapping(tmp_path, mock_requests_get):
+def test_init_succes_with_mapping(tmp_path, teams_url):
+    team_mapping = UbuntuTeamMapping(cache_dir=tmp_path, url=teams_url)
 
-    mock_response = Mock()
-    mock_response.status_code = 200
-    mock_response.headers = {'ETag': 'foo'}
-    mock_response.raw = io.BytesIO(FAKE_MAPPING_RAW)
-    mock_requests_get.return_value = mock_response
+    assert (team_mapping.mapping == FAKE_MAPPING)
+    assert (tmp_path / "teams.json.etag").read_text() == "foo"
 
-    team_mapping = UbuntuTeamMapping(cache_dir=tmp_path)
 
-    assert (team_mapping.mapping == FAKE_MAPPING)
+def test_init_uses_cache_when_not_modified(tmp_path, teams_url, fake_server):
+    UbuntuTeamMapping(cache_dir=tmp_path, url=teams_url)
 
+    fake_server.routes["/teams.json"] = {"status": 304}
+    team_mapping = UbuntuTeamMapping(
+        cache_dir=tmp_path, url=teams_url, policy=CachePolicy(max_age=0))
+
+    assert fake_server.requests[1][2]["If-None-Match"] == "foo"
+    assert (team_mapping.mapping == FAKE_MAPPING)
 
-def test_init_failure_without_connection(tmp_path, mock_requests_get):
 
-    mock_response = Mock()
-    mock_response.status_code = 404
-    mock_requests_get.return_value = mock_response
+def test_init_failure_unexpected_status(tmp_path, teams_url, fake_server):
+    fake_server.routes["/teams.json"] = {"status": 201}
 
     with pytest.raises(ValueError, match="Unexpected HTTP response "):
-        UbuntuTeamMapping(cache_dir=tmp_path)
+        UbuntuTeamMapping(cache_dir=tmp_path, url=teams_url)
+
+
+def test_init_failure_without_connection(tmp_path, unreachable_url):
+    with pytest.raises(requests.ConnectionError):
+        UbuntuTeamMapping(
+            cache_dir=tmp_path, url=unreachable_url,
+            fetcher=Fetcher(backoff=0, jitter=0))
+
+
+def test_init_without_connection_uses_stale_cache(
+        tmp_path, teams_url, unreachable_url, capsys):
+    UbuntuTeamMapping(cache_dir=tmp_path, url=teams_url)
+
+    team_mapping = UbuntuTeamMapping(
+        cache_dir=tmp_path, url=unreachable_url,
+        fetcher=Fetcher(backoff=0, jitter=0), policy=CachePolicy(max_age=0))
+
+    assert (team_mapping.mapping == FAKE_MAPPING)
+    assert "using the data cached on" in capsys.readouterr().err
+
+
+def test_init_error_status_closes_response(
+        tmp_path, teams_url, fake_server, capsys):
+    UbuntuTeamMapping(cache_dir=tmp_path, url=teams_url)
+    fake_server.routes["/teams.json"] = {"status": 403, "body": b"Denied"}
+
+    fetcher = Fetcher(backoff=0, jitter=0)
+    responses = []
+    get = fetcher.get
+    with patch.object(
+        fetcher, "get",
+        side_effect=lambda *args, **kwargs: responses.append(
+            get(*args, **kwargs)) or responses[-1]
+    ):
+        team_mapping = UbuntuTeamMapping(
+            cache_dir=tmp_path, url=teams_url, fetcher=fetcher,
+            policy=CachePolicy(max_age=0))
+
+    assert team_mapping.mapping == FAKE_MAPPING
+    assert "using the data cached on" in capsys.readouterr().err
+    # The error response handed its connection back
+    assert responses[0].raw.closed
 
 
-def test_get_teams_returns_correct_teams_for_package(
-        tmp_path, mock_requests_get):
+def test_init_connection_lost_uses_stale_cache(
+        tmp_path, teams_url, fake_server, capsys):
+    UbuntuTeamMapping(cache_dir=tmp_path, url=teams_url)
+    fake_server.routes["/teams.json"] = {
+        "headers": {"ETag": "bar"}, "body": FAKE_MAPPING_RAW[:10],
+        "length": len(FAKE_MAPPING_RAW)}
 
-    mock_response = Mock()
-    mock_response.status_code = 200
-    mock_response.headers = {'ETag': 'foo'}
-    mock_response.raw = io.BytesIO(FAKE_MAPPING_RAW)
-    mock_requests_get.return_value = mock_response
+    team_mapping = UbuntuTeamMapping(
+        cache_dir=tmp_path, url=teams_url, policy=CachePolicy(max_age=0))
 
-    team_mapping = UbuntuTeamMapping(cache_dir=tmp_path)
+    assert team_mapping.mapping == FAKE_MAPPING
+    assert (tmp_path / "teams.json.etag").read_text() == "foo"
+    assert "using the data cached on" in capsys.readouterr().err
+
+
+def test_get_teams_returns_correct_teams_for_package(tmp_path, teams_url):
+    team_mapping = UbuntuTeamMapping(cache_dir=tmp_path, url=teams_url)
 
     assert team_mapping.get_teams("bash") == ["team-a"]
     assert team_mapping.get_teams("gnome") == ["team-b"]
@@ -60,43 +113,165 @@ def test_get_teams_returns_correct_teams_for_package(
 
 
 def test_get_teams_returns_empty_list_teams_for_unknown_package(
-        tmp_path, mock_requests_get):
+        tmp_path, teams_url):
+    team_mapping = UbuntuTeamMapping(cache_dir=tmp_path, url=teams_url)
 
-    mock_response = Mock()
-    mock_response.status_code = 200
-    mock_response.headers = {'ETag': 'foo'}
-    mock_response.raw = io.BytesIO(FAKE_MAPPING_RAW)
-    mock_requests_get.return_value = mock_response
+    assert team_mapping.get_teams("vim") == []
 
-    team_mapping = UbuntuTeamMapping(cache_dir=tmp_path)
 
-    assert team_mapping.get_teams("vim") == []
+def test_default_team_returns_first_team(tmp_path, teams_url):
+    team_mapping = UbuntuTeamMapping(cache_dir=tmp_path, url=teams_url)
 
+    assert team_mapping.default_team("bash") == "team-a"
+    assert team_mapping.default_team("gnome") == "team-b"
+    assert team_mapping.default_team("dbus") == "team-a"
 
-def test_default_team_returns_first_team(tmp_path, mock_requests_get):
 
-    mock_response = Mock()
-    mock_response.status_code = 200
-    mock_response.headers = {'ETag': 'foo'}
-    mock_response.raw = io.BytesIO(FAKE_MAPPING_RAW)
-    mock_requests_get.return_value = mock_response
+def test_default_team_returns_empty_string_if_no_teams(tmp_path, teams_url):
+    team_mapping = UbuntuTeamMapping(cache_dir=tmp_path, url=teams_url)
 
-    team_mapping = UbuntuTeamMapping(cache_dir=tmp_path)
+    assert team_mapping.default_team("vim") == ""
 
-    assert team_mapping.default_team("bash") == "team-a"
-    assert team_mapping.default_team("gnome") == "team-b"
+
+def test_from_mapping_builds_index_without_cache():
+    team_mapping = UbuntuTeamMapping.from_mapping(FAKE_MAPPING)
+
+    assert team_mapping.mapping == FAKE_MAPPING
+    assert team_mapping.teams["dbus"] == ("team-a", "team-b")
+    assert team_mapping.packages["team-b"] == {"gnome", "dbus", "ptyxis"}
     assert team_mapping.default_team("dbus") == "team-a"
+    assert team_mapping.get_teams("vim") == []
 
 
-def test_default_team_returns_empty_string_if_no_teams(
-        tmp_path, mock_requests_get):
+def test_index_keeps_mapping_order():
+    mapping = {
+        "team-z": ["foo"],
+        "team-a": ["bar", "foo"],
+        "team-m": ["foo", "foo"],
+    }
+    team_mapping = UbuntuTeamMapping.from_mapping(mapping)
 
-    mock_response = Mock()
-    mock_response.status_code = 200
-    mock_response.headers = {'ETag': 'foo'}
-    mock_response.raw = io.BytesIO(FAKE_MAPPING_RAW)
-    mock_requests_get.return_value = mock_response
+    assert team_mapping.get_teams("foo") == ["team-z", "team-a", "team-m"]
+    assert team_mapping.default_team("foo") == "team-z"
 
-    team_mapping = UbuntuTeamMapping(cache_dir=tmp_path)
 
-    assert team_mapping.default_team("vim") == ""
+def test_init_fresh_cache_skips_network(tmp_path, teams_url, fake_server):
+    UbuntuTeamMapping(cache_dir=tmp_path, url=teams_url)
+    team_mapping = UbuntuTeamMapping(cache_dir=tmp_path, url=teams_url)
+
+    assert len(fake_server.requests) == 1
+    assert (team_mapping.mapping == FAKE_MAPPING)
+
+
+def test_init_offline(tmp_path, teams_url, unreachable_url, capsys):
+    offline = CachePolicy(offline=True)
+    team_mapping = UbuntuTeamMapping(
+        cache_dir=tmp_path, url=unreachable_url, policy=offline)
+    assert team_mapping.mapping == {}
+    assert "to use offline" in capsys.readouterr().err
+
+    UbuntuTeamMapping(cache_dir=tmp_path, url=teams_url)
+    team_mapping = UbuntuTeamMapping(
+        cache_dir=tmp_path, url=unreachable_url, policy=offline)
+    assert (team_mapping.mapping == FAKE_MAPPING)
+
+
+def test_init_builds_index_once(tmp_path, teams_url, fake_server):
+    UbuntuTeamMapping(cache_dir=tmp_path, url=teams_url)
+    assert (tmp_path / "teams.pickle").exists()
+
+    # Not modified, the index is loaded rather than the JSON mapping
+    fake_server.routes["/teams.json"] = {"status": 304}
+    with patch("json.load") as load:
+        team_mapping = UbuntuTeamMapping(
+            cache_dir=tmp_path, url=teams_url, policy=CachePolicy(max_age=0))
+        load.assert_not_called()
+    assert team_mapping.mapping == FAKE_MAPPING
+    assert team_mapping.teams["dbus"] == ("team-a", "team-b")
+    assert team_mapping.packages["team-b"] == {"gnome", "dbus", "ptyxis"}
+
+
+def test_init_rebuilds_index_for_new_etag(tmp_path, teams_url, fake_server):
+    UbuntuTeamMapping(cache_dir=tmp_path, url=teams_url)
+
+    mapping = {"team-d": ["vim"]}
+    fake_server.routes["/teams.json"] = {
+        "headers": {"ETag": "bar"}, "body": json.dumps(mapping).encode()}
+    team_mapping = UbuntuTeamMapping(
+        cache_dir=tmp_path, url=teams_url, policy=CachePolicy(max_age=0))
+    assert team_mapping.mapping == mapping
+
+    team_mapping = UbuntuTeamMapping(
+        cache_dir=tmp_path, url=teams_url, policy=CachePolicy(offline=True))
+    assert team_mapping.default_team("vim") == "team-d"
+
+
+def test_init_ignores_corrupted_index(tmp_path, teams_url):
+    UbuntuTeamMapping(cache_dir=tmp_path, url=teams_url)
+    (tmp_path / "teams.pickle").write_bytes(b"garbage")
+
+    team_mapping = UbuntuTeamMapping(cache_dir=tmp_path, url=teams_url)
+    assert team_mapping.mapping == FAKE_MAPPING
+
+
+def test_init_rebuilds_index_for_new_layout(tmp_path, teams_url, monkeypatch):
+    UbuntuTeamMapping(cache_dir=tmp_path, url=teams_url)
+
+    monkeypatch.setattr(
+        "visual_excuses.ubuntu_teams.TEAMS_INDEX_VERSION", -1)
+    with patch("json.load", return_value=FAKE_MAPPING) as load:
+        UbuntuTeamMapping(cache_dir=tmp_path, url=teams_url)
+    load.assert_called_once()
+
+
+def test_init_interrupted_download_keeps_previous(
+        tmp_path, teams_url, fake_server):
+    UbuntuTeamMapping(cache_dir=tmp_path, url=teams_url)
+    fake_server.routes["/teams.json"] = {
+        "headers": {"ETag": "bar"}, "body": b'{"team-d": ["vim"]}'}
+
+    def interrupted_copy(source, target):
+        target.write(source.read(8))
+        raise KeyboardInterrupt
+
+    with patch(
+        "visual_excuses.fetch.copyfileobj",
+        side_effect=interrupted_copy
+    ), pytest.raises(KeyboardInterrupt):
+        UbuntuTeamMapping(
+            cache_dir=tmp_path, url=teams_url, policy=CachePolicy(max_age=0))
+
+    assert (tmp_path / "teams.json").read_bytes() == FAKE_MAPPING_RAW
+    assert (tmp_path / "teams.json.etag").read_text() == "foo"
+    assert not list(tmp_path.glob("*.partial"))
+
+
+def test_init_interrupted_before_etag_rebuilds_index(
+        tmp_path, teams_url, fake_server):
+    UbuntuTeamMapping(cache_dir=tmp_path, url=teams_url)
+    mapping = {"team-d": ["vim"]}
+    fake_server.routes["/teams.json"] = {
+        "headers": {"ETag": "bar"}, "body": json.dumps(mapping).encode()}
+
+    # Interrupted once the mapping is in place, when writing the new ETag
+    with patch(
+        "pathlib.Path.write_text", side_effect=KeyboardInterrupt
+    ), pytest.raises(KeyboardInterrupt):
+        UbuntuTeamMapping(
+            cache_dir=tmp_path, url=teams_url, policy=CachePolicy(max_age=0))
+
+    assert not (tmp_path / "teams.json.etag").exists()
+    team_mapping = UbuntuTeamMapping(
+        cache_dir=tmp_path, url=teams_url, policy=CachePolicy(offline=True))
+    assert team_mapping.mapping == mapping
+
+
+def test_init_without_etag(tmp_path, fake_server):
+    fake_server.routes["/teams.json"] = {"body": FAKE_MAPPING_RAW}
+    url = fake_server.url("/teams.json")
+    (tmp_path / "teams.json.etag").write_text("stale")
+
+    team_mapping = UbuntuTeamMapping(cache_dir=tmp_path, url=url)
+    assert team_mapping.mapping == FAKE_MAPPING
+    assert not (tmp_path / "teams.json.etag").exists()
+    assert team_mapping.version().startswith("mtime:")
@@ -1,8 +1,13 @@
+import gzip
+import lzma
 import pytest
 import tempfile
 import os
-from visual_excuses.yaml_parser import load_excuses
-from visual_excuses.excuse import Excuse
+from collections.abc import Iterator
+from visual_excuses.yaml_parser import (
+    excuse_from_entry, iter_excuses, load_excuses
+)
+from visual_excuses.excuse import Excuse, Regression
 import yaml
 
 VALID_YAML = {
@@ -63,3 +68,118 @@ def test_load_excuses_invalid_yaml():
         load_excuses(path)
 
     os.remove(path)
+
+
+@pytest.mark.parametrize("content", [
+    "",
+    "- item-name: bash\n",
+    "generated-date: 2025-03-14\n",
+    "sources: {}\n",
+    "sources:\n",
+])
+def test_load_excuses_malformed(tmp_path, content):
+    path = tmp_path / "update_excuses.yaml"
+    path.write_text(content)
+
+    with pytest.raises(ValueError):
+        load_excuses(path)
+
+
+def test_load_excuses_no_sources(tmp_path):
+    path = tmp_path / "update_excuses.yaml"
+    path.write_text("generated-date: 2025-03-14\nsources: []\n")
+
+    assert load_excuses(path) == []
+
+
+@pytest.mark.parametrize("sample", [
+    "samples/update_excuses_light.yaml.xz",
+    "samples/update_excuses.yaml.xz",
+])
+def test_iter_excuses_matches_whole_document_load(tmp_path, sample):
+    """Streaming the sample gives the same excuses as a full yaml.load"""
+    path = tmp_path / "update_excuses.yaml"
+    with lzma.open(sample) as source:
+        path.write_bytes(source.read())
+
+    with open(path) as file:
+        data = yaml.load(file, Loader=yaml.CSafeLoader)
+    expected = [excuse_from_entry(entry) for entry in data["sources"]]
+
+    excuses = iter_excuses(path)
+    assert isinstance(excuses, Iterator)
+    assert list(excuses) == expected
+
+
+def test_iter_excuses_is_lazy(tmp_path):
+    """The first excuse is available before the file is fully parsed"""
+    path = tmp_path / "update_excuses.yaml"
+    path.write_text(yaml.dump(VALID_YAML) + "trailer: [not valid YAML\n")
+
+    excuses = iter_excuses(path)
+    assert next(excuses).item_name == "example"
+    with pytest.raises(yaml.YAMLError):
+        next(excuses)
+
+
+@pytest.mark.parametrize("suffix, compress", [
+    (".yaml.xz", lzma.compress),
+    (".yaml.gz", gzip.compress),
+])
+def test_load_excuses_compressed(tmp_path, suffix, compress):
+    """Compressed files are decompressed on the fly while parsing"""
+    path = tmp_path / f"update_excuses{suffix}"
+    path.write_bytes(compress(yaml.dump(VALID_YAML).encode()))
+
+    excuses = load_excuses(path)
+
+    assert len(excuses) == 1
+    assert excuses[0].item_name == "example"
+
+
+AUTOPKGTEST_YAML = {
+    "sources": [
+        {
+            "item-name": "glibc",
+            "component": "main",
+            "new-version": "2.41",
+            "reason": ["autopkgtest"],
+            "excuses": [
+                "Migration status for glibc (2.40 to 2.41): Waiting for test "
+                "results, another package or too young",
+                "autopkgtest for systemd/257: amd64: Regression",
+            ],
+            "policy_info": {
+                "autopkgtest": {
+                    "systemd/257": {
+                        "amd64": [
+                            "REGRESSION", "https://log/amd64",
+                            "https://autopkgtest.ubuntu.com/packages/s/"
+                            "systemd/plucky/amd64",
+                        ],
+                        "arm64": ["PASS", "https://log/arm64", None],
+                    },
+                    "dbus/1.16": {
+                        "s390x": ["RUNNING", None, None],
+                    },
+                    "verdict": "REJECTED_PERMANENTLY",
+                },
+            },
+        }
+    ]
+}
+
+
+def test_load_excuses_classification(tmp_path):
+    """Autopkgtest regressions and waiting state are parsed at load time"""
+    path = tmp_path / "update_excuses.yaml"
+    path.write_text(yaml.dump(AUTOPKGTEST_YAML))
+
+    excuse, = load_excuses(path)
+
+    assert excuse.regressions == (
+        Regression("systemd", "amd64", "plucky"),)
+    assert excuse.regressions[0].url == \
+        "https://autopkgtest.ubuntu.com/packages/s/systemd/plucky/amd64"
+    assert excuse.waiting
+    assert excuse.status == "waiting"
@@ -0,0 +1,56 @@
+import configparser
+from pathlib import Path
+from typing import Optional, Tuple
+
+from .fetch import EXCUSES_MAX_AGE, TEAMS_MAX_AGE, CachePolicy
+
+# Section of the configuration file holding the cache policies, e.g.
+#
+#   [cache]
+#   excuses-max-age = 600
+#   teams-max-age = 604800
+#   offline = no
+CACHE_SECTION = "cache"
+
+
+def cache_policies(
+    config_file: Path, max_staleness: Optional[float] = None,
+    offline: bool = False
+) -> Tuple[CachePolicy, CachePolicy]:
+    """Combine the configuration file and command line cache policies.
+
+    Command line options win over the configuration file, which wins over
+    the server's Cache-Control headers. A missing file is no configuration.
+
+    Args:
+        config_file (Path): The configuration file.
+        max_staleness (float, optional): Seconds both the excuses and the
+        team mapping stay fresh, from --max-staleness.
+        offline (bool): Never check the caches with the servers.
+
+    Returns:
+        Tuple[CachePolicy, CachePolicy]: The excuses and team mapping
+        policies.
+
+    Raises:
+        ValueError: If the configuration file is not valid.
+    """
+    config = configparser.ConfigParser()
+    try:
+        config.read(config_file)
+        offline = offline or config.getboolean(
+            CACHE_SECTION, "offline", fallback=False)
+        policies = []
+        for name, default_max_age in (
+            ("excuses", EXCUSES_MAX_AGE),
+            ("teams", TEAMS_MAX_AGE),
+        ):
+            max_age = max_staleness
+            if max_age is None:
+                max_age = config.getfloat(
+                    CACHE_SECTION, f"{name}-max-age", fallback=None)
+            policies.append(CachePolicy(max_age, default_max_age, offline))
+    except (configparser.Error, ValueError) as e:
+        raise ValueError(f"Invalid configuration in {config_file}: {e}")
+    excuses, teams = policies
+    return excuses, teams
@@ -10,6 +10,13 @@ UBUNTU_TEAMS_MAPPING_URL = (
     "http://reqorts.qa.ubuntu.com/reports/m-r-package-team-mapping.json"
 )
 
+AUTOPKGTEST_URL = "https://autopkgtest.ubuntu.com"
+
 CACHE_HOME = os.environ.get('XDG_CACHE_HOME', '~/.cache')
 DEFAULT_CACHE_DIR = Path(CACHE_HOME).expanduser() / 'visual-excuses'
 del CACHE_HOME
+
+CONFIG_HOME = os.environ.get('XDG_CONFIG_HOME', '~/.config')
+DEFAULT_CONFIG_FILE = \
+    Path(CONFIG_HOME).expanduser() / 'visual-excuses' / 'config.ini'
+del CONFIG_HOME
@@ -0,0 +1,140 @@
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+from visual_excuses.excuse import Excuse
+
+
+class DependencyGraph:
+    """
+    DependencyGraph indexes which excuses hold up which: an excuse depends on
+    the package it is blocked by and on the packages it must migrate after.
+    Forward and reverse edges are built once, and every query runs in linear
+    time over the whole archive
+    """
+    def __init__(self, excuses: Iterable[Excuse]):
+        self.excuses: Dict[str, Excuse] = {}
+        self.depends: Dict[str, Tuple[str, ...]] = {}
+        self.dependents: Dict[str, List[str]] = {}
+
+        for excuse in excuses:
+            name = excuse.item_name
+            depends = [excuse.blocked_by] if excuse.blocked_by else []
+            depends.extend(excuse.migrate_after)
+            self.excuses[name] = excuse
+            self.depends[name] = tuple(dict.fromkeys(depends))
+            for dependency in self.depends[name]:
+                self.dependents.setdefault(dependency, []).append(name)
+
+    def blocking(self, package: str) -> List[Excuse]:
+        """Return the excuses transitively held up by a package
+
+        Args:
+            package (str): The package, which doesn't need to be an excuse
+
+        Returns:
+            List[Excuse]: The excuses held up, closest ones first
+        """
+        seen = {package}
+        queue = deque([package])
+        blocked = []
+        while queue:
+            for dependent in self.dependents.get(queue.popleft(), ()):
+                if dependent not in seen:
+                    seen.add(dependent)
+                    queue.append(dependent)
+                    blocked.append(self.excuses[dependent])
+        return blocked
+
+    def components(self) -> List[List[str]]:
+        """Group excuses depending on each other into strongly connected
+        components (Tarjan's algorithm, without recursion)
+
+        Returns:
+            List[List[str]]: The components, each one listed after every
+            component it depends on
+        """
+        index: Dict[str, int] = {}
+        low: Dict[str, int] = {}
+        stack: List[str] = []
+        on_stack = set()
+        components = []
+
+        def visit(name):
+            index[name] = low[name] = len(index)
+            stack.append(name)
+            on_stack.add(name)
+            return name, iter(self.depends[name])
+
+        for root in self.depends:
+            if root in index:
+                continue
+            work = [visit(root)]
+            while work:
+                name, depends = work[-1]
+                for dependency in depends:
+                    # Dependencies which aren't excuses can't be in a cycle
+                    if dependency not in self.depends:
+                        continue
+                    if dependency not in index:
+                        work.append(visit(dependency))
+                        break
+                    if dependency in on_stack:
+                        low[name] = min(low[name], index[dependency])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[name])
+                    if low[name] == index[name]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == name:
+                                break
+                        components.append(component)
+        return components
+
+    def cycles(self) -> List[List[str]]:
+        """Return the groups of excuses depending on each other"""
+        return [
+            component for component in self.components()
+            if len(component) > 1 or component[0] in self.depends[component[0]]
+        ]
+
+    def root_causes(self) -> List[Tuple[Excuse, int]]:
+        """Return the excuses at the bottom of dependency chains
+
+        Root causes don't depend on any other excuse (other than through a
+        cycle they are part of) but hold up at least one.
+
+        Returns:
+            List[Tuple[Excuse, int]]: The root causes and the length of the
+            longest chain of excuses they hold up, longest first
+        """
+        components = self.components()
+        component_of = {
+            name: i for i, component in enumerate(components)
+            for name in component
+        }
+
+        # Components are listed after their dependencies, walking them
+        # backwards handles every dependent before its dependencies
+        height = [0] * len(components)
+        is_root = [True] * len(components)
+        for i in reversed(range(len(components))):
+            for name in components[i]:
+                for dependency in self.depends[name]:
+                    j = component_of.get(dependency, i)
+                    if j != i:
+                        is_root[i] = False
+                        height[j] = max(height[j], height[i] + 1)
+
+        roots = [
+            (self.excuses[name], height[i])
+            for i, component in enumerate(components)
+            if is_root[i] and height[i] > 0
+            for name in component
+        ]
+        return sorted(roots, key=lambda root: -root[1])
@@ -1,24 +1,69 @@
-from dataclasses import dataclass, field
-from typing import List, Optional
+from dataclasses import dataclass
+import sys
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
+from .const import AUTOPKGTEST_URL
 
-@dataclass
+# Primary status of an excuse, see Excuse.classify()
+EXCUSE_STATUSES = (
+    "default",
+    "missing-builds",
+    "autopkgtest-depends",
+    "candidate",
+    "waiting",
+    "depends",
+)
+
+
+class Regression(NamedTuple):
+    """An autopkgtest regression triggered by an excuse
+
+    Only the release is kept rather than the log URLs, unique to each test
+    run, the link to the results of the test is built when needed.
+    """
+    package: str
+    arch: str
+    release: str = ""
+
+    @property
+    def url(self) -> str:
+        """Return the autopkgtest results page of the test, if known"""
+        if not self.release:
+            return ""
+        prefix = self.package[:4] if self.package.startswith("lib") \
+            else self.package[:1]
+        return (f"{AUTOPKGTEST_URL}/packages/{prefix}/{self.package}/"
+                f"{self.release}/{self.arch}")
+
+
+@dataclass(slots=True)
 class Excuse:
     """Represents an excuse for a package migration in Debian/Ubuntu UDD.
 
+    Excuses are slotted and the loader interns the strings repeated across
+    excuses (components, architectures, reason tags, package names) and
+    stores the read-only lists as tuples, to keep the whole archive compact
+    in memory.
+
     Attributes:
         item_name (str): The name of the package.
         component (str): The repository component (e.g., 'universe').
         old_version (str): The old version of the package.
         new_version (str): The new version of the package.
         missing_builds (List[str]): list of missing architectures builds
-        reasons (str): The reason migration has failed
+        reasons (Tuple[str]): The reasons migration has failed
         age (int): How many days have this package been blocked
         excuse_bug (str) : LaunchPad bug relevant to that excuse
         blocked_by (str) : excuse blocking this excuse to migrate
         blocked_bug (str) : explicit block bug preventing migration
-        migrate_after (List) : excuses that need to migrate before this excuse
-        excuses (List) : List of all excuses (autopkgtest and dependencies)
+        migrate_after (Tuple) : excuses that need to migrate before this one
+        excuses (Tuple) : All excuses (autopkgtest and dependencies)
+        regressions (Tuple[Regression]) : autopkgtest regressions triggered
+        waiting (bool) : autopkgtest results are still pending
+        source (str) : source package of the excuse, the item name when not
+            given
+        status (str) : primary status, one of EXCUSE_STATUSES, derived from
+            the other fields when not given
     """
 
     item_name: str
@@ -26,13 +71,46 @@ class Excuse:
     old_version: str
     new_version: str
     missing_builds: List[str]
-    reasons: List[str] = field(default_factory=list)
+    reasons: Tuple[str, ...] = ()
     age: Optional[int] = 0
     excuse_bug: Optional[str] = ""
     blocked_by: Optional[str] = ""
     block_bug: Optional[str] = ""
-    migrate_after: List[str] = field(default_factory=list)
-    excuses: List[str] = field(default_factory=list)
+    migrate_after: Tuple[str, ...] = ()
+    excuses: Tuple[str, ...] = ()
+    regressions: Tuple[Regression, ...] = ()
+    waiting: bool = False
+    source: str = ""
+    status: str = ""
+
+    def __post_init__(self):
+        if not self.source:
+            self.source = self.item_name
+        # Statuses are shared rather than copied in each excuse, e.g. when
+        # given back from a dictionary
+        self.status = sys.intern(self.status or self.classify())
+
+    def classify(self) -> str:
+        """Work out the primary status of the excuse
+
+        Later checks take precedence: an excuse waiting on a dependency is
+        reported as such even if its own tests regressed.
+
+        Returns:
+            str: One of EXCUSE_STATUSES
+        """
+        status = "default"
+        if self.ftbfs():
+            status = "missing-builds"
+        if self.regressions:
+            status = "autopkgtest-depends"
+        if not self.reasons:
+            status = "candidate"
+        if self.waiting:
+            status = "waiting"
+        if self.blocked_by or self.migrate_after:
+            status = "depends"
+        return status
 
     def ftbfs(self) -> bool:
         """Check if excuse is an FTBFS excuse
@@ -41,3 +119,15 @@ class Excuse:
             bool: True is the excuse is an FTBFS
         """
         return len(self.missing_builds) > 0 or 'no-binaries' in self.reasons
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the excuse as a JSON friendly dictionary
+
+        Returns:
+            Dict[str, Any]: The excuse fields, in declaration order
+        """
+        data = {}
+        for name in self.__slots__:
+            value = getattr(self, name)
+            data[name] = list(value) if isinstance(value, tuple) else value
+        return data
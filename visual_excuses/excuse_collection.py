@@ -0,0 +1,191 @@
+import re
+from bisect import bisect_left
+from typing import (
+    Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+)
+
+from visual_excuses import excuses_columns
+from visual_excuses.dependency_graph import DependencyGraph
+from visual_excuses.excuse import Excuse
+from visual_excuses.excuses_columns import ExcuseColumns
+from visual_excuses.ubuntu_teams import UbuntuTeamMapping
+
+# Characters of a regex that only ever match themselves in a package name
+_LITERAL = re.compile(r"(?:[a-z0-9_-]|\\[.+])*", re.IGNORECASE)
+
+
+def literal_prefix(pattern: str) -> str:
+    """Return the literal text a ^-anchored regex must start with
+
+    For instance "^libreoffice-.*" must start with "libreoffice-" while
+    "^python3?" only needs "python", as the last character is optional.
+    """
+    if not pattern.startswith("^") or "|" in pattern:
+        return ""
+    match = _LITERAL.match(pattern, 1)
+    literal = match.group().replace("\\", "")
+    if pattern[match.end():match.end() + 1] in ("?", "*", "{"):
+        literal = literal[:-1]
+    return literal.lower()
+
+
+class ExcuseCollection(Sequence[Excuse]):
+    """
+    ExcuseCollection keeps the excuses in their original order, indexed on
+    their item name and on their source and version so that lookups don't
+    need to scan the whole archive. The sorted names, the dependency graph
+    and the columnar store are only built the first time they are needed
+    """
+    def __init__(self, excuses: Iterable[Excuse] = ()):
+        self.excuses: List[Excuse] = list(excuses)
+        self.by_name: Dict[str, Excuse] = {
+            excuse.item_name: excuse for excuse in self.excuses
+        }
+        self.by_source: Dict[Tuple[str, str], Excuse] = {
+            (excuse.source, excuse.new_version): excuse
+            for excuse in self.excuses
+        }
+        self._names: Optional[List[str]] = None
+        self._positions: Optional[Dict[str, int]] = None
+        self._graph: Optional[DependencyGraph] = None
+        self._columns: Optional[ExcuseColumns] = None
+
+    def __getitem__(self, index: Union[int, slice]):
+        return self.excuses[index]
+
+    def __len__(self) -> int:
+        return len(self.excuses)
+
+    def __iter__(self) -> Iterator[Excuse]:
+        return iter(self.excuses)
+
+    def __reversed__(self) -> Iterator[Excuse]:
+        return reversed(self.excuses)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ExcuseCollection):
+            other = other.excuses
+        return self.excuses == other
+
+    def get(self, name: str) -> Optional[Excuse]:
+        """Return the excuse of a package, if any"""
+        return self.by_name.get(name)
+
+    def find(self, source: str, version: str) -> Optional[Excuse]:
+        """Return the excuse for a version of a source package, if any"""
+        return self.by_source.get((source, version))
+
+    @property
+    def names(self) -> List[str]:
+        """The package names, sorted"""
+        if self._names is None:
+            self._names = sorted(self.by_name)
+        return self._names
+
+    @property
+    def positions(self) -> Dict[str, int]:
+        """The position of each package in the collection"""
+        if self._positions is None:
+            self._positions = {
+                excuse.item_name: index
+                for index, excuse in enumerate(self.excuses)
+            }
+        return self._positions
+
+    @property
+    def graph(self) -> DependencyGraph:
+        """The dependency graph of the excuses"""
+        if self._graph is None:
+            self._graph = DependencyGraph(self.excuses)
+        return self._graph
+
+    def columns(
+        self, teams: Optional[UbuntuTeamMapping], build: bool = True
+    ) -> Optional[ExcuseColumns]:
+        """Return the excuses as columns, with their default team
+
+        Building the columns costs a few passes over the excuses, which only
+        pays off when they are queried several times.
+
+        Args:
+            teams (UbuntuTeamMapping): The team mapping of the team column.
+            build (bool): Whether to build the columns if they aren't yet.
+
+        Returns:
+            Optional[ExcuseColumns]: The columnar store, or None when NumPy
+            isn't installed or the columns aren't built.
+        """
+        if self._columns is not None and self._columns.teams is teams:
+            return self._columns
+        if not build or not excuses_columns.available():
+            return None
+        self._columns = ExcuseColumns(self.excuses, teams)
+        return self._columns
+
+    def with_prefix(self, prefix: str) -> List[Excuse]:
+        """Return the excuses of the packages starting with prefix
+
+        Args:
+            prefix (str): The start of the package names.
+
+        Returns:
+            List[Excuse]: The matching excuses, sorted by name.
+        """
+        names = self.names
+        matches = []
+        for i in range(bisect_left(names, prefix), len(names)):
+            if not names[i].startswith(prefix):
+                break
+            matches.append(self.by_name[names[i]])
+        return matches
+
+    def matching(self, pattern: str) -> List[Excuse]:
+        """Return the excuses of the packages matching a regex
+
+        The search is case-insensitive, like --name. Patterns anchored with
+        a literal prefix, e.g. "^linux-", only look at the names starting
+        with that prefix.
+
+        Args:
+            pattern (str): The regex to search package names with.
+
+        Returns:
+            List[Excuse]: The matching excuses, in their original order.
+
+        Raises:
+            re.error: If the pattern isn't a valid regex.
+        """
+        search = re.compile(pattern, re.IGNORECASE).search
+        prefix = literal_prefix(pattern)
+        if not prefix:
+            return [e for e in self.excuses if search(e.item_name) is not None]
+        matches = [
+            e for e in self.with_prefix(prefix)
+            if search(e.item_name) is not None
+        ]
+        positions = self.positions
+        matches.sort(key=lambda e: positions[e.item_name])
+        return matches
+
+    def neighbourhood(self, name: str) -> Dict[str, List[str]]:
+        """Return the direct dependencies and dependents of a package
+
+        Args:
+            name (str): The package name.
+
+        Returns:
+            Dict[str, List[str]]: The packages it "depends" on, and the
+            excuses it holds up ("dependents").
+        """
+        graph = self.graph
+        return {
+            "depends": list(graph.depends.get(name, ())),
+            "dependents": list(graph.dependents.get(name, ())),
+        }
+
+
+def as_collection(excuses: Iterable[Excuse]) -> ExcuseCollection:
+    """Return the excuses as an ExcuseCollection, indexing them if needed"""
+    if isinstance(excuses, ExcuseCollection):
+        return excuses
+    return ExcuseCollection(excuses)
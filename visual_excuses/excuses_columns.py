@@ -0,0 +1,190 @@
+from typing import (
+    Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence
+)
+
+from visual_excuses.excuse import Excuse
+from visual_excuses.ubuntu_teams import UbuntuTeamMapping
+
+# NumPy is optional: without it the excuses are filtered and aggregated one
+# Excuse at a time. It is only imported once columns are needed
+numpy = None
+_numpy_missing = False
+
+
+def available() -> bool:
+    """Whether NumPy is installed and the columnar store can be used"""
+    global numpy, _numpy_missing
+    if numpy is None and not _numpy_missing:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover
+            _numpy_missing = True
+    return numpy is not None
+
+
+class Categorical(NamedTuple):
+    """A column of strings stored as codes into the distinct values"""
+    names: List[str]
+    codes: "numpy.ndarray"
+
+    @classmethod
+    def encode(cls, values: Iterable[str], size: int) -> "Categorical":
+        categories: Dict[str, int] = {}
+        codes = numpy.fromiter(
+            (categories.setdefault(v, len(categories)) for v in values),
+            dtype=numpy.int32, count=size)
+        return cls(list(categories), codes)
+
+    def equals(self, value: str) -> "numpy.ndarray":
+        """Return the mask of the rows holding value"""
+        try:
+            return self.codes == self.names.index(value)
+        except ValueError:
+            return numpy.zeros(len(self.codes), dtype=bool)
+
+    def counts(self, mask: Optional["numpy.ndarray"] = None) -> Dict[str, int]:
+        """Count the rows holding each value, among the masked rows"""
+        codes = self.codes if mask is None else self.codes[mask]
+        counts = numpy.bincount(codes, minlength=len(self.names))
+        return {
+            name: int(count)
+            for name, count in zip(self.names, counts) if count
+        }
+
+
+class MultiCategorical(NamedTuple):
+    """A column holding several strings per row, stored as codes into the
+    distinct values along with the row each code belongs to"""
+    names: List[str]
+    codes: "numpy.ndarray"
+    rows: "numpy.ndarray"
+    size: int
+
+    @classmethod
+    def encode(
+        cls, values: Iterable[Iterable[str]], size: int
+    ) -> "MultiCategorical":
+        categories: Dict[str, int] = {}
+        codes = []
+        rows = []
+        for row, row_values in enumerate(values):
+            for value in row_values:
+                codes.append(categories.setdefault(value, len(categories)))
+                rows.append(row)
+        return cls(
+            list(categories),
+            numpy.array(codes, dtype=numpy.int32),
+            numpy.array(rows, dtype=numpy.int32),
+            size)
+
+    def contains(self, value: str) -> "numpy.ndarray":
+        """Return the mask of the rows holding value"""
+        mask = numpy.zeros(self.size, dtype=bool)
+        if value in self.names:
+            mask[self.rows[self.codes == self.names.index(value)]] = True
+        return mask
+
+    def counts(self, mask: Optional["numpy.ndarray"] = None) -> Dict[str, int]:
+        """Count the values held by the masked rows"""
+        codes = self.codes if mask is None else self.codes[mask[self.rows]]
+        counts = numpy.bincount(codes, minlength=len(self.names))
+        return {
+            name: int(count)
+            for name, count in zip(self.names, counts) if count
+        }
+
+
+class ExcuseColumns:
+    """
+    ExcuseColumns stores the excuses column by column as NumPy arrays, so
+    that filtering and aggregating the whole archive are vectorized mask
+    operations rather than Python loops over Excuse objects. Ages are a
+    numeric array, and components, teams, statuses, reasons, missing builds
+    and autopkgtest regressions are categorical codes.
+
+    Rows follow the order of the excuses the columns were built from.
+    """
+    def __init__(
+        self, excuses: Sequence[Excuse],
+        teams: Optional[UbuntuTeamMapping] = None
+    ):
+        if not available():
+            raise ImportError("ExcuseColumns require NumPy")
+        size = len(excuses)
+        self.size = size
+        self.teams = teams
+        self.names = [e.item_name for e in excuses]
+        self.has_age = numpy.fromiter(
+            (e.age is not None for e in excuses), dtype=bool, count=size)
+        self.age = numpy.fromiter(
+            (e.age or 0 for e in excuses), dtype=numpy.int64, count=size)
+        self.with_bug = numpy.fromiter(
+            (bool(e.excuse_bug) for e in excuses), dtype=bool, count=size)
+        self.waiting = numpy.fromiter(
+            (e.waiting for e in excuses), dtype=bool, count=size)
+        self.ftbfs = numpy.fromiter(
+            (e.ftbfs() for e in excuses), dtype=bool, count=size)
+
+        self.component = Categorical.encode(
+            (e.component for e in excuses), size)
+        self.status = Categorical.encode((e.status for e in excuses), size)
+        default_team = teams.default_team if teams else lambda name: ""
+        self.team = Categorical.encode(map(default_team, self.names), size)
+
+        self.reasons = MultiCategorical.encode(
+            (e.reasons for e in excuses), size)
+        self.missing_builds = MultiCategorical.encode(
+            (e.missing_builds for e in excuses), size)
+        self.regressed_test = MultiCategorical.encode(
+            ((r.package for r in e.regressions) for e in excuses), size)
+        self.regressed_arch = MultiCategorical.encode(
+            ((r.arch for r in e.regressions) for e in excuses), size)
+
+    def select_names(
+        self, search: Callable[[str], object]
+    ) -> "numpy.ndarray":
+        """Return the mask of the rows whose name is found by search"""
+        return numpy.fromiter(
+            (search(name) is not None for name in self.names),
+            dtype=bool, count=self.size)
+
+    def indices(self, mask: "numpy.ndarray") -> List[int]:
+        """Return the rows selected by a mask, in order"""
+        return numpy.flatnonzero(mask).tolist()
+
+    def ages(self, mask: Optional["numpy.ndarray"] = None) -> "numpy.ndarray":
+        """Return the known ages of the masked rows"""
+        known = self.has_age if mask is None else self.has_age & mask
+        return self.age[known]
+
+    def age_histogram(
+        self, bins: Sequence[int], mask: Optional["numpy.ndarray"] = None
+    ) -> List[int]:
+        """Count the masked excuses by age
+
+        Args:
+            bins (Sequence[int]): The increasing lower bounds of the age
+            ranges, e.g. (0, 7, 30) for under a week, under a month and
+            older.
+
+        Returns:
+            List[int]: The number of excuses in each age range. Ages under
+            the first bound are left out.
+        """
+        ages = self.ages(mask)
+        ranges = numpy.searchsorted(bins, ages, side="right") - 1
+        counts = numpy.bincount(ranges[ranges >= 0], minlength=len(bins))
+        return counts.tolist()
+
+    def ftbfs_rates(
+        self, mask: Optional["numpy.ndarray"] = None
+    ) -> Dict[str, float]:
+        """Return the share of the masked excuses missing builds on each
+        architecture"""
+        total = self.size if mask is None else int(mask.sum())
+        if not total:
+            return {}
+        return {
+            arch: count / total
+            for arch, count in self.missing_builds.counts(mask).items()
+        }
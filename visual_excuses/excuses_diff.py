@@ -0,0 +1,81 @@
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from .excuse import Excuse
+from .snapshot import read_snapshot, write_snapshot
+
+LAST_SEEN = "excuse.last-seen.pickle"
+LAST_SEEN_KEY = "last-seen"
+
+
+def diff_excuses(
+    old: Iterable[Excuse], new: Iterable[Excuse]
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Computes what changed between two lists of excuses.
+
+    Excuses are matched on their item_name and new_version, so a new upload
+    of a package shows as the old version removed and the new one added.
+    Runs in linear time over both lists.
+
+    Args:
+        old (Iterable[Excuse]): The previous excuses.
+        new (Iterable[Excuse]): The current excuses.
+
+    Returns:
+        Dict[str, List[Dict[str, Any]]]: The "added" and "removed" excuses,
+        and the "changed" ones with the [old, new] values of each field
+        that changed.
+    """
+    previous = {(e.item_name, e.new_version): e for e in old}
+    added = []
+    changed = []
+
+    for excuse in new:
+        before = previous.pop((excuse.item_name, excuse.new_version), None)
+        if before is None:
+            added.append(excuse.to_dict())
+            continue
+
+        before, after = before.to_dict(), excuse.to_dict()
+        changes = {
+            name: [value, after[name]]
+            for name, value in before.items() if value != after[name]
+        }
+        if changes:
+            changed.append({
+                "item_name": excuse.item_name,
+                "new_version": excuse.new_version,
+                "changes": changes,
+            })
+
+    return {
+        "added": added,
+        "removed": [excuse.to_dict() for excuse in previous.values()],
+        "changed": changed,
+    }
+
+
+def last_seen_path(cache_dir: Path, key: str = "") -> Path:
+    """Return where the excuses last seen with the filters of key are kept"""
+    if not key:
+        return cache_dir / LAST_SEEN
+    digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+    return cache_dir / f"excuse.last-seen.{digest}.pickle"
+
+
+def load_last_seen(
+    cache_dir: Path, key: str = ""
+) -> Optional[List[Excuse]]:
+    """Load the excuses recorded by the last --since-last run with the same
+    filters, if any"""
+    return read_snapshot(
+        last_seen_path(cache_dir, key), f"{LAST_SEEN_KEY} {key}".rstrip())
+
+
+def save_last_seen(cache_dir: Path, excuses: List[Excuse], key: str = ""):
+    """Record the excuses the next --since-last run with the same filters
+    will compare with"""
+    write_snapshot(
+        last_seen_path(cache_dir, key), f"{LAST_SEEN_KEY} {key}".rstrip(),
+        list(excuses))
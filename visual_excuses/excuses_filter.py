@@ -1,79 +1,438 @@
 from visual_excuses.excuse import Excuse
+from visual_excuses.excuse_collection import ExcuseCollection, as_collection
+from visual_excuses.excuses_columns import ExcuseColumns
+from visual_excuses.excuses_diff import (
+    diff_excuses, load_last_seen, save_last_seen
+)
+from visual_excuses.excuses_json import write_json, write_ndjson
+from visual_excuses.excuses_stats import (
+    column_stats, excuse_stats, render_stats
+)
 from visual_excuses.ubuntu_teams import UbuntuTeamMapping
-from visual_excuses.table_visual import render_excuses_table, \
-    render_excuses_markdown
+from visual_excuses.table_visual import render_excuses_table, write_excuses
 
-from typing import List
+from itertools import islice
+from typing import (
+    Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+)
 
 import json
 import re
+import sys
 
+# The ExcusesParser flags compile_filter() and compile_mask() select
+# excuses with
+FILTER_OPTIONS = (
+    "with_bugs", "waiting", "status", "component", "min_age", "max_age",
+    "ftbfs", "regressed_test", "regressed_arch", "team", "name",
+)
 
-def filter_excuses(excuses: List[Excuse], args, teams: UbuntuTeamMapping):
-    if args.inspect:
-        excuse = next(
-            (e for e in excuses if e.item_name == args.inspect), None
-        )
-        if excuse:
-            print(render_excuses_table([excuse]))
-            print(json.dumps(excuse.__dict__, indent=2))
-            return []
-        else:
-            print(f"Excuse {args.inspect} can't be found in excuses list")
-            return []
 
-    if args.ftbfs:
-        excuses = [e for e in excuses if e.ftbfs()]
+def team_filter(args, teams: UbuntuTeamMapping) -> str:
+    """Return the --team argument, once checked against the mapping"""
+    if args.team not in teams.mapping:
+        raise ValueError(f"Team {args.team} is not a valid Ubuntu Team")
+    return args.team
+
+
+def name_filter(args) -> Callable[[str], Optional[re.Match]]:
+    """Return the search function of the --name regex"""
+    try:
+        return re.compile(args.name, re.IGNORECASE).search
+    except re.error as e:
+        raise ValueError(f"Invalid regex pattern: {e}") from e
+
+
+def name_matches(excuses: ExcuseCollection, args) -> List[Excuse]:
+    """Return the excuses matching the --name regex, looked up through the
+    sorted names of the collection"""
+    try:
+        return excuses.matching(args.name)
+    except re.error as e:
+        raise ValueError(f"Invalid regex pattern: {e}") from e
+
+
+def filter_key(args) -> str:
+    """Describe the filtering flags that are set, e.g. to key what
+    --since-last saw with them"""
+    options = {
+        option: getattr(args, option) for option in FILTER_OPTIONS
+        if getattr(args, option, None) not in (None, False)
+    }
+    return json.dumps(options, sort_keys=True) if options else ""
+
+
+def compile_filter(
+    args, teams: UbuntuTeamMapping
+) -> Optional[Callable[[Excuse], bool]]:
+    """Compile the filtering flags into a single predicate.
+
+    Checks are ordered from the cheapest (attribute tests) to the most
+    expensive (team lookup, regex search) so that most excuses are rejected
+    early.
+
+    Args:
+        args: The parsed ExcusesParser arguments.
+        teams (UbuntuTeamMapping): The team mapping used by --team.
+
+    Returns:
+        Optional[Callable[[Excuse], bool]]: The predicate, or None when no
+        filtering flag is set.
+
+    Raises:
+        ValueError: If the team is unknown or the name regex is invalid.
+    """
+    checks = []
 
     if args.with_bugs:
-        excuses = [e for e in excuses if e.excuse_bug]
+        checks.append(lambda e: bool(e.excuse_bug))
+
+    if args.waiting:
+        checks.append(lambda e: e.waiting)
+
+    if args.status:
+        status = args.status
+        checks.append(lambda e: e.status == status)
+
+    if args.component:
+        component = args.component
+        checks.append(lambda e: e.component == component)
 
     if args.min_age is not None:
-        excuses = [
-            e for e in excuses if e.age is not None and e.age >= args.min_age
-        ]
+        min_age = args.min_age
+        checks.append(lambda e: e.age is not None and e.age >= min_age)
 
     if args.max_age is not None:
-        excuses = [
-            e for e in excuses if e.age is not None and e.age <= args.max_age
-        ]
+        max_age = args.max_age
+        checks.append(lambda e: e.age is not None and e.age <= max_age)
+
+    if args.ftbfs:
+        checks.append(Excuse.ftbfs)
+
+    if args.regressed_test:
+        test = args.regressed_test
+        checks.append(
+            lambda e: any(r.package == test for r in e.regressions))
+
+    if args.regressed_arch:
+        arch = args.regressed_arch
+        checks.append(lambda e: any(r.arch == arch for r in e.regressions))
 
     if args.team:
-        if args.team in teams.mapping:
-            excuses = [
-                e for e in excuses
-                if teams.default_team(e.item_name) == args.team
-            ]
-        else:
-            print(f"Team {args.team} is not a valid Ubuntu Team")
-            return []
+        team = team_filter(args, teams)
+        default_team = teams.default_team
+        checks.append(lambda e: default_team(e.item_name) == team)
+
+    if args.name:
+        search = name_filter(args)
+        checks.append(lambda e: search(e.item_name) is not None)
+
+    if not checks:
+        return None
+    if len(checks) == 1:
+        return checks[0]
+    return lambda e: all(check(e) for check in checks)
+
+
+def compile_mask(args, teams: UbuntuTeamMapping, columns: ExcuseColumns):
+    """Compile the filtering flags into a mask over the excuse columns.
+
+    This is the vectorized equivalent of compile_filter(), selecting the
+    same excuses.
+
+    Args:
+        args: The parsed ExcusesParser arguments.
+        teams (UbuntuTeamMapping): The team mapping used by --team.
+        columns (ExcuseColumns): The excuses, as columns.
+
+    Returns:
+        Optional[numpy.ndarray]: The boolean mask of the selected excuses,
+        or None when no filtering flag is set.
+
+    Raises:
+        ValueError: If the team is unknown or the name regex is invalid.
+    """
+    masks = []
+
+    if args.with_bugs:
+        masks.append(columns.with_bug)
+
+    if args.waiting:
+        masks.append(columns.waiting)
+
+    if args.status:
+        masks.append(columns.status.equals(args.status))
 
     if args.component:
+        masks.append(columns.component.equals(args.component))
+
+    if args.min_age is not None:
+        masks.append(columns.has_age & (columns.age >= args.min_age))
+
+    if args.max_age is not None:
+        masks.append(columns.has_age & (columns.age <= args.max_age))
+
+    if args.ftbfs:
+        masks.append(columns.ftbfs)
+
+    if args.regressed_test:
+        masks.append(columns.regressed_test.contains(args.regressed_test))
+
+    if args.regressed_arch:
+        masks.append(columns.regressed_arch.contains(args.regressed_arch))
+
+    if args.team:
+        masks.append(columns.team.equals(team_filter(args, teams)))
+
+    if args.name:
+        search = name_filter(args)
+        masks.append(columns.select_names(search))
+
+    if not masks:
+        return None
+    mask = masks[0]
+    for other in masks[1:]:
+        mask = mask & other
+    return mask
+
+
+def select_excuses(
+    excuses: Iterable[Excuse], args, teams: UbuntuTeamMapping
+) -> Iterator[Excuse]:
+    """Lazily apply the filtering, --limit and --reverse flags.
+
+    Excuses are filtered in a single pass, and with --limit the iteration
+    stops as soon as enough excuses matched. An ExcuseCollection whose
+    columns are built is filtered with vectorized masks instead.
+
+    Args:
+        excuses (Iterable[Excuse]): The excuses to filter.
+        args: The parsed ExcusesParser arguments.
+        teams (UbuntuTeamMapping): The team mapping used by --team.
+
+    Returns:
+        Iterator[Excuse]: The selected excuses.
+
+    Raises:
+        ValueError: If the team is unknown or the name regex is invalid.
+    """
+    selected = None
+
+    # Indexed excuses are filtered with vectorized masks once their columns
+    # are built, which only the query server does: a single query costs less
+    # than importing NumPy and building the columns
+    if isinstance(excuses, ExcuseCollection):
+        columns = excuses.columns(teams, build=False)
+        mask = compile_mask(args, teams, columns) if columns else None
+        if mask is not None:
+            indices = columns.indices(mask)
+            if args.reverse and not args.limit:
+                indices.reverse()
+            selected = map(excuses.__getitem__, indices)
+
+    if selected is None:
+        predicate = compile_filter(args, teams)
+
+        # Regexes anchored on a literal prefix only scan the names starting
+        # with it
+        if isinstance(excuses, ExcuseCollection) and args.name:
+            excuses = name_matches(excuses, args)
+
+        # Without a limit, reversing the selection is the same as selecting
+        # from the reversed excuses
+        if args.reverse and not args.limit:
+            try:
+                excuses = reversed(excuses)
+            except TypeError:
+                excuses = reversed(list(excuses))
+
+        selected = filter(predicate, excuses) if predicate else iter(excuses)
+
+    if args.limit:
+        selected = islice(selected, args.limit)
+        if args.reverse:
+            selected = reversed(list(selected))
+
+    return selected
+
+
+def summarize_excuses(
+    excuses: Iterable[Excuse], args, teams: UbuntuTeamMapping
+) -> Dict[str, Any]:
+    """Compute the --stats summary of the selected excuses.
+
+    The summary is computed with the columns of an ExcuseCollection when
+    they are built, as in the query server, and in one pass over the
+    selected excuses otherwise.
+
+    Raises:
+        ValueError: If the team is unknown or the name regex is invalid.
+    """
+    if isinstance(excuses, ExcuseCollection) and not (
+            args.limit or args.reverse):
+        columns = excuses.columns(teams, build=False)
+        if columns is not None:
+            mask = compile_mask(args, teams, columns)
+            return column_stats(columns, excuses, mask, args.top)
+    return excuse_stats(select_excuses(excuses, args, teams), teams, args.top)
+
+
+def render_summary(stats: Dict[str, Any], args) -> str:
+    """Render the --stats summary as JSON, Markdown or tables"""
+    if args.json:
+        return json.dumps(stats, indent=2)
+    return render_stats(stats, "github" if args.md else "fancy_outline")
+
+
+def query_dependencies(excuses: List[Excuse], args) -> List[Excuse]:
+    """Narrow the excuses down with the --blocking and --root-causes flags.
+
+    Args:
+        excuses (List[Excuse]): All the excuses.
+        args: The parsed ExcusesParser arguments.
+
+    Returns:
+        List[Excuse]: The excuses held up by the --blocking package, closest
+        first, and/or the root causes, longest dependency chains first.
+    """
+    if not (args.blocking or args.root_causes):
+        return excuses
+
+    graph = as_collection(excuses).graph
+    if args.blocking:
+        excuses = graph.blocking(args.blocking)
+    if args.root_causes:
+        held_up = {e.item_name for e in excuses} if args.blocking else None
         excuses = [
-            e for e in excuses if e.component == args.component
+            excuse for excuse, _ in graph.root_causes()
+            if held_up is None or excuse.item_name in held_up
         ]
+    return excuses
 
-    if args.name:
+
+def inspect_excuses(
+    excuses: ExcuseCollection, names: List[str]
+) -> Tuple[List[Excuse], List[str]]:
+    """Look the --inspect packages up, by item name or SOURCE/VERSION
+
+    Returns:
+        Tuple[List[Excuse], List[str]]: The excuses found, and the names
+        that have none.
+    """
+    found: List[Excuse] = []
+    missing: List[str] = []
+    for name in dict.fromkeys(names):
+        excuse = excuses.get(name)
+        if excuse is None and "/" in name:
+            excuse = excuses.find(*name.split("/", 1))
+        if excuse:
+            found.append(excuse)
+        else:
+            missing.append(name)
+    return found, missing
+
+
+def inspect_details(excuses: ExcuseCollection, excuse: Excuse) -> dict:
+    """Describe an inspected excuse along with its dependency neighbourhood"""
+    return {**excuse.to_dict(), **excuses.neighbourhood(excuse.item_name)}
+
+
+def inspect_neighbours(
+    excuses: ExcuseCollection, found: List[Excuse]
+) -> List[Excuse]:
+    """Return the excuses directly depending on, or depended on by, the
+    inspected ones"""
+    neighbours = {}
+    for excuse in found:
+        for names in excuses.neighbourhood(excuse.item_name).values():
+            for name in names:
+                neighbour = excuses.get(name)
+                if neighbour:
+                    neighbours[name] = neighbour
+    for excuse in found:
+        neighbours.pop(excuse.item_name, None)
+    return list(neighbours.values())
+
+
+def render_cycles(cycles: List[List[str]], args) -> str:
+    """Render the dependency cycles as JSON or one cycle per line"""
+    if args.json:
+        return json.dumps(cycles, indent=2)
+    return "\n".join(", ".join(cycle) for cycle in cycles)
+
+
+def filter_excuses(excuses: List[Excuse], args, teams: UbuntuTeamMapping):
+    if args.inspect:
+        excuses = as_collection(excuses)
+        found, missing = inspect_excuses(excuses, args.inspect)
+        for name in missing:
+            print(f"Excuse {name} can't be found in excuses list")
+        if found:
+            print(render_excuses_table(found))
+        neighbours = inspect_neighbours(excuses, found)
+        if neighbours:
+            print("Dependency neighbourhood:")
+            print(render_excuses_table(neighbours))
+        for excuse in found:
+            print(json.dumps(inspect_details(excuses, excuse), indent=2))
+        return []
+
+    if args.cycles:
+        cycles = as_collection(excuses).graph.cycles()
+        if cycles or args.json:
+            print(render_cycles(cycles, args))
+        return []
+
+    if args.since_last:
         try:
-            pattern = re.compile(args.name, re.IGNORECASE)
-            excuses = [e for e in excuses if pattern.search(e.item_name)]
-        except re.error as e:
-            print(f"Invalid regex pattern: {e}")
+            predicate = compile_filter(args, teams)
+        except ValueError as e:
+            print(e)
             return []
+        if predicate:
+            excuses = list(filter(predicate, excuses))
+        # Each set of filters has its own baseline, so that pollers using
+        # different filters don't reset each other's
+        key = filter_key(args)
+        previous = load_last_seen(args.cache_dir, key) or []
+        save_last_seen(args.cache_dir, excuses, key)
+        print(json.dumps(diff_excuses(previous, excuses), indent=2))
+        return []
 
-    if args.limit:
-        excuses = excuses[:args.limit]
+    excuses = query_dependencies(excuses, args)
+
+    if args.stats:
+        try:
+            stats = summarize_excuses(excuses, args, teams)
+        except ValueError as e:
+            print(e)
+            return []
+        print(render_summary(stats, args))
+        return []
 
-    if args.reverse:
-        excuses.reverse()
+    try:
+        selected = select_excuses(excuses, args, teams)
+    except ValueError as e:
+        print(e)
+        return []
 
     # Visualization json / markdown / visual / cli
+    # JSON is written as the excuses get selected
+    if args.ndjson:
+        write_ndjson(selected, sys.stdout)
+        return []
+
     if args.json:
-        print(json.dumps([e.__dict__ for e in excuses], indent=2))
+        write_json(selected, sys.stdout, None if args.compact else 2)
         return []
 
+    # Tables are written as the excuses get selected too
     if args.md:
-        print(render_excuses_markdown(excuses, args))
+        write_excuses(selected, sys.stdout, args, "markdown")
         return []
 
-    return excuses
+    if args.tsv:
+        write_excuses(selected, sys.stdout, args, "tsv")
+        return []
+
+    return list(selected)
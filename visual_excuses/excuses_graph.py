@@ -0,0 +1,285 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Tuple
+
+from visual_excuses.excuse import Excuse
+from visual_excuses.ubuntu_teams import UbuntuTeamMapping
+
+EXCUSE_REASON_COLORS = {
+    "default": "#FFFFFF",
+    "unknown": "#FFFFFF",
+    "autopkgtest": "#d4713b",
+    "autopkgtest-depends": "#DBBF60",
+    "missing-builds": "#CD6155",
+    "depends": "#FAD7A0",
+    "candidate": "#41AF25",
+    "waiting": "#7C7B7B"
+}
+
+TEAM_COLOR = "#8B8985"
+
+# How much detail the graph shows: every package, clusters of packages, or
+# clusters only when there are more than CLUSTER_EXCUSES packages
+GRAPH_DETAILS = ("auto", "clusters", "full")
+
+# Above this many excuses, the graph is drawn as clusters of packages by
+# team and status, which expand on demand
+CLUSTER_EXCUSES = 500
+
+# Physics is turned off on graphs of more nodes than this, laying them out
+# would keep the browser busy for minutes
+PHYSICS_NODES = 1000
+
+
+def lp_pkg_link(pkg: str) -> str:
+    return f"<a href=https://pad.lv/u/{pkg}>{pkg} </a>"
+
+
+def lp_bug_link(bug: str) -> str:
+    return f"<a href=https://bugs.launchpad.net/bugs/{bug}>{bug}</a>"
+
+
+def lp_team_link(team: str) -> str:
+    return f"<a href=https://launchpad.net/~{team}>{team}</a>"
+
+
+def html_title(excuse: Excuse) -> str:
+    """ libsepol (3.7-1 to 3.8-1) in proposed for 48 days """
+    title = lp_pkg_link(excuse.item_name)
+    usource = "https://launchpad.net/ubuntu/+source/" + excuse.item_name + "/"
+    old = f"<a href={usource}{excuse.old_version}>{excuse.old_version}</a>"
+    new = f"<a href={usource}{excuse.new_version}>{excuse.new_version}</a>"
+    day = "days" if excuse.age > 1 else "day"
+    title += f"({old} to {new}) in proposed for {excuse.age} {day}"
+
+    return title
+
+
+def autopkgtest_failures(excuse: Excuse) -> Dict[str, str]:
+    """Describe the autopkgtest regressions of an excuse, by test package"""
+    failures: Dict[str, List[str]] = {}
+    for regression in excuse.regressions:
+        arch = regression.arch
+        if regression.url:
+            arch = f"<a href={regression.url}>{arch}</a>"
+        failures.setdefault(regression.package, []).append(arch)
+    return {
+        pkg: f"autopkgtest for {pkg}: Regression on {', '.join(archs)}"
+        for pkg, archs in failures.items()
+    }
+
+
+@dataclass
+class ExcusesGraph:
+    """Directed graph of excuses, teams, autopkgtests and dependencies.
+
+    Nodes are kept in a dict keyed on their id, holding their vis.js
+    attributes (label, color, title...), so that membership checks and
+    attribute updates are O(1) while the graph is built.
+
+    Attributes:
+        nodes (Dict[str, Dict[str, Any]]): Node attributes, by node id
+        edges (List[Tuple[str, str]]): (source, target) node ids
+    """
+
+    nodes: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    edges: List[Tuple[str, str]] = field(default_factory=list)
+
+    def add_node(self, node_id: str, **attributes):
+        """Add a node unless it already exists"""
+        if node_id not in self.nodes:
+            self.nodes[node_id] = {
+                "id": node_id, "label": node_id, "shape": "dot", **attributes
+            }
+
+    def add_edge(self, source: str, target: str):
+        self.edges.append((source, target))
+
+
+def build_excuses_graph(
+    excuses: List[Excuse], teams: UbuntuTeamMapping
+) -> ExcusesGraph:
+    """Build the graph of the given excuses, linked to their teams.
+
+    Args:
+        excuses (List[Excuse]): The excuses to graph.
+        teams (UbuntuTeamMapping): Mapping of the excuses to their team.
+
+    Returns:
+        ExcusesGraph: The graph of the excuses.
+    """
+    graph = ExcusesGraph()
+    excuse_teams = [teams.default_team(excuse.item_name) for excuse in excuses]
+
+    # Creating teams Node, we will only display team with packages in proposed
+    for team in dict.fromkeys(excuse_teams):
+        if team:
+            graph.add_node(
+                team,
+                title=team,
+                color=TEAM_COLOR,
+                size=20,
+                shape='box')
+
+    # Creating excuses Nodes
+    for excuse, team in zip(excuses, excuse_teams):
+        reason = excuse.status
+        current = excuse.item_name
+
+        # details will contain all the information we need to display
+        details = html_title(excuse)
+
+        # If there's an excuse bug, we display the excuse bug
+        if excuse.excuse_bug:
+            bug = excuse.excuse_bug[5:]
+            details += f"<br/> - Excuses bug: #{lp_bug_link(bug)}"
+
+        # If the excuse has missing builds, we display them
+        if excuse.ftbfs():
+            # TODO if missing-builgs is empty here it means missing on all arch
+            details += f"<br/> - Missing builds : {excuse.missing_builds}"
+
+        # If there's autopkgtest failures we will collect and add them later
+        autopkg_failures = autopkgtest_failures(excuse)
+        if autopkg_failures:
+            details += "<br/> - Autopkgtest Regressions"
+
+        if not excuse.reasons:
+            details += "<br/> - <b>candidate</b>"
+
+        if excuse.waiting:
+            details += "<br/> - Autopkgtests In Progress"
+
+        # Packages blocked by another package, or that need to migrate after
+        # another package
+        depends = []
+        if excuse.blocked_by:
+            details += f"<br/> - is blocked by {excuse.blocked_by}"
+            depends.append(excuse.blocked_by)
+
+        if excuse.migrate_after:
+            for pkg in excuse.migrate_after:
+                details += f"<br/> - requires {pkg} to migrate"
+                depends.append(pkg)
+
+        # If there's an excuse bug, we display the excuse bug
+        if excuse.block_bug:
+            bug = excuse.block_bug[5:]
+            details += f"<br/> - Block bug: #{lp_bug_link(bug)}"
+
+        # Add the excuse to the graph
+        # The Node might have already been created as a depends
+        if current in graph.nodes:
+            graph.nodes[current]['title'] = details
+            graph.nodes[current]['color'] = EXCUSE_REASON_COLORS[reason]
+        else:
+            graph.add_node(
+                current,
+                color=EXCUSE_REASON_COLORS[reason],
+                title=details
+            )
+
+        # Link the excuse to the team appropriate team
+        if team:
+            graph.add_edge(team, current)
+
+        # If there's autopkgtest failure we will add them as well
+        for pkg, errors in autopkg_failures.items():
+            if pkg not in graph.nodes:
+                graph.add_node(
+                    pkg,
+                    color=EXCUSE_REASON_COLORS["autopkgtest"],
+                    title=errors
+                )
+                # We connect current package with its failed autopkgtest
+                graph.add_edge(current, pkg)
+            else:
+                graph.nodes[pkg]['title'] += f"<br/>{errors}"
+                graph.nodes[pkg]['color'] = EXCUSE_REASON_COLORS["autopkgtest"]
+
+        # Creating link to depends
+        for dep_package in depends:
+            graph.add_node(
+                dep_package,
+                color=EXCUSE_REASON_COLORS["default"],
+                title="Unknown"
+            )
+            graph.add_edge(current, dep_package)
+
+    return graph
+
+
+@dataclass
+class ExcuseCluster:
+    """The excuses of a team sharing a status, drawn as a single node until
+    expanded.
+
+    Attributes:
+        node_id (str): The id of the cluster node, "team/status"
+        team (str): The team of the excuses, empty for unassigned packages
+        status (str): The primary status of the excuses
+        excuses (List[Excuse]): The excuses of the cluster
+    """
+
+    node_id: str
+    team: str
+    status: str
+    excuses: List[Excuse] = field(default_factory=list)
+
+
+def cluster_excuses(
+    excuses: Iterable[Excuse], teams: UbuntuTeamMapping
+) -> Dict[str, ExcuseCluster]:
+    """Group excuses by team and status.
+
+    Returns:
+        Dict[str, ExcuseCluster]: The clusters, by node id, in the order of
+        their first excuse.
+    """
+    clusters: Dict[str, ExcuseCluster] = {}
+    for excuse in excuses:
+        team = teams.default_team(excuse.item_name)
+        # Package names never hold a "/", cluster ids can't clash with them
+        node_id = f"{team}/{excuse.status}"
+        cluster = clusters.get(node_id)
+        if cluster is None:
+            cluster = clusters[node_id] = ExcuseCluster(
+                node_id, team, excuse.status)
+        cluster.excuses.append(excuse)
+    return clusters
+
+
+def build_overview_graph(clusters: Iterable[ExcuseCluster]) -> ExcusesGraph:
+    """Build the level-of-detail graph of clustered excuses.
+
+    Teams link to one aggregate node per status of their excuses, sized and
+    labelled by the number of excuses they hold.
+    """
+    clusters = list(clusters)
+    sizes: Counter = Counter()
+    for cluster in clusters:
+        if cluster.team:
+            sizes[cluster.team] += len(cluster.excuses)
+
+    graph = ExcusesGraph()
+    for team, size in sizes.items():
+        graph.add_node(
+            team,
+            label=f"{team} ({size})",
+            title=f"{lp_team_link(team)}: {size} packages in proposed",
+            color=TEAM_COLOR,
+            size=20,
+            shape='box')
+
+    for cluster in clusters:
+        count = len(cluster.excuses)
+        graph.add_node(
+            cluster.node_id,
+            label=f"{cluster.status} ({count})",
+            title=f"{count} {cluster.status} packages, click to show them",
+            color=EXCUSE_REASON_COLORS[cluster.status],
+            value=count)
+        if cluster.team:
+            graph.add_edge(cluster.team, cluster.node_id)
+
+    return graph
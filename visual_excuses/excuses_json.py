@@ -0,0 +1,61 @@
+import json
+from typing import Iterable, Optional, TextIO
+
+from visual_excuses.excuse import Excuse
+
+
+def write_json(
+    excuses: Iterable[Excuse], out: TextIO, indent: Optional[int] = 2
+) -> int:
+    """Write excuses as a JSON array, one excuse at a time.
+
+    The output is the same as json.dumps() of the whole list, but nothing
+    but the current excuse is ever held in memory, and the first excuses
+    are written as soon as they are selected.
+
+    Args:
+        excuses (Iterable[Excuse]): The excuses to write.
+        out (TextIO): Where to write them.
+        indent (int, optional): The indentation, or None for compact JSON.
+
+    Returns:
+        int: The number of excuses written.
+    """
+    encode = json.JSONEncoder(indent=indent).encode
+    if indent is None:
+        opening, separator, closing = "[", ", ", "]"
+    else:
+        # Nested in the array, every line of an excuse is indented once more
+        margin = "\n" + " " * indent
+        opening, separator, closing = "[" + margin, "," + margin, "\n]"
+
+    count = 0
+    for excuse in excuses:
+        text = encode(excuse.to_dict())
+        if indent is not None:
+            text = text.replace("\n", margin)
+        out.write(separator if count else opening)
+        out.write(text)
+        count += 1
+    out.write(closing if count else "[]")
+    out.write("\n")
+    return count
+
+
+def write_ndjson(excuses: Iterable[Excuse], out: TextIO) -> int:
+    """Write excuses as newline delimited JSON, one excuse per line.
+
+    Args:
+        excuses (Iterable[Excuse]): The excuses to write.
+        out (TextIO): Where to write them.
+
+    Returns:
+        int: The number of excuses written.
+    """
+    encode = json.JSONEncoder().encode
+    count = 0
+    for excuse in excuses:
+        out.write(encode(excuse.to_dict()))
+        out.write("\n")
+        count += 1
+    return count
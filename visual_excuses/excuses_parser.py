@@ -1,18 +1,61 @@
 import argparse
 from pathlib import Path
 
-from .ubuntu_excuses_loader import DEFAULT_CACHE_DIR
+from .excuse import EXCUSE_STATUSES
+from .excuses_graph import GRAPH_DETAILS
+from .graph_export import GRAPH_FORMATS
+from .const import DEFAULT_CONFIG_FILE
+from .ubuntu_excuses_loader import CACHE_FORMATS, DEFAULT_CACHE_DIR
+
+
+def non_negative_int(value: str) -> int:
+    """argparse type of the counts, which can't be negative"""
+    try:
+        number = int(value)
+    except ValueError:
+        number = -1
+    if number < 0:
+        raise argparse.ArgumentTypeError(
+            f"expected a positive number or 0, got {value}")
+    return number
 
 
 class ExcusesParser:
-    def __init__(self):
+    """The command line arguments shared by ubuntu-excuses, visual-excuses
+    and the server queries, with the graph options of visual-excuses only
+    when graph is True"""
+    def __init__(self, graph: bool = False):
         self.parser = argparse.ArgumentParser(
             description="Ubuntu Excuses (Proposed Migration) Viewer")
 
         self.parser.add_argument(
             "--inspect",
             type=str,
-            help="Get details about a specific package"
+            nargs="+",
+            action="extend",
+            metavar="PACKAGE",
+            help="Get details about specific packages, or SOURCE/VERSION, "
+            "and their dependencies"
+        )
+
+        self.parser.add_argument(
+            "--blocking",
+            type=str,
+            metavar="PACKAGE",
+            help="Show only packages transitively held up by this package"
+        )
+
+        self.parser.add_argument(
+            "--root-causes",
+            action="store_true",
+            help="Show only packages at the bottom of dependency chains, "
+            "longest chains first"
+        )
+
+        self.parser.add_argument(
+            "--cycles",
+            action="store_true",
+            help="Show the groups of packages depending on each other"
         )
 
         self.parser.add_argument(
@@ -51,6 +94,33 @@ class ExcusesParser:
             help="Show only pacakges with associated excuse bugs"
         )
 
+        self.parser.add_argument(
+            "--status",
+            choices=EXCUSE_STATUSES,
+            help="Show only packages with this primary status"
+        )
+
+        self.parser.add_argument(
+            "--waiting",
+            action="store_true",
+            help="Show only packages waiting for autopkgtest results"
+        )
+
+        self.parser.add_argument(
+            "--regressed-test",
+            type=str,
+            metavar="PACKAGE",
+            help="Show only packages regressing this package's autopkgtests"
+        )
+
+        self.parser.add_argument(
+            "--regressed-arch",
+            type=str,
+            metavar="ARCH",
+            help="Show only packages with autopkgtest regressions on this "
+            "architecture"
+        )
+
         self.parser.add_argument(
             "--min-age",
             type=int,
@@ -67,7 +137,7 @@ class ExcusesParser:
 
         self.parser.add_argument(
             "--limit",
-            type=int,
+            type=non_negative_int,
             help="Limit the number of results shown"
         )
 
@@ -83,12 +153,54 @@ class ExcusesParser:
             help="Output in JSON format"
         )
 
+        self.parser.add_argument(
+            "--ndjson",
+            action="store_true",
+            help="Output in newline delimited JSON format, one package per "
+            "line"
+        )
+
+        self.parser.add_argument(
+            "--compact",
+            action="store_true",
+            help="Don't indent the --json output"
+        )
+
         self.parser.add_argument(
             "--md",
             action="store_true",
             help="Output as a Markdown table"
         )
 
+        self.parser.add_argument(
+            "--stats",
+            action="store_true",
+            help="Summarize the packages by team, component, reason, missing "
+            "build and age instead of listing them"
+        )
+
+        self.parser.add_argument(
+            "--top",
+            type=non_negative_int,
+            default=10,
+            metavar="N",
+            help="How many of the oldest packages --stats reports "
+            "(default: %(default)s)"
+        )
+
+        self.parser.add_argument(
+            "--tsv",
+            action="store_true",
+            help="Output as tab separated values"
+        )
+
+        self.parser.add_argument(
+            "--since-last",
+            action="store_true",
+            help="Output as JSON what was added, removed or changed since "
+            "the previous --since-last run with the same filters"
+        )
+
         self.parser.add_argument(
             "--cache-dir",
             type=Path,
@@ -98,6 +210,73 @@ class ExcusesParser:
             "(default: %(default)s)"
         )
 
+        self.parser.add_argument(
+            "--cache-format",
+            choices=CACHE_FORMATS,
+            default="yaml",
+            help="Keep the cached excuses decompressed (yaml), as downloaded "
+            "(xz) or recompressed for faster reads (gzip) "
+            "(default: %(default)s)"
+        )
+
+        self.parser.add_argument(
+            "--max-staleness",
+            type=float,
+            metavar="SECONDS",
+            help="Use the cached excuses and team mapping without checking "
+            "them with the servers until they are this old (default: "
+            "the config file, the servers' Cache-Control, or 5 minutes for "
+            "the excuses and a day for the team mapping)"
+        )
+
+        self.parser.add_argument(
+            "--offline",
+            action="store_true",
+            help="Only use the cached excuses and team mapping, never "
+            "touch the network"
+        )
+
+        self.parser.add_argument(
+            "--config",
+            type=Path,
+            default=DEFAULT_CONFIG_FILE,
+            metavar="FILE",
+            help="Configuration file, whose [cache] section can set "
+            "excuses-max-age, teams-max-age and offline "
+            "(default: %(default)s)"
+        )
+
+        if graph:
+            self.add_graph_arguments()
+
+    def add_graph_arguments(self):
+        """Add the options of how visual-excuses draws the graph"""
+        self.parser.add_argument(
+            "--graph-detail",
+            choices=GRAPH_DETAILS,
+            default="auto",
+            help="Draw every package, or clusters of packages by team and "
+            "status expanded on click, which keeps large graphs responsive. "
+            "auto only clusters large graphs (default: %(default)s)"
+        )
+
+        self.parser.add_argument(
+            "--graph-format",
+            choices=GRAPH_FORMATS,
+            default="html",
+            help="Draw the graph as an HTML page, or export it as node-link "
+            "JSON, GraphML or Graphviz DOT (default: %(default)s)"
+        )
+
+        self.parser.add_argument(
+            "--output",
+            type=str,
+            metavar="FILE",
+            help="Where to write the graph, - for stdout except in html "
+            "(default: excuses.html opened in a browser for html, stdout "
+            "otherwise)"
+        )
+
     def parse_args(self, argv=None):
         self.args = self.parser.parse_args(argv)
         return self.args
@@ -0,0 +1,314 @@
+# visual-excuses serve: keep the excuses and team mapping in memory and answer
+# ExcusesParser queries over a local HTTP or Unix socket API
+
+import argparse
+import io
+import json
+import socketserver
+import sys
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from .const import (
+    DEFAULT_CACHE_DIR, UBUNTU_EXCUSES_URL, UBUNTU_TEAMS_MAPPING_URL
+)
+from .excuse import Excuse
+from .excuse_collection import ExcuseCollection, as_collection
+from .excuses_filter import (
+    inspect_details, inspect_excuses, query_dependencies, render_cycles,
+    render_summary, select_excuses, summarize_excuses
+)
+from .excuses_json import write_ndjson
+from .excuses_parser import ExcusesParser
+from .fetch import CachePolicy, Fetcher
+from .table_visual import write_excuses
+from .ubuntu_excuses_loader import (
+    CACHE_FORMATS, CachedExcuses, load_cached_excuses
+)
+from .ubuntu_teams import UbuntuTeamMapping
+
+# Options that can't be used in queries, abbreviations included
+EXCLUDED_OPTIONS = (
+    "cache-dir", "cache-format", "config", "help", "max-staleness",
+    "offline", "since-last"
+)
+
+
+class QueryError(ValueError):
+    """Raised when a query can't be turned into ExcusesParser arguments"""
+
+
+def query_to_argv(query: str) -> List[str]:
+    """Convert an URL query string into ExcusesParser arguments.
+
+    Valueless parameters are flags, e.g. "team=foo&ftbfs" is converted to
+    ["--team=foo", "--ftbfs"].
+
+    Args:
+        query (str): The URL query string.
+
+    Returns:
+        List[str]: The corresponding command line arguments.
+
+    Raises:
+        QueryError: If the query uses an excluded option.
+    """
+    argv = []
+    for key, value in parse_qsl(query, keep_blank_values=True):
+        option = key.replace("_", "-")
+        if any(excluded.startswith(option) for excluded in EXCLUDED_OPTIONS):
+            raise QueryError(f"--{option} can't be used in queries")
+        argv.append(f"--{option}={value}" if value else f"--{option}")
+    return argv
+
+
+def parse_query(query: str):
+    """Parse an URL query string with ExcusesParser.
+
+    Raises:
+        QueryError: If the query is not valid.
+    """
+    def error(message):
+        raise QueryError(message)
+
+    parser = ExcusesParser()
+    parser.parser.error = error
+    return parser.parse_args(query_to_argv(query))
+
+
+class ExcusesService:
+    """
+    ExcusesService holds the excuses and team mapping currently served and
+    refreshes them from the local cache, which is itself only downloaded
+    again when the server side ETag changed. They are only loaded again
+    once the version of either cached file changed
+    """
+    def __init__(
+        self, cache_dir: Path = DEFAULT_CACHE_DIR,
+        url: str = UBUNTU_EXCUSES_URL, cache_format: str = "yaml",
+        teams_url: str = UBUNTU_TEAMS_MAPPING_URL
+    ):
+        self.cache_dir = cache_dir
+        self.url = url
+        self.teams_url = teams_url
+        self.cache_format = cache_format
+        self.excuses = ExcuseCollection()
+        self.teams: Optional[UbuntuTeamMapping] = None
+        self.loaded_at = 0.0
+        # Versions of the cached excuses and team mapping served, if known
+        self.version: Optional[Tuple[Optional[str], Optional[str]]] = None
+        self.lock = threading.Lock()
+        # Kept across refreshes, to reuse its connections
+        self.fetcher: Optional[Fetcher] = None
+
+    def set_data(
+        self, excuses: List[Excuse], teams: UbuntuTeamMapping,
+        version: Optional[Tuple[Optional[str], Optional[str]]] = None
+    ):
+        excuses = as_collection(excuses)
+        # Every query is filtered with the columns, build them upfront
+        excuses.columns(teams)
+        # Queries grab both references under the lock, so they never mix an
+        # old excuses list with a new mapping
+        with self.lock:
+            self.excuses = excuses
+            self.teams = teams
+            self.loaded_at = time.time()
+            self.version = version
+
+    def refresh(self):
+        """Reload the excuses and team mapping, downloading them if needed.
+
+        Parsing the excuses and building their columns is skipped while the
+        cached versions are the ones already served.
+        """
+        if self.fetcher is None:
+            self.fetcher = Fetcher()
+        # --refresh already says how often the excuses are checked
+        cache = CachedExcuses(
+            self.url, self.cache_dir, self.fetcher, self.cache_format,
+            CachePolicy(max_age=0))
+        cache.update()
+        teams = UbuntuTeamMapping(self.cache_dir, self.teams_url, self.fetcher)
+        version = (cache.version(), teams.version())
+        if version == self.version and None not in version:
+            return
+        self.set_data(load_cached_excuses(cache), teams, version)
+
+    def refresh_forever(self, interval: float, stop: threading.Event):
+        """Refresh every interval seconds until stop is set"""
+        while not stop.wait(interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Failed to refresh excuses: {e}", file=sys.stderr)
+
+    def query(self, path: str) -> Tuple[HTTPStatus, str, str]:
+        """Answer an HTTP GET path.
+
+        Args:
+            path (str): The request path, including the query string.
+
+        Returns:
+            Tuple[HTTPStatus, str, str]: The status, content type and body.
+        """
+        url = urlsplit(path)
+        with self.lock:
+            excuses, teams, loaded_at = \
+                self.excuses, self.teams, self.loaded_at
+
+        if url.path == "/health":
+            return HTTPStatus.OK, "application/json", json.dumps({
+                "excuses": len(excuses),
+                "loaded_at": loaded_at,
+            })
+        if url.path not in ("/", "/excuses"):
+            return HTTPStatus.NOT_FOUND, "text/plain", "Not found\n"
+
+        try:
+            args = parse_query(url.query)
+            return (HTTPStatus.OK, *render_query(excuses, args, teams))
+        except ValueError as e:
+            return HTTPStatus.BAD_REQUEST, "text/plain", f"{e}\n"
+
+
+def render_query(
+    excuses: ExcuseCollection, args, teams: UbuntuTeamMapping
+) -> Tuple[str, str]:
+    """Run a query and render it in the requested format.
+
+    Returns:
+        Tuple[str, str]: The content type and the rendered excuses.
+
+    Raises:
+        ValueError: If the filtering arguments are not valid.
+    """
+    if args.inspect:
+        selected, missing = inspect_excuses(excuses, args.inspect)
+        if missing:
+            raise ValueError(
+                f"Excuse {', '.join(missing)} can't be found in excuses list")
+    elif args.cycles:
+        cycles = excuses.graph.cycles()
+        if args.json:
+            return "application/json", json.dumps(cycles)
+        return "text/plain", render_cycles(cycles, args) + "\n"
+    elif args.stats:
+        excuses = query_dependencies(excuses, args)
+        stats = summarize_excuses(excuses, args, teams)
+        if args.json:
+            return "application/json", json.dumps(stats)
+        content_type = "text/markdown" if args.md else "text/plain"
+        return content_type, render_summary(stats, args) + "\n"
+    else:
+        excuses = query_dependencies(excuses, args)
+        selected = list(select_excuses(excuses, args, teams))
+
+    if args.ndjson:
+        output = io.StringIO()
+        write_ndjson(selected, output)
+        return "application/x-ndjson", output.getvalue()
+    if args.json:
+        if args.inspect:
+            return "application/json", json.dumps(
+                [inspect_details(excuses, e) for e in selected])
+        return "application/json", json.dumps(
+            [e.to_dict() for e in selected])
+    output = io.StringIO()
+    if args.md:
+        write_excuses(selected, output, args, "markdown")
+        return "text/markdown", output.getvalue()
+    if args.tsv:
+        write_excuses(selected, output, args, "tsv")
+        return "text/tab-separated-values", output.getvalue()
+    write_excuses(selected, output, args)
+    return "text/plain", output.getvalue()
+
+
+class ExcusesRequestHandler(BaseHTTPRequestHandler):
+    service: ExcusesService
+
+    def do_GET(self):
+        status, content_type, body = self.service.query(self.path)
+        content = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn,
+                     socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service: ExcusesService, host: str = "127.0.0.1",
+                port: int = 8000, socket_path: Optional[Path] = None):
+    """Create the HTTP server answering queries for service"""
+    handler = type(
+        "BoundExcusesRequestHandler", (ExcusesRequestHandler,),
+        {"service": service})
+    if socket_path:
+        socket_path.unlink(missing_ok=True)
+        return UnixHTTPServer(str(socket_path), handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="visual-excuses serve",
+        description="Serve Ubuntu Excuses queries from memory. Queries take "
+        "the same options as ubuntu-excuses, e.g. "
+        "/excuses?team=foundations-bugs&ftbfs&json")
+    parser.add_argument(
+        "--host", default="127.0.0.1",
+        help="Address to listen on (default: %(default)s)")
+    parser.add_argument(
+        "--port", type=int, default=8000,
+        help="Port to listen on (default: %(default)s)")
+    parser.add_argument(
+        "--socket", type=Path, metavar="PATH",
+        help="Listen on this Unix socket instead of TCP")
+    parser.add_argument(
+        "--refresh", type=float, default=300, metavar="SECONDS",
+        help="How often to check for new excuses (default: %(default)s)")
+    parser.add_argument(
+        "--cache-dir", type=Path, default=DEFAULT_CACHE_DIR, metavar="DIR",
+        help="The directory under which to cache the excuses data "
+        "(default: %(default)s)")
+    parser.add_argument(
+        "--cache-format", choices=CACHE_FORMATS, default="yaml",
+        help="How to keep the cached excuses (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    service = ExcusesService(
+        cache_dir=args.cache_dir, cache_format=args.cache_format)
+    service.refresh()
+
+    stop = threading.Event()
+    threading.Thread(
+        target=service.refresh_forever, args=(args.refresh, stop),
+        daemon=True).start()
+
+    server = make_server(service, args.host, args.port, args.socket)
+    print(f"Serving excuses on {args.socket or f'{args.host}:{args.port}'}",
+          file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+        if args.socket:
+            args.socket.unlink(missing_ok=True)
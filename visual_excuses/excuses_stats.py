@@ -0,0 +1,235 @@
+import heapq
+from bisect import bisect_left
+from collections import Counter
+from typing import (
+    TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence
+)
+
+from visual_excuses import excuses_columns
+from visual_excuses.excuse import Excuse
+from visual_excuses.excuses_columns import ExcuseColumns
+from visual_excuses.ubuntu_teams import UbuntuTeamMapping
+
+if TYPE_CHECKING:
+    import numpy
+
+# Age percentiles reported by --stats
+PERCENTILES = (50, 75, 90, 99)
+
+# Age ranges reported by --stats, by their lower bound in days
+AGE_RANGES = (0, 7, 30, 90)
+
+# How excuses without a team are counted
+NO_TEAM = "(no team)"
+
+
+def sorted_counts(counts: Dict[str, int]) -> Dict[str, int]:
+    """Order counts from the most to the least common, then by name"""
+    return dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+
+
+def percentile(ages: List[int], p: float) -> float:
+    """Linearly interpolated percentile of sorted ages, like NumPy's"""
+    position = (len(ages) - 1) * p / 100
+    below = int(position)
+    above = min(below + 1, len(ages) - 1)
+    return ages[below] + (ages[above] - ages[below]) * (position - below)
+
+
+def age_summary(ages: List[int]) -> Dict[str, Optional[float]]:
+    """Summarize sorted ages with their extremes, mean and percentiles"""
+    if not ages:
+        return {"min": None, "max": None, "mean": None, **{
+            f"p{p}": None for p in PERCENTILES
+        }}
+    return {
+        "min": ages[0],
+        "max": ages[-1],
+        "mean": round(sum(ages) / len(ages), 1),
+        **{f"p{p}": round(percentile(ages, p), 1) for p in PERCENTILES},
+    }
+
+
+def age_range_labels(bounds: Sequence[int]) -> List[str]:
+    """Name age ranges after their bounds, e.g. 0-6, 7-29 and 30+"""
+    return [
+        f"{low}-{high - 1}" for low, high in zip(bounds, bounds[1:])
+    ] + [f"{bounds[-1]}+"]
+
+
+def age_ranges(ages: List[int]) -> Dict[str, int]:
+    """Count sorted ages in each of AGE_RANGES"""
+    positions = [bisect_left(ages, low) for low in AGE_RANGES]
+    counts = [
+        above - below
+        for below, above in zip(positions, positions[1:] + [len(ages)])
+    ]
+    return dict(zip(age_range_labels(AGE_RANGES), counts))
+
+
+def sorted_rates(rates: Dict[str, float]) -> Dict[str, float]:
+    """Round the share of excuses missing builds on each architecture, from
+    the highest"""
+    return {
+        arch: round(rate, 4) for arch, rate in sorted(
+            rates.items(), key=lambda item: (-item[1], item[0]))
+    }
+
+
+def oldest_entry(excuse: Excuse, team: str) -> Dict[str, Any]:
+    return {
+        "item_name": excuse.item_name,
+        "age": excuse.age,
+        "status": excuse.status,
+        "team": team,
+    }
+
+
+def excuse_stats(
+    excuses: Iterable[Excuse], teams: Optional[UbuntuTeamMapping],
+    top: int = 10
+) -> Dict[str, Any]:
+    """Summarize excuses in a single pass.
+
+    Args:
+        excuses (Iterable[Excuse]): The excuses to summarize.
+        teams (UbuntuTeamMapping): The mapping excuses are counted by team
+        with.
+        top (int): How many of the oldest excuses to report.
+
+    Returns:
+        Dict[str, Any]: The number of excuses, the counts by team,
+        component, reason and missing architecture, the share of excuses
+        missing builds on each architecture, the age summary, the counts
+        by age range and the oldest excuses.
+    """
+    default_team = teams.default_team if teams else lambda name: ""
+    total = 0
+    by_team: Counter = Counter()
+    by_component: Counter = Counter()
+    by_reason: Counter = Counter()
+    by_arch: Counter = Counter()
+    ages = []
+    # Oldest excuses first, earlier ones first among equal ages
+    oldest: List[tuple] = []
+
+    for excuse in excuses:
+        team = default_team(excuse.item_name) or NO_TEAM
+        total += 1
+        by_team[team] += 1
+        by_component[excuse.component] += 1
+        by_reason.update(excuse.reasons)
+        by_arch.update(excuse.missing_builds)
+        if excuse.age is not None:
+            ages.append(excuse.age)
+            entry = (excuse.age, -total, excuse, team)
+            if len(oldest) < top:
+                heapq.heappush(oldest, entry)
+            elif top:
+                heapq.heappushpop(oldest, entry)
+
+    ages.sort()
+    oldest.sort(reverse=True)
+    return {
+        "total": total,
+        "teams": sorted_counts(by_team),
+        "components": sorted_counts(by_component),
+        "reasons": sorted_counts(by_reason),
+        "missing_builds": sorted_counts(by_arch),
+        "ftbfs_rates": sorted_rates({
+            arch: count / total for arch, count in by_arch.items()
+        }),
+        "age": age_summary(ages),
+        "age_ranges": age_ranges(ages),
+        "oldest": [oldest_entry(e, team) for _, _, e, team in oldest],
+    }
+
+
+def column_stats(
+    columns: ExcuseColumns, excuses: List[Excuse],
+    mask: Optional["numpy.ndarray"] = None, top: int = 10
+) -> Dict[str, Any]:
+    """Summarize the masked excuses with vectorized column operations.
+
+    Same as excuse_stats() over the selected excuses.
+
+    Args:
+        columns (ExcuseColumns): The excuses as columns.
+        excuses (List[Excuse]): The excuses the columns were built from.
+        mask (numpy.ndarray, optional): The selected excuses, all of them
+        when None.
+        top (int): How many of the oldest excuses to report.
+    """
+    np = excuses_columns.numpy
+    selected = np.ones(columns.size, dtype=bool) if mask is None else mask
+    teams = columns.team.counts(selected)
+    if "" in teams:
+        teams[NO_TEAM] = teams.pop("")
+
+    # Stable sort on decreasing ages keeps earlier excuses first
+    known = np.flatnonzero(selected & columns.has_age)
+    ages = columns.age[known]
+    order = known[np.argsort(-ages, kind="stable")[:top]]
+    team_names = columns.team.names
+
+    return {
+        "total": int(selected.sum()),
+        "teams": sorted_counts(teams),
+        "components": sorted_counts(columns.component.counts(selected)),
+        "reasons": sorted_counts(columns.reasons.counts(selected)),
+        "missing_builds": sorted_counts(
+            columns.missing_builds.counts(selected)),
+        "ftbfs_rates": sorted_rates(columns.ftbfs_rates(selected)),
+        "age": age_summary(np.sort(ages).tolist()),
+        "age_ranges": dict(zip(
+            age_range_labels(AGE_RANGES),
+            columns.age_histogram(AGE_RANGES, selected))),
+        "oldest": [
+            oldest_entry(
+                excuses[i], team_names[columns.team.codes[i]] or NO_TEAM)
+            for i in order.tolist()
+        ],
+    }
+
+
+def render_stats(stats: Dict[str, Any], tablefmt: str) -> str:
+    """Render a summary as a series of tables in a tabulate format"""
+    from tabulate import tabulate
+
+    age = stats["age"]
+    sections = [
+        tabulate(
+            [[stats["total"], *age.values()]],
+            headers=["Excuses", *(name.title() for name in age)],
+            tablefmt=tablefmt),
+    ]
+    for key, header in (
+        ("teams", "Team"),
+        ("components", "Component"),
+        ("reasons", "Reason"),
+    ):
+        if stats[key]:
+            sections.append(tabulate(
+                stats[key].items(), headers=[header, "Excuses"],
+                tablefmt=tablefmt))
+    if stats["missing_builds"]:
+        sections.append(tabulate(
+            [
+                [arch, count, f"{stats['ftbfs_rates'][arch]:.1%}"]
+                for arch, count in stats["missing_builds"].items()
+            ],
+            headers=["Missing Build", "Excuses", "Share"],
+            tablefmt=tablefmt))
+    if any(stats["age_ranges"].values()):
+        sections.append(tabulate(
+            stats["age_ranges"].items(), headers=["Days", "Excuses"],
+            tablefmt=tablefmt))
+    if stats["oldest"]:
+        sections.append(tabulate(
+            [
+                [e["age"], e["item_name"], e["status"], e["team"]]
+                for e in stats["oldest"]
+            ],
+            headers=["Days", "Oldest Packages", "Status", "Team"],
+            tablefmt=tablefmt))
+    return "\n\n".join(sections)
@@ -0,0 +1,401 @@
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from shutil import copyfileobj
+from tempfile import NamedTemporaryFile
+from typing import (
+    TYPE_CHECKING, BinaryIO, Dict, List, Mapping, Optional, Tuple, Type
+)
+
+# requests is imported when the first request is sent, to keep the command
+# line startup fast, and the runs served from a fresh cache offline
+if TYPE_CHECKING:
+    import requests
+
+# Seconds to wait for a connection, and then for each read from the server
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+
+# Failed requests are retried this many times, waiting backoff * 2^n
+# seconds, plus up to jitter seconds, before the n-th retry
+RETRIES = 3
+BACKOFF = 0.5
+JITTER = 0.5
+
+# Server errors worth retrying, the others won't go away by themselves
+RETRY_STATUSES = (500, 502, 503, 504)
+
+# Download progress is reported at most this often, in seconds
+PROGRESS_INTERVAL = 0.5
+
+# How long, in seconds, cached data is used without checking with the server
+# when neither the user nor the server's Cache-Control tell otherwise. The
+# excuses are regenerated every few minutes, the team mapping barely changes
+# during a day
+EXCUSES_MAX_AGE = 300
+TEAMS_MAX_AGE = 24 * 3600
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """How long cached data is used without checking with the server.
+
+    The time of the last check is the modification time of a stamp file
+    kept next to the data, which holds the max-age the server sent along.
+
+    Attributes:
+        max_age (float, optional): Seconds the data stays fresh after a
+        check, overriding the server. When None, the server's Cache-Control
+        max-age is used, or default_max_age when it didn't send one.
+        default_max_age (float): Seconds the data stays fresh otherwise.
+        offline (bool): Never check with the server.
+    """
+
+    max_age: Optional[float] = None
+    default_max_age: float = 0
+    offline: bool = False
+
+    def is_fresh(self, stamp: Path) -> bool:
+        """Whether the data checked at the time of stamp is still fresh"""
+        try:
+            checked = stamp.stat().st_mtime
+            server_max_age = stamp.read_text()
+        except OSError:
+            return False
+        max_age = self.max_age
+        if max_age is None:
+            max_age = (
+                float(server_max_age) if server_max_age
+                else self.default_max_age)
+        return 0 <= time.time() - checked < max_age
+
+
+def server_max_age(headers: Mapping[str, str]) -> Optional[int]:
+    """Return how long the server lets a response be cached, in seconds.
+
+    Responses the server asks to revalidate every time have a max-age of 0.
+    The age of responses served from intermediate caches is deducted.
+    """
+    directives = [
+        directive.strip().lower()
+        for directive in headers.get("Cache-Control", "").split(",")
+    ]
+    if "no-cache" in directives or "no-store" in directives:
+        return 0
+    for directive in directives:
+        name, _, value = directive.partition("=")
+        if name == "max-age" and value.isdigit():
+            age = headers.get("Age", "")
+            return max(int(value) - (int(age) if age.isdigit() else 0), 0)
+    return None
+
+
+def mark_checked(stamp: Path, response: "requests.Response"):
+    """Record that the cached data was just checked with the server"""
+    max_age = server_max_age(response.headers)
+    stamp.write_text("" if max_age is None else str(max_age))
+
+
+@dataclass
+class FetchStats:
+    """What a download cost.
+
+    Attributes:
+        url (str): The downloaded URL
+        status (int): The final HTTP status
+        retries (int): How many times the request was retried
+        size (int): The number of bytes read from the server
+        seconds (float): Time from the request to the end of the body
+    """
+
+    url: str
+    status: int
+    retries: int = 0
+    size: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rate(self) -> float:
+        """Download bandwidth, in bytes per second"""
+        return self.size / self.seconds if self.seconds else 0.0
+
+    def summary(self) -> str:
+        retries = f", {self.retries} retries" if self.retries else ""
+        return (
+            f"{self.url}: {format_size(self.size)} in {self.seconds:.1f}s "
+            f"({format_size(self.rate)}/s{retries})")
+
+
+def format_size(size: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+class ProgressReader:
+    """File-like view of a response body counting the bytes read, and
+    showing the download progress when stderr is a terminal"""
+
+    def __init__(
+        self, raw: BinaryIO, stats: FetchStats, start: float,
+        total: Optional[int] = None
+    ):
+        self.raw = raw
+        self.stats = stats
+        self.start = start
+        self.total = total
+        self.show = sys.stderr.isatty()
+        self.shown = start
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.raw.read(size)
+        self.stats.size += len(data)
+        now = time.perf_counter()
+        self.stats.seconds = now - self.start
+        if self.show and (not data or now - self.shown > PROGRESS_INTERVAL):
+            self.shown = now
+            total = f"/{format_size(self.total)}" if self.total else ""
+            print(
+                f"\r{format_size(self.stats.size)}{total} "
+                f"({format_size(self.stats.rate)}/s)",
+                end="" if data else "\n", file=sys.stderr)
+        return data
+
+    def readable(self) -> bool:
+        return True
+
+    def __getattr__(self, name: str):
+        # close(), release_conn() and the like are the raw response's
+        return getattr(self.raw, name)
+
+
+class Fetcher:
+    """
+    Fetcher is the HTTP client shared by the caches. Its pooled session
+    keeps connections alive between requests to the same host, retries
+    connection failures, timeouts and server errors with a jittered
+    exponential backoff, and records the cost of every download in stats.
+    """
+    def __init__(
+        self, session: Optional["requests.Session"] = None,
+        retries: int = RETRIES, backoff: float = BACKOFF,
+        jitter: float = JITTER, connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT
+    ):
+        self._session = session
+        self.mounted = False
+        self.lock = threading.Lock()
+        self.retries = retries
+        self.backoff = backoff
+        self.jitter = jitter
+        self.timeout = (connect_timeout, read_timeout)
+        self.stats: List[FetchStats] = []
+
+    @property
+    def session(self) -> "requests.Session":
+        """The pooled session, set up when the first request is sent"""
+        with self.lock:
+            if not self.mounted:
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+
+                retry = Retry(
+                    total=self.retries,
+                    backoff_factor=self.backoff,
+                    backoff_jitter=self.jitter,
+                    status_forcelist=RETRY_STATUSES,
+                    allowed_methods=("GET", "HEAD"),
+                    # Hand the last error response over rather than raising
+                    raise_on_status=False)
+                adapter = HTTPAdapter(max_retries=retry)
+                if self._session is None:
+                    self._session = requests.Session()
+                self._session.mount("http://", adapter)
+                self._session.mount("https://", adapter)
+                self.mounted = True
+            return self._session
+
+    def get(
+        self, url: str, headers: Optional[Dict[str, str]] = None
+    ) -> "requests.Response":
+        """Send a GET request, streaming the response body.
+
+        Read the body from response.raw, which counts the downloaded bytes
+        into response.stats, then close the response to hand its connection
+        back to the pool. Requests may be sent from several threads, so the
+        stats of a response are those of response.stats rather than the
+        last ones in stats.
+
+        Raises:
+            requests.RequestException: The server couldn't be reached, even
+            after retrying.
+        """
+        start = time.perf_counter()
+        response = self.session.get(
+            url, timeout=self.timeout, stream=True, headers=headers)
+        retries = response.raw.retries
+        stats = FetchStats(
+            url, response.status_code,
+            len(retries.history) if retries else 0)
+        stats.seconds = time.perf_counter() - start
+        self.stats.append(stats)
+        response.stats = stats
+
+        length = response.headers.get("Content-Length")
+        response.raw = ProgressReader(
+            response.raw, stats, start,
+            int(length) if length and length.isdigit() else None)
+        return response
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+
+    def __enter__(self) -> "Fetcher":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def warn_stale(url: str, path: Path, error: Exception):
+    """Warn that cached data is used because url couldn't be refreshed"""
+    date = datetime.fromtimestamp(path.stat().st_mtime)
+    print(
+        f"Couldn't refresh {url} ({error}), using the data cached on "
+        f"{date:%Y-%m-%d %H:%M}", file=sys.stderr)
+
+
+def download_errors() -> Tuple[Type[BaseException], ...]:
+    """The errors of a download the cached data can stand in for: the
+    server can't be reached or answers an error, or the body is cut short"""
+    import lzma
+
+    import requests
+    import urllib3
+
+    return (
+        requests.RequestException, urllib3.exceptions.HTTPError, EOFError,
+        lzma.LZMAError)
+
+
+class CachedFile:
+    """
+    CachedFile keeps a downloaded file in the cache, along with the ETag and
+    the time of the last check it is revalidated with. It is only downloaded
+    again when the server says it changed, checked once its policy deems it
+    stale, and kept as is when the download fails
+    """
+    def __init__(
+        self, url: str, path: Path, fetcher: Optional[Fetcher] = None,
+        policy: Optional[CachePolicy] = None
+    ):
+        self.url = url
+        self.path = path
+        self.fetcher = Fetcher() if fetcher is None else fetcher
+        self.policy = policy or CachePolicy()
+        self.etag = path.with_name(f"{path.name}.etag")
+        self.checked = path.with_name(f"{path.name}.checked")
+
+    def update(self) -> bool:
+        """
+        Refresh the cached file with a single conditional request: the server
+        answers 304 when the cached version is still current according to
+        its ETag, or its Last-Modified date when it doesn't send ETags.
+        Nothing is sent while the cached version is fresh, or offline.
+
+        Returns:
+            bool: Whether a new version was stored.
+
+        Raises:
+            requests.RequestException: The download failed and nothing is
+            cached.
+            ValueError: The server answered an unexpected status.
+        """
+        if self.policy.offline:
+            return False
+        if self.path.exists() and self.policy.is_fresh(self.checked):
+            return False
+
+        headers = {}
+        if self.path.exists():
+            if self.etag.exists():
+                headers['If-None-Match'] = self.etag.read_text()
+            headers['If-Modified-Since'] = formatdate(
+                self.path.stat().st_mtime, usegmt=True)
+        try:
+            with self.fetcher.get(self.url, headers=headers) as response:
+                if response.status_code == 304:
+                    # Not changed according to ETag/If-Modified-Since
+                    mark_checked(self.checked, response)
+                    return False
+                response.raise_for_status()
+                if response.status_code != 200:
+                    raise ValueError(
+                        'Unexpected HTTP response status '
+                        f'{response.status_code}')
+                print(f"Downloading {self.url}", file=sys.stderr)
+                self.store(response)
+                print(
+                    f"Downloaded {response.stats.summary()}", file=sys.stderr)
+                mark_checked(self.checked, response)
+                return True
+        except download_errors() as e:
+            if not self.path.exists():
+                raise
+            warn_stale(self.url, self.path, e)
+            return False
+
+    def write(self, source: BinaryIO, target: BinaryIO):
+        """Write the downloaded body to the cached file"""
+        copyfileobj(source, target)
+
+    def store(self, response: "requests.Response"):
+        """
+        Store a downloaded file into the cache. The data is written to a
+        temporary file renamed into place once complete, so that concurrent
+        readers never see a partial file, and the ETag is only written once
+        the data is in place
+        """
+        partial = NamedTemporaryFile(
+            dir=self.path.parent, prefix=f".{self.path.name}.",
+            suffix=".partial", delete=False)
+        try:
+            with partial:
+                self.write(response.raw, partial)
+            # Use the server side date for the next If-Modified-Since
+            last_modified = response.headers.get('Last-Modified')
+            if last_modified:
+                mtime = parsedate_to_datetime(last_modified).timestamp()
+                os.utime(partial.name, (mtime, mtime))
+            # What is derived from the cached file is keyed on its ETag, drop
+            # it first so that an interruption can't leave the new data with
+            # the previous ETag
+            self.etag.unlink(missing_ok=True)
+            os.replace(partial.name, self.path)
+        except BaseException:
+            os.unlink(partial.name)
+            raise
+
+        etag = response.headers.get('ETag')
+        if etag:
+            self.etag.write_text(etag)
+
+    def version(self) -> Optional[str]:
+        """
+        Return the validator of the cached file: its ETag, or its
+        modification date when the server doesn't provide ETags
+        """
+        if self.etag.exists():
+            return self.etag.read_text()
+        if self.path.exists():
+            return f"mtime:{self.path.stat().st_mtime_ns}"
+        return None
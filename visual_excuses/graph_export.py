@@ -0,0 +1,114 @@
+import json
+from typing import Any, Callable, Dict, TextIO
+from xml.sax.saxutils import escape, quoteattr
+
+from visual_excuses.excuses_graph import ExcusesGraph
+
+# Formats the excuses graph can be written in. HTML is drawn by pyvis, the
+# other formats are written straight from the graph for further analysis
+GRAPH_FORMATS = ("html", "json", "graphml", "dot")
+
+# Node attributes kept in GraphML, with their GraphML type
+GRAPHML_KEYS = {
+    "label": "string",
+    "title": "string",
+    "color": "string",
+    "shape": "string",
+    "size": "int",
+    "value": "int",
+}
+
+# Graphviz has no "dot" shape, the closest one to the vis.js dots
+DOT_SHAPES = {"dot": "ellipse", "box": "box"}
+
+
+def write_graph_json(graph: ExcusesGraph, out: TextIO):
+    """Write the graph in the node-link JSON format, one node and edge at a
+    time.
+
+    The edges are under the "edges" key, which networkx.node_link_graph()
+    reads by default since NetworkX 3.6. Older versions need to be told
+    with edges="edges" (3.4 and 3.5) or link="edges" (before 3.4).
+    """
+    encode = json.JSONEncoder().encode
+    out.write('{"directed": true, "multigraph": false, "graph": {},\n')
+    out.write(' "nodes": [')
+    for index, node in enumerate(graph.nodes.values()):
+        out.write(",\n  " if index else "\n  ")
+        out.write(encode(node))
+    out.write('],\n "edges": [')
+    for index, (source, target) in enumerate(graph.edges):
+        out.write(",\n  " if index else "\n  ")
+        out.write(encode({"source": source, "target": target}))
+    out.write("]}\n")
+
+
+def write_graphml(graph: ExcusesGraph, out: TextIO):
+    """Write the graph as GraphML, one node and edge at a time"""
+    out.write(
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+    for key, kind in GRAPHML_KEYS.items():
+        out.write(
+            f'  <key id="{key}" for="node" attr.name="{key}" '
+            f'attr.type="{kind}"/>\n')
+    out.write('  <graph id="excuses" edgedefault="directed">\n')
+    for node_id, node in graph.nodes.items():
+        out.write(f"    <node id={quoteattr(node_id)}>")
+        for key in GRAPHML_KEYS:
+            if key in node:
+                value = escape(str(node[key]))
+                out.write(f'<data key="{key}">{value}</data>')
+        out.write("</node>\n")
+    for source, target in graph.edges:
+        out.write(
+            f"    <edge source={quoteattr(source)} "
+            f"target={quoteattr(target)}/>\n")
+    out.write("  </graph>\n</graphml>\n")
+
+
+def dot_id(value: Any) -> str:
+    """Quote a Graphviz identifier"""
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return '"' + text.replace("\n", "\\n") + '"'
+
+
+def write_dot(graph: ExcusesGraph, out: TextIO):
+    """Write the graph in the Graphviz DOT language, one node and edge at a
+    time"""
+    out.write("digraph excuses {\n")
+    out.write("  node [style=filled];\n")
+    for node_id, node in graph.nodes.items():
+        attributes = {
+            "label": node.get("label", node_id),
+            "shape": DOT_SHAPES.get(node.get("shape"), "ellipse"),
+            "fillcolor": node.get("color"),
+            "tooltip": node.get("title"),
+        }
+        out.write(f"  {dot_id(node_id)} [")
+        out.write(", ".join(
+            f"{name}={dot_id(value)}"
+            for name, value in attributes.items() if value is not None
+        ))
+        out.write("];\n")
+    for source, target in graph.edges:
+        out.write(f"  {dot_id(source)} -> {dot_id(target)};\n")
+    out.write("}\n")
+
+
+GRAPH_WRITERS: Dict[str, Callable[[ExcusesGraph, TextIO], None]] = {
+    "json": write_graph_json,
+    "graphml": write_graphml,
+    "dot": write_dot,
+}
+
+
+def write_graph(graph: ExcusesGraph, out: TextIO, fmt: str):
+    """Write the graph in one of the GRAPH_FORMATS other than html.
+
+    Args:
+        graph (ExcusesGraph): The graph to write.
+        out (TextIO): Where to write it.
+        fmt (str): "json", "graphml" or "dot".
+    """
+    GRAPH_WRITERS[fmt](graph, out)
@@ -1,175 +1,202 @@
+import json
+from pathlib import Path
+from string import Template
+
 from pyvis.network import Network
 from visual_excuses.excuse import Excuse
+from visual_excuses.excuses_graph import (
+    CLUSTER_EXCUSES, PHYSICS_NODES, ExcuseCluster, ExcusesGraph,
+    build_excuses_graph, build_overview_graph, cluster_excuses
+)
 from visual_excuses.ubuntu_teams import UbuntuTeamMapping
 
-from typing import List
-
-EXCUSE_REASON_COLORS = {
-    "default": "#FFFFFF",
-    "unknown": "#FFFFFF",
-    "autopkgtest": "#d4713b",
-    "autopkgtest-depends": "#DBBF60",
-    "missing-builds": "#CD6155",
-    "depends": "#FAD7A0",
-    "candidate": "#41AF25",
-    "waiting": "#7C7B7B"
-}
-
-
-def lp_pkg_link(pkg: str) -> str:
-    return f"<a href=https://pad.lv/u/{pkg}>{pkg} </a>"
-
-
-def lp_bug_link(bug: str) -> str:
-    return f"<a href=https://bugs.launchpad.net/bugs/{bug}>{bug}</a>"
-
-
-def html_title(excuse: Excuse) -> str:
-    """ libsepol (3.7-1 to 3.8-1) in proposed for 48 days """
-    title = lp_pkg_link(excuse.item_name)
-    usource = "https://launchpad.net/ubuntu/+source/" + excuse.item_name + "/"
-    old = f"<a href={usource}{excuse.old_version}>{excuse.old_version}</a>"
-    new = f"<a href={usource}{excuse.new_version}>{excuse.new_version}</a>"
-    day = "days" if excuse.age > 1 else "day"
-    title += f"({old} to {new}) in proposed for {excuse.age} {day}"
-
-    return title
-
-
-def visual_pyvis_excuses(excuses: List[Excuse], teams: UbuntuTeamMapping):
-    if not excuses:
-        return
-
-    # Creating the Node network
-    visual_excuses = Network(
+from typing import Any, Dict, List, Optional
+
+GRAPH_FILE = "excuses.html"
+
+# Expands a cluster node clicked on with the nodes and edges of its data
+# file. The files are loaded by adding a script element rather than fetched,
+# which browsers forbid on pages opened from the file system
+EXPAND_SCRIPT = Template("""
+<script type="text/javascript">
+var visualExcuses = (function () {
+    var files = $files;
+    var physicsNodes = $physics_nodes;
+    var requested = {};
+
+    network.on("click", function (params) {
+        params.nodes.forEach(function (id) {
+            if (files.hasOwnProperty(id) && !requested[id]) {
+                requested[id] = true;
+                var script = document.createElement("script");
+                script.src = files[id];
+                document.body.appendChild(script);
+            }
+        });
+    });
+
+    function expand(data) {
+        // Lay the new nodes out in a circle where the cluster was
+        var center = network.getPositions([data.cluster])[data.cluster];
+        var added = data.members.concat(data.related.filter(function (node) {
+            return nodes.get(node.id) === null;
+        }));
+        var radius = 30 * Math.sqrt(added.length);
+        added.forEach(function (node, index) {
+            var angle = 2 * Math.PI * index / added.length;
+            if (center && nodes.get(node.id) === null) {
+                node.x = center.x + radius * Math.cos(angle);
+                node.y = center.y + radius * Math.sin(angle);
+            }
+        });
+
+        edges.remove(network.getConnectedEdges(data.cluster));
+        nodes.remove(data.cluster);
+        nodes.update(added);
+        edges.update(data.edges);
+        if (nodes.length > physicsNodes) {
+            network.setOptions({physics: {enabled: false}});
+        }
+    }
+
+    return {expand: expand};
+})();
+</script>
+""")
+
+
+class ExcusesNetwork(Network):
+    """pyvis Network appending a script to the generated page"""
+
+    script = ""
+
+    def generate_html(self, *args, **kwargs) -> str:
+        html = super().generate_html(*args, **kwargs)
+        if self.script:
+            head, body, tail = html.rpartition("</body>")
+            html = self.html = head + self.script + body + tail
+        return html
+
+
+def pyvis_network(
+    graph: ExcusesGraph, cdn_resources: str = "local"
+) -> ExcusesNetwork:
+    """Hand a fully built graph over to pyvis.
+
+    Network.add_node() and add_edge() check for existing nodes by scanning
+    lists, which is quadratic on large graphs. The graph is already
+    deduplicated, so its nodes and edges are assigned in one go instead.
+    """
+    network = ExcusesNetwork(
         height="100vh",
         width="100vw",
         directed=True,
-        filter_menu=True)
-
-    # Creating teams Node, we will only display team with packages in proposed
-    active_teams = set(
-        [teams.default_team(excuse.item_name) for excuse in excuses]
-    )
-
-    for team in active_teams:
-        if team:
-            visual_excuses.add_node(
-                team,
-                title=team,
-                color="#8B8985",
-                size=20,
-                shape='box')
-
-    # Creating excuses Nodes
-    for excuse in excuses:
-        reason = "default"
-        current = excuse.item_name
-
-        # details will contain all the information we need to display
-        details = html_title(excuse)
-
-        # If there's an excuse bug, we display the excuse bug
-        if excuse.excuse_bug:
-            bug = excuse.excuse_bug[5:]
-            details += f"<br/> - Excuses bug: #{lp_bug_link(bug)}"
-
-        # If the excuse has missing builds, we display them
-        if excuse.ftbfs():
-            # TODO if missing-builgs is empty here it means missing on all arch
-            details += f"<br/> - Missing builds : {excuse.missing_builds}"
-            reason = "missing-builds"
-
-        # If there's autopkgtest failures we will collect and add them later
-        autopkg_failures = []
-        if "autopkgtest" in excuse.reasons:
-            for errors in excuse.excuses:
-                if errors.startswith("autopkgtest") and "Regression" in errors:
-                    autopkg = errors[errors.index("for")+4:errors.index("/")]
-                    autopkg_failures.append([autopkg, errors])
-
-        # If there's autopkgtest failures
-        if autopkg_failures:
-            details += "<br/> - Autopkgtest Regressions"
-            reason = "autopkgtest-depends"
-
-        if not excuse.reasons:
-            details += "<br/> - <b>candidate</b>"
-            reason = "candidate"
-
-        if "autopkgtest" in excuse.reasons:
-            if "Waiting for test results" in excuse.excuses[0]:
-                details += "<br/> - Autopkgtests In Progress"
-                reason = "waiting"
-
-        # By now if the reason is still default, that means we are likely
-        # facing packages blocked by another package, or that need to migrate
-        # after another package or that have a block-bugs
-        depends = []
-        if excuse.blocked_by:
-            reason = "depends"
-            details += f"<br/> - is blocked by {excuse.blocked_by}"
-            depends.append(excuse.blocked_by)
-
-        if excuse.migrate_after:
-            reason = "depends"
-            for pkg in excuse.migrate_after:
-                details += f"<br/> - requires {pkg} to migrate"
-                depends.append(pkg)
-
-        # If there's an excuse bug, we display the excuse bug
-        if excuse.block_bug:
-            bug = excuse.block_bug[5:]
-            details += f"<br/> - Block bug: #{lp_bug_link(bug)}"
-
-        # Add the excuse to the graph
-        # The Node might have already been created as a depends
-        if current in visual_excuses.get_nodes():
-            visual_excuses.get_node(current)['title'] = details
-            visual_excuses.get_node(
-                current
-                )['color'] = EXCUSE_REASON_COLORS[reason]
-        else:
-            visual_excuses.add_node(
-                current,
-                label=current,
-                color=EXCUSE_REASON_COLORS[reason],
-                title=details
-            )
-
-        # Link the excuse to the team appropriate team
-        if teams.default_team(current):
-            visual_excuses.add_edge(teams.default_team(current), current)
-
-        # If there's autopkgtest failure we will add them as well
-        for failure in autopkg_failures:
-            pkg = failure[0]
-            errors = failure[1]
-            reason = "autopkgtest"
-            if pkg not in visual_excuses.get_nodes():
-                visual_excuses.add_node(
-                    pkg,
-                    label=pkg,
-                    color=EXCUSE_REASON_COLORS[reason],
-                    title=errors
-                )
-                # We connect current package with its failed autopkgtest
-                visual_excuses.add_edge(current, pkg)
-            else:
-                visual_excuses.get_node(pkg)['title'] += f"<br/>{errors}"
-                visual_excuses.get_node(
-                    pkg
-                    )['color'] = EXCUSE_REASON_COLORS[reason]
-
-        # Creating link to depends
-        for dep_package in depends:
-            if dep_package not in visual_excuses.get_nodes():
-                visual_excuses.add_node(
-                    dep_package,
-                    label=dep_package,
-                    color=EXCUSE_REASON_COLORS["default"],
-                    title="Unknown"
-                )
-            visual_excuses.add_edge(current, dep_package)
-
-    visual_excuses.show("excuses.html", notebook=False)
+        filter_menu=True,
+        cdn_resources=cdn_resources)
+
+    network.node_map = graph.nodes
+    network.node_ids = list(graph.nodes)
+    network.nodes = list(graph.nodes.values())
+    network.edges = [
+        {"from": source, "to": target, "arrows": "to"}
+        for source, target in graph.edges
+    ]
+    if len(graph.nodes) > PHYSICS_NODES:
+        network.toggle_physics(False)
+    return network
+
+
+def cluster_data(cluster: ExcuseCluster, teams: UbuntuTeamMapping) -> str:
+    """Render the script expanding a cluster node into its excuses.
+
+    The excuses of the cluster replace any node already drawn for them, while
+    their teams, autopkgtests and dependencies are only added when missing.
+    """
+    graph = build_excuses_graph(cluster.excuses, teams)
+    own = {excuse.item_name for excuse in cluster.excuses}
+    data: Dict[str, Any] = {
+        "cluster": cluster.node_id,
+        "members": [node for id, node in graph.nodes.items() if id in own],
+        "related": [
+            node for id, node in graph.nodes.items() if id not in own
+        ],
+        # Edge ids deduplicate the edges shared by several clusters
+        "edges": [
+            {"id": f"{source}>{target}", "from": source, "to": target,
+             "arrows": "to"}
+            for source, target in graph.edges
+        ],
+    }
+    return f"visualExcuses.expand({json.dumps(data)});\n"
+
+
+def clustered_network(
+    excuses: List[Excuse], teams: UbuntuTeamMapping, path: Path,
+    cdn_resources: str = "local"
+) -> ExcusesNetwork:
+    """Build the level-of-detail network of the excuses.
+
+    The network only holds teams and a cluster node per team and status.
+    The excuses of each cluster are written to a data file in a directory
+    next to path, loaded when the cluster is clicked on. The data files of
+    previous runs are removed first.
+
+    Args:
+        excuses (List[Excuse]): The excuses to graph.
+        teams (UbuntuTeamMapping): Mapping of the excuses to their team.
+        path (Path): Where the page of the network will be written.
+    """
+    clusters = cluster_excuses(excuses, teams)
+    data_dir = path.with_name(f"{path.stem}_files")
+    data_dir.mkdir(exist_ok=True)
+    for stale in data_dir.glob("cluster-*.js"):
+        stale.unlink()
+
+    files = {}
+    for index, cluster in enumerate(clusters.values()):
+        data = data_dir / f"cluster-{index}.js"
+        data.write_text(cluster_data(cluster, teams))
+        files[cluster.node_id] = f"{data_dir.name}/{data.name}"
+
+    network = pyvis_network(
+        build_overview_graph(clusters.values()), cdn_resources)
+    network.script = EXPAND_SCRIPT.substitute(
+        files=json.dumps(files), physics_nodes=PHYSICS_NODES)
+    return network
+
+
+def visual_pyvis_excuses(
+    excuses: List[Excuse], teams: UbuntuTeamMapping, detail: str = "auto",
+    path: Optional[Path] = None
+):
+    """Draw the excuses graph as an HTML page.
+
+    Args:
+        excuses (List[Excuse]): The excuses to graph.
+        teams (UbuntuTeamMapping): Mapping of the excuses to their team.
+        detail (str): "full" to draw every package, "clusters" to draw
+        clusters of packages by team and status, and "auto" to only cluster
+        more than CLUSTER_EXCUSES packages.
+        path (Path, optional): Where to write the page. By default, it is
+        written to GRAPH_FILE and opened in a browser. Pages written
+        elsewhere embed the JavaScript libraries they use rather than
+        loading them from a lib directory in the current one.
+    """
+    if not excuses:
+        return
+
+    cdn_resources = "local" if path is None else "in_line"
+    target = Path(GRAPH_FILE) if path is None else path
+    if detail == "clusters" or (
+        detail == "auto" and len(excuses) > CLUSTER_EXCUSES
+    ):
+        visual_excuses = clustered_network(
+            excuses, teams, target, cdn_resources)
+    else:
+        visual_excuses = pyvis_network(
+            build_excuses_graph(excuses, teams), cdn_resources)
+
+    if path is None:
+        visual_excuses.show(GRAPH_FILE, notebook=False)
+    else:
+        visual_excuses.write_html(str(path))
@@ -0,0 +1,70 @@
+import os
+import pickle
+import sys
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Any, Optional
+
+# Bump whenever the layout of the pickled objects changes (e.g. new Excuse
+# fields) so that older snapshots get rebuilt instead of loaded
+SNAPSHOT_VERSION = 5
+
+
+def write_snapshot(path: Path, key: str, data: Any) -> bool:
+    """Store data as a binary snapshot marked with a validity key.
+
+    The snapshot is written to a temporary file of its own first and renamed
+    into place, so that readers never see a partial snapshot and concurrent
+    writers don't write into each other's file. Snapshots are only a cache:
+    failing to write one is reported rather than raised.
+
+    Args:
+        path (Path): Where to store the snapshot.
+        key (str): The key the snapshot is valid for (e.g. an ETag).
+        data (Any): The picklable data to store.
+
+    Returns:
+        bool: Whether the snapshot was written.
+    """
+    try:
+        partial = NamedTemporaryFile(
+            dir=path.parent, prefix=f".{path.name}.", suffix=".partial",
+            delete=False)
+    except OSError as e:
+        print(f"Couldn't write {path}: {e}", file=sys.stderr)
+        return False
+    try:
+        with partial:
+            pickle.dump(
+                (SNAPSHOT_VERSION, key), partial, pickle.HIGHEST_PROTOCOL)
+            pickle.dump(data, partial, pickle.HIGHEST_PROTOCOL)
+        os.replace(partial.name, path)
+    except OSError as e:
+        os.unlink(partial.name)
+        print(f"Couldn't write {path}: {e}", file=sys.stderr)
+        return False
+    except BaseException:
+        os.unlink(partial.name)
+        raise
+    return True
+
+
+def read_snapshot(path: Path, key: str) -> Optional[Any]:
+    """Load a binary snapshot if it is still valid for the given key.
+
+    Args:
+        path (Path): Where the snapshot is stored.
+        key (str): The key the snapshot must have been written with.
+
+    Returns:
+        Optional[Any]: The snapshot data, or None when the snapshot is
+        missing, outdated or unreadable.
+    """
+    try:
+        with path.open('rb') as source:
+            if pickle.load(source) != (SNAPSHOT_VERSION, key):
+                return None
+            return pickle.load(source)
+    except (OSError, EOFError, ValueError, ImportError, AttributeError,
+            pickle.UnpicklingError):
+        return None
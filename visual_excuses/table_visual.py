@@ -1,71 +1,153 @@
 from visual_excuses.excuse import Excuse
-from typing import List
-from tabulate import tabulate
+from io import StringIO
+from itertools import chain, islice
+from typing import Any, Iterable, Iterator, List, Sequence, TextIO
 
+HEADERS = (
+    "Days",
+    "Package",
+    "Component",
+    "New Version",
+    "FTBFS",
+    "Excuse Bug",
+)
 
-def render_excuses_table(excuses: List[Excuse], args=None) -> str:
-    """Render a list of Excuse objects as a table."""
+# Tables up to this many rows are laid out by tabulate. Larger ones are
+# streamed: tabulate measures every cell before writing anything
+TABULATE_ROWS = 1000
 
-    headers = [
-            "Days",
-            "Package",
-            "Component",
-            "New Version",
-            "FTBFS",
-            "Excuse Bug"]
-    rows = []
+# Maximum width of each column of the streamed fancy tables, longer cells
+# are cut short
+MAX_WIDTHS = (6, 40, 12, 30, 40, 14)
 
-    for e in excuses:
-        ftbfs_str = ""
-        if e.ftbfs():
-            if args and args.missing_builds:
-                ftbfs_str = e.missing_builds
-            else:
-                ftbfs_str = "✅"
-
-        rows.append(
-            [
-                e.age,
-                e.item_name,
-                e.component,
-                e.new_version,
-                ftbfs_str,
-                e.excuse_bug
-            ]
-        )
-
-    return tabulate(rows, headers=headers, tablefmt="fancy_outline")
-
-
-def render_excuses_markdown(excuses: List[Excuse], args=None) -> str:
-    """Render a list of Excuse objects as a Markdown table."""
+# How the FTBFS column marks packages that failed to build, by format
+FTBFS_MARKS = {"table": "✅", "markdown": "yes", "tsv": "yes"}
 
-    headers = [
-            "Days",
-            "Package",
-            "Component",
-            "New Version",
-            "FTBFS",
-            "Excuse Bug"]
-    rows = []
 
+def excuse_rows(
+    excuses: Iterable[Excuse], args=None, ftbfs_mark: str = "yes"
+) -> Iterator[List[Any]]:
+    """Lazily turn excuses into table rows, in the order of HEADERS"""
+    missing_builds = bool(args and args.missing_builds)
     for e in excuses:
-        ftbfs_str = ""
+        ftbfs = ""
         if e.ftbfs():
-            if args and args.missing_builds:
-                ftbfs_str = e.missing_builds
-            else:
-                ftbfs_str = "yes"
-
-        rows.append(
-            [
-                e.age,
-                e.item_name,
-                e.component,
-                e.new_version,
-                ftbfs_str,
-                e.excuse_bug
-            ]
-        )
-
-    return tabulate(rows, headers=headers, tablefmt="github")
+            ftbfs = e.missing_builds if missing_builds else ftbfs_mark
+        yield [
+            e.age,
+            e.item_name,
+            e.component,
+            e.new_version,
+            ftbfs,
+            e.excuse_bug
+        ]
+
+
+def cell_text(value: Any) -> str:
+    """Format a cell like tabulate does"""
+    return "" if value is None else str(value)
+
+
+def fit(text: str, width: int) -> str:
+    """Cut text short to fit in width characters"""
+    return text if len(text) <= width else text[:width - 1] + "…"
+
+
+def write_tsv(rows: Iterable[List[Any]], out: TextIO):
+    """Write rows as tab separated values, one line per row"""
+    out.write("\t".join(HEADERS) + "\n")
+    for row in rows:
+        out.write("\t".join(
+            ",".join(value) if isinstance(value, list)
+            else cell_text(value).replace("\t", " ")
+            for value in row
+        ) + "\n")
+
+
+def write_markdown(rows: Iterable[List[Any]], out: TextIO):
+    """Write rows as a Markdown table without aligning the columns"""
+    out.write("| " + " | ".join(HEADERS) + " |\n")
+    out.write("|---:|" + "---|" * (len(HEADERS) - 1) + "\n")
+    for row in rows:
+        out.write("| " + " | ".join(
+            cell_text(value).replace("|", "\\|") for value in row
+        ) + " |\n")
+
+
+def write_fancy(
+    rows: Iterable[List[Any]], out: TextIO, widths: Sequence[int]
+):
+    """Write rows as a fancy_outline table with fixed column widths"""
+    def line(left, fill, middle, right):
+        return left + middle.join(fill * (w + 2) for w in widths) + right
+
+    def cells(values, numeric):
+        return "│ " + " │ ".join(
+            fit(value, width).rjust(width) if numeric[i]
+            else fit(value, width).ljust(width)
+            for i, (value, width) in enumerate(zip(values, widths))
+        ) + " │\n"
+
+    # Only the Days column is numeric, and right aligned like in tabulate
+    numeric = [i == 0 for i in range(len(HEADERS))]
+    out.write(line("╒", "═", "╤", "╕") + "\n")
+    out.write(cells(HEADERS, numeric))
+    out.write(line("╞", "═", "╪", "╡") + "\n")
+    for row in rows:
+        out.write(cells([cell_text(value) for value in row], numeric))
+    out.write(line("╘", "═", "╧", "╛") + "\n")
+
+
+def sampled_widths(rows: Iterable[List[Any]]) -> List[int]:
+    """Size the columns of the streamed fancy tables on a sample of rows"""
+    widths = [len(header) for header in HEADERS]
+    for row in rows:
+        for i, value in enumerate(row):
+            widths[i] = max(widths[i], len(cell_text(value)))
+    return [min(width, limit) for width, limit in zip(widths, MAX_WIDTHS)]
+
+
+def write_excuses(
+    excuses: Iterable[Excuse], out: TextIO, args=None, fmt: str = "table"
+):
+    """Write excuses as a table, rendering rows as the excuses arrive.
+
+    Tables of up to TABULATE_ROWS excuses are laid out by tabulate. Larger
+    ones are streamed in constant memory: Markdown without aligned columns,
+    and fancy tables with column widths sampled on the first rows.
+
+    Args:
+        excuses (Iterable[Excuse]): The excuses to write.
+        out (TextIO): Where to write them.
+        args: The parsed ExcusesParser arguments, if any.
+        fmt (str): "table", "markdown" or "tsv".
+    """
+    rows = excuse_rows(excuses, args, FTBFS_MARKS[fmt])
+    if fmt == "tsv":
+        write_tsv(rows, out)
+        return
+
+    head = list(islice(rows, TABULATE_ROWS + 1))
+    if len(head) <= TABULATE_ROWS:
+        # tabulate is slow to import, only do so when it's used
+        from tabulate import tabulate
+        tablefmt = "github" if fmt == "markdown" else "fancy_outline"
+        out.write(tabulate(head, headers=HEADERS, tablefmt=tablefmt) + "\n")
+    elif fmt == "markdown":
+        write_markdown(chain(head, rows), out)
+    else:
+        write_fancy(chain(head, rows), out, sampled_widths(head))
+
+
+def render_excuses_table(excuses: Iterable[Excuse], args=None) -> str:
+    """Render a list of Excuse objects as a table."""
+    out = StringIO()
+    write_excuses(excuses, out, args, "table")
+    return out.getvalue()[:-1]
+
+
+def render_excuses_markdown(excuses: Iterable[Excuse], args=None) -> str:
+    """Render a list of Excuse objects as a Markdown table."""
+    out = StringIO()
+    write_excuses(excuses, out, args, "markdown")
+    return out.getvalue()[:-1]
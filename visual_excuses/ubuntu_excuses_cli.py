@@ -1,10 +1,12 @@
 # ubuntu-excuses: simple command line tool allowing to manipulate current list
 # of packages stuck in the proposed pocket and not migrating to Ubuntu Devel
 
-from visual_excuses.ubuntu_excuses_loader import load_ubuntu_excuses
-from visual_excuses.table_visual import render_excuses_table
+import sys
+
+from visual_excuses.config import cache_policies
+from visual_excuses.ubuntu_excuses_loader import load_ubuntu_data
+from visual_excuses.table_visual import write_excuses
 from visual_excuses.excuses_parser import ExcusesParser
-from visual_excuses.ubuntu_teams import UbuntuTeamMapping
 from visual_excuses.excuses_filter import filter_excuses
 
 
@@ -13,12 +15,19 @@ def main():
     parser = ExcusesParser()
     args = parser.parse_args()
 
-    excuses = load_ubuntu_excuses(cache_dir=args.cache_dir)
-    ubuntu_teams = UbuntuTeamMapping(cache_dir=args.cache_dir)
+    try:
+        excuses_policy, teams_policy = cache_policies(
+            args.config, args.max_staleness, args.offline)
+    except ValueError as e:
+        parser.parser.error(str(e))
+
+    excuses, ubuntu_teams = load_ubuntu_data(
+        cache_dir=args.cache_dir, cache_format=args.cache_format,
+        excuses_policy=excuses_policy, teams_policy=teams_policy)
 
     excuses = filter_excuses(excuses, args, ubuntu_teams)
     if excuses:
-        print(render_excuses_table(excuses, args))
+        write_excuses(excuses, sys.stdout, args)
 
 
 if __name__ == "__main__":
@@ -1,86 +1,176 @@
 import sys
+import gzip
 import lzma
+from contextlib import nullcontext
 from pathlib import Path
-from typing import List, Optional
-from email.utils import formatdate
+from typing import BinaryIO, List, Optional, Tuple
 from shutil import copyfileobj
 
-import requests
-
-from .const import DEFAULT_CACHE_DIR, UBUNTU_EXCUSES_URL
+from .const import (
+    DEFAULT_CACHE_DIR, UBUNTU_EXCUSES_URL, UBUNTU_TEAMS_MAPPING_URL
+)
 from .excuse import Excuse
-from .yaml_parser import load_excuses
+from .excuse_collection import ExcuseCollection
+from .fetch import EXCUSES_MAX_AGE, CachedFile, CachePolicy, Fetcher
+from .snapshot import read_snapshot, write_snapshot
+from .ubuntu_teams import UbuntuTeamMapping
+
+# How the downloaded excuses are kept in the cache: decompressed, as
+# downloaded, or recompressed with a codec faster to decompress than xz
+CACHE_FORMATS = {
+    "yaml": "excuse.yaml",
+    "xz": "excuse.yaml.xz",
+    "gzip": "excuse.yaml.gz",
+}
 
 
-class CachedExcuses:
+class CachedExcuses(CachedFile):
     """
     CachedExcuses will facilitae the download, decompression and storage for
     the Ubuntu Excuses file.
     CachedExcuses will only download new excuses if the version in the cached
-    folder is outdated
+    folder is outdated, and only checks it once its policy deems it stale.
+    The excuses are downloaded xz compressed and stored in the cache format
     """
-    def __init__(self, url: str, cache_dir: Path = DEFAULT_CACHE_DIR):
-        self.url = url
+    def __init__(
+        self, url: str, cache_dir: Path = DEFAULT_CACHE_DIR,
+        fetcher: Optional[Fetcher] = None,
+        cache_format: str = "yaml",
+        policy: Optional[CachePolicy] = None
+    ):
         cache_dir.mkdir(parents=True, exist_ok=True)
-        self.etag = cache_dir / "excuse.yaml.etag"
-        self.yaml = cache_dir / "excuse.yaml"
+        super().__init__(
+            url, cache_dir / CACHE_FORMATS[cache_format], fetcher,
+            policy or CachePolicy(default_max_age=EXCUSES_MAX_AGE))
+        self.cache_format = cache_format
+        self.yaml = self.path
+        self.snapshot = cache_dir / "excuse.pickle"
+
+    def write(self, source: BinaryIO, target: BinaryIO):
+        """Write the downloaded xz excuses in the cache format"""
+        if self.cache_format == "xz":
+            copyfileobj(source, target)
+        elif self.cache_format == "gzip":
+            with (
+                lzma.LZMAFile(source) as excuses,
+                gzip.GzipFile(
+                    fileobj=target, mode="wb", compresslevel=1) as compressed
+            ):
+                copyfileobj(excuses, compressed)
+        else:
+            with lzma.LZMAFile(source) as excuses:
+                copyfileobj(excuses, target)
 
-    def update(self):
+    def load_snapshot(self) -> Optional[List[Excuse]]:
         """
-        Check of the local cache need to be updated based on the ETag value
+        Return the parsed excuses stored alongside the cached yaml, provided
+        they were parsed from the currently cached version
         """
-        headers = {}
-        if self.etag.exists() and self.yaml.exists():
-            headers['If-None-Match'] = self.etag.read_text()
-            headers['If-Modified-Since'] = formatdate(
-                self.yaml.stat().st_mtime, usegmt=True)
-        response = requests.head(self.url, timeout=10, headers=headers)
-        try:
-            response.raise_for_status()
-        except requests.exceptions.HTTPError as e:
-            print(
-                "Error accessing excuses yaml data from server: "
-                f"{e.response.status_code} - {e.response.reason}",
-                file=sys.stderr)
-            return
-
-        if response.status_code == 200:
-            if response.headers['ETag'] != headers.get('If-None-Match', ''):
-                print(f"Downloading {self.url}", file=sys.stderr)
-                response = requests.get(
-                    self.url, timeout=10, stream=True, headers=headers)
-                response.raise_for_status()
-                with (
-                    lzma.LZMAFile(response.raw) as source,
-                    self.yaml.open('wb') as target
-                ):
-                    copyfileobj(source, target)
-                self.etag.write_text(response.headers['ETag'])
-        elif response.status_code == 304:
-            # Not changed according to ETag/If-Modified-Since
-            pass
-        else:
-            raise ValueError(
-                f'Unexpected HTTP response status {response.status_code}')
+        version = self.version()
+        if version is None:
+            return None
+        return read_snapshot(self.snapshot, version)
+
+    def save_snapshot(self, excuses: List[Excuse]):
+        """
+        Store the parsed excuses so that the yaml doesn't need to be parsed
+        again until the cached version changes
+        """
+        version = self.version()
+        if version is not None:
+            write_snapshot(self.snapshot, version, excuses)
 
 
 def load_ubuntu_excuses(
     url: str = UBUNTU_EXCUSES_URL,
-    cache_dir: Optional[Path] = DEFAULT_CACHE_DIR
-) -> List[Excuse]:
+    cache_dir: Optional[Path] = DEFAULT_CACHE_DIR,
+    fetcher: Optional[Fetcher] = None,
+    cache_format: str = "yaml",
+    policy: Optional[CachePolicy] = None
+) -> ExcuseCollection:
     """Fetches Ubuntu excuses YAML and parses it into Excuse objects.
 
     Args:
         url (str, optional): The URL to fetch the excuses file from.
         Defaults to ubuntu_excuses_url.
+        fetcher (Fetcher, optional): HTTP client to reuse.
+        cache_format (str, optional): How to keep the excuses file in the
+        cache, one of CACHE_FORMATS.
+        policy (CachePolicy, optional): When to check the cached excuses
+        with the server.
 
     Returns:
-        List[Excuse]: A list of parsed Excuse objects.
+        ExcuseCollection: The parsed Excuse objects, indexed by name.
     """
-    cache = CachedExcuses(url, cache_dir)
+    cache = CachedExcuses(url, cache_dir, fetcher, cache_format, policy)
     cache.update()
+    return load_cached_excuses(cache)
+
+
+def load_cached_excuses(cache: CachedExcuses) -> ExcuseCollection:
+    """Parses the excuses currently cached, without checking them with the
+    server, from their snapshot when it is up to date.
+
+    Args:
+        cache (CachedExcuses): The cache to read the excuses from.
+
+    Returns:
+        ExcuseCollection: The parsed Excuse objects, indexed by name.
+    """
+    excuses = cache.load_snapshot()
+    if excuses is not None:
+        return ExcuseCollection(excuses)
+
+    # The yaml parser is only imported when the snapshot can't be used, to
+    # keep the command line startup fast
+    from .yaml_parser import load_excuses
     try:
-        return load_excuses(cache.yaml)
+        excuses = load_excuses(cache.yaml)
     except FileNotFoundError:
         print("No excuse data to consume", file=sys.stderr)
-        return []
+        return ExcuseCollection()
+    cache.save_snapshot(excuses)
+    return ExcuseCollection(excuses)
+
+
+def load_ubuntu_data(
+    url: str = UBUNTU_EXCUSES_URL,
+    teams_url: str = UBUNTU_TEAMS_MAPPING_URL,
+    cache_dir: Optional[Path] = DEFAULT_CACHE_DIR,
+    cache_format: str = "yaml",
+    fetcher: Optional[Fetcher] = None,
+    excuses_policy: Optional[CachePolicy] = None,
+    teams_policy: Optional[CachePolicy] = None
+) -> Tuple[ExcuseCollection, UbuntuTeamMapping]:
+    """Fetches the Ubuntu excuses and the team mapping concurrently.
+
+    Both caches are refreshed at the same time over a shared HTTP client,
+    and the team mapping download overlaps with parsing the excuses.
+
+    Args:
+        url (str, optional): The URL to fetch the excuses file from.
+        teams_url (str, optional): The URL to fetch the team mapping from.
+        cache_format (str, optional): How to keep the excuses file in the
+        cache, one of CACHE_FORMATS.
+        fetcher (Fetcher, optional): HTTP client to reuse, a new one is
+        used and closed when omitted.
+        excuses_policy (CachePolicy, optional): When to check the cached
+        excuses with the server.
+        teams_policy (CachePolicy, optional): When to check the cached team
+        mapping with the server.
+
+    Returns:
+        Tuple[ExcuseCollection, UbuntuTeamMapping]: The parsed Excuse
+        objects and the team mapping.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    with (
+        Fetcher() if fetcher is None else nullcontext(fetcher) as fetcher,
+        ThreadPoolExecutor(max_workers=1) as pool
+    ):
+        teams = pool.submit(
+            UbuntuTeamMapping, cache_dir, teams_url, fetcher, teams_policy)
+        excuses = load_ubuntu_excuses(
+            url, cache_dir, fetcher, cache_format, excuses_policy)
+        return excuses, teams.result()
@@ -1,60 +1,103 @@
 import sys
 import json
-import requests
-from typing import List
-from email.utils import formatdate
-from shutil import copyfileobj
+from typing import Dict, List, Optional, Set, Tuple
 from pathlib import Path
 
 from .const import DEFAULT_CACHE_DIR, UBUNTU_TEAMS_MAPPING_URL
+from .fetch import TEAMS_MAX_AGE, CachedFile, CachePolicy, Fetcher
+from .snapshot import read_snapshot, write_snapshot
+
+# Bump whenever the layout of the pickled team index changes, so that older
+# indexes get rebuilt instead of loaded
+TEAMS_INDEX_VERSION = 1
 
 
 class UbuntuTeamMapping:
-    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR):
+    mapping: Dict[str, List[str]]
+    packages: Dict[str, Set[str]]
+    teams: Dict[str, Tuple[str, ...]]
+
+    def __init__(
+        self, cache_dir: Path = DEFAULT_CACHE_DIR,
+        url: str = UBUNTU_TEAMS_MAPPING_URL,
+        fetcher: Optional[Fetcher] = None,
+        policy: Optional[CachePolicy] = None
+    ):
         cache_dir.mkdir(parents=True, exist_ok=True)
-        self.etag = cache_dir / "teams.json.etag"
-        self.data = cache_dir / "teams.json"
+        self.cache = CachedFile(
+            url, cache_dir / "teams.json", fetcher,
+            policy or CachePolicy(default_max_age=TEAMS_MAX_AGE))
+        self.index = cache_dir / "teams.pickle"
         self.update()
 
     def update(self):
         """
-        Check if the local cache requires refreshing
-        """
-        headers = {}
-        if self.etag.exists() and self.data.exists():
-            headers['If-None-Match'] = self.etag.read_text()
-            headers['If-Modified-Since'] = formatdate(
-                self.data.stat().st_mtime, usegmt=True)
-        response = requests.get(
-            UBUNTU_TEAMS_MAPPING_URL, timeout=10, stream=True,
-            headers=headers)
-        response.raise_for_status()
-
-        if response.status_code == 200:
-            print(f"Downloading {UBUNTU_TEAMS_MAPPING_URL}", file=sys.stderr)
-            with self.data.open('wb') as target:
-                copyfileobj(response.raw, target)
-            self.etag.write_text(response.headers['ETag'])
-        elif response.status_code == 304:
-            # Not changed according to ETag/modified date
-            pass
-        else:
-            raise ValueError(
-                f'Unexpected HTTP response status {response.status_code}')
-
-        with self.data.open('r') as source:
-            self.mapping = json.load(source)
+        Check if the local cache requires refreshing, then load the cached
+        mapping. Offline without a cached mapping, the mapping is empty
+        """
+        if self.cache.policy.offline and not self.cache.path.exists():
+            print(
+                f"No team mapping cached in {self.cache.path} to use offline",
+                file=sys.stderr)
+            self.set_mapping({})
+            return
+        self.cache.update()
+        self.load()
+
+    def version(self) -> str:
+        """
+        Return the validator of the cached mapping: its ETag, or its
+        modification date when the server doesn't provide ETags
+        """
+        return self.cache.version()
+
+    def load(self):
+        """
+        Load the cached mapping from its prebuilt index, which is only built
+        again from the JSON mapping once a new version was downloaded
+        """
+        version = f"{TEAMS_INDEX_VERSION}:{self.version()}"
+        index = read_snapshot(self.index, version)
+        if index is not None:
+            self.mapping, self.packages, self.teams = index
+            return
+
+        with self.cache.path.open('r') as source:
+            self.set_mapping(json.load(source))
+        write_snapshot(
+            self.index, version, (self.mapping, self.packages, self.teams))
+
+    @classmethod
+    def from_mapping(cls, mapping: Dict[str, List[str]]):
+        """
+        Build a team mapping from an already loaded team -> packages dict,
+        without going through the cache
+        """
+        team_mapping = cls.__new__(cls)
+        team_mapping.set_mapping(mapping)
+        return team_mapping
+
+    def set_mapping(self, mapping: Dict[str, List[str]]):
+        """
+        Index the team -> packages mapping both ways so that lookups don't
+        need to walk every team
+        """
+        self.mapping = mapping
+        self.packages = {}
+        teams = {}
+        for team, packages in mapping.items():
+            self.packages[team] = set(packages)
+            for package in self.packages[team]:
+                teams.setdefault(package, []).append(team)
+        self.teams = {
+            package: tuple(names) for package, names in teams.items()
+        }
 
     def get_teams(self, package: str) -> List[str]:
         # return teams assigned to a single package
-        teams = []
-        for team, packages in self.mapping.items():
-            if package in packages:
-                teams.append(team)
-
-        return teams
+        return list(self.teams.get(package, ()))
 
     def default_team(self, package: str) -> str:
         # This function will return the first team subscribed
-        teams = self.get_teams(package)
+        teams = self.teams.get(package)
         return teams[0] if teams else ""
@@ -1,24 +1,56 @@
 # visual-excuses: Show the list of excuses, packages stuck in proposed using
 # pyvis visualization
 
-from visual_excuses.ubuntu_excuses_loader import load_ubuntu_excuses
-from visual_excuses.pyvis_visual import visual_pyvis_excuses
+import sys
+from pathlib import Path
+
+from visual_excuses.config import cache_policies
+from visual_excuses.ubuntu_excuses_loader import load_ubuntu_data
+from visual_excuses.excuses_graph import build_excuses_graph
 from visual_excuses.excuses_parser import ExcusesParser
-from visual_excuses.ubuntu_teams import UbuntuTeamMapping
 from visual_excuses.excuses_filter import filter_excuses
+from visual_excuses.graph_export import write_graph
 
 
 def main():
 
-    parser = ExcusesParser()
+    if sys.argv[1:2] == ["serve"]:
+        from visual_excuses.excuses_server import main as serve
+        return serve(sys.argv[2:])
+
+    parser = ExcusesParser(graph=True)
     args = parser.parse_args()
+    if args.graph_format == "html" and args.output == "-":
+        parser.parser.error("html graphs can't be written to stdout")
+
+    try:
+        excuses_policy, teams_policy = cache_policies(
+            args.config, args.max_staleness, args.offline)
+    except ValueError as e:
+        parser.parser.error(str(e))
 
-    excuses = load_ubuntu_excuses(cache_dir=args.cache_dir)
-    ubuntu_teams = UbuntuTeamMapping(cache_dir=args.cache_dir)
+    excuses, ubuntu_teams = load_ubuntu_data(
+        cache_dir=args.cache_dir, cache_format=args.cache_format,
+        excuses_policy=excuses_policy, teams_policy=teams_policy)
 
     excuses = filter_excuses(excuses, args, ubuntu_teams)
-    if excuses:
-        visual_pyvis_excuses(excuses, ubuntu_teams)
+    if not excuses:
+        return
+
+    if args.graph_format == "html":
+        # pyvis is slow to import, only do so when there is a graph to draw
+        from visual_excuses.pyvis_visual import visual_pyvis_excuses
+        visual_pyvis_excuses(
+            excuses, ubuntu_teams, args.graph_detail,
+            Path(args.output) if args.output else None)
+        return
+
+    graph = build_excuses_graph(excuses, ubuntu_teams)
+    if args.output in (None, "-"):
+        write_graph(graph, sys.stdout, args.graph_format)
+    else:
+        with open(args.output, "w") as out:
+            write_graph(graph, out, args.graph_format)
 
 
 if __name__ == "__main__":
@@ -1,66 +1,198 @@
 
+import gzip
+import lzma
+import sys
 import yaml
+from yaml.composer import Composer
+from yaml.events import (
+    DocumentStartEvent, MappingEndEvent, MappingStartEvent, SequenceEndEvent,
+    SequenceStartEvent
+)
 
-from typing import List
-from visual_excuses.excuse import Excuse
+from typing import Iterator, List, TextIO
+from visual_excuses.excuse import Excuse, Regression
+
+
+class _StreamingLoader(yaml.CSafeLoader, Composer):
+    """CSafeLoader able to compose one node at a time.
+
+    The C parser only exposes whole-document composition, so the pure
+    Python Composer is mixed in to build individual nodes from the C event
+    stream.
+    """
+
+    def __init__(self, stream):
+        yaml.CSafeLoader.__init__(self, stream)
+        self.anchors = {}
+
+    def next_value(self):
+        """Compose and construct the next node in the event stream"""
+        return self.construct_document(self.compose_node(None, None))
+
+    def skip_value(self):
+        """Compose the next node in the event stream and discard it"""
+        self.compose_node(None, None)
+
+
+def excuse_from_entry(entry: dict) -> Excuse:
+    """Converts one entry of the 'sources' list into an Excuse object.
+
+    Args:
+        entry (dict): A single parsed entry of update_excuses.yaml
+
+    Returns:
+        Excuse: The corresponding Excuse object.
+    """
+    raw_age = (
+        entry.get('policy_info', {})
+        .get('age', {})
+        .get('current-age')
+    )
+    excuse_bug = ""
+    for key in entry.get(
+            'policy_info', {}).get('update-excuse', {}).keys():
+        if key and key != "verdict":
+            excuse_bug = "LP: #" + key
+    block_bug = ""
+    for key in entry.get('policy_info', {}).get('block-bugs', {}).keys():
+        if key and key != "verdict":
+            block_bug = "LP: #" + key
+
+    # Names, architectures and reason tags repeat across the whole archive
+    intern = sys.intern
+
+    regressions = []
+    autopkgtests = entry.get('policy_info', {}).get('autopkgtest', {})
+    for test, results in autopkgtests.items():
+        # Results are keyed by package/version then architecture, next to
+        # the policy verdict
+        if not isinstance(results, dict):
+            continue
+        package = intern(test.split("/", 1)[0])
+        for arch, result in results.items():
+            if result and result[0] == "REGRESSION":
+                # Only the release of the results page URL, e.g.
+                # .../packages/s/systemd/plucky/amd64, is kept
+                history = result[2] if len(result) > 2 and result[2] else ""
+                release = history.rsplit("/", 2)[-2] if history else ""
+                regressions.append(
+                    Regression(package, intern(arch), intern(release)))
+
+    reasons = tuple(intern(r) for r in entry.get("reason", []))
+    excuses = tuple(entry.get("excuses", []))
+    waiting = (
+        "autopkgtest" in reasons and bool(excuses)
+        and "Waiting for test results" in excuses[0]
+    )
+
+    return Excuse(
+        item_name=intern(entry.get("item-name", "")),
+        component=intern(entry.get("component", "main")),
+        old_version=str(entry.get("old-version", "")),
+        new_version=str(entry.get("new-version", "")),
+        missing_builds=[
+            intern(arch) for arch in
+            entry.get("missing-builds", {}).get("on-architectures", [])
+        ],
+        reasons=reasons,
+        age=int(raw_age) if raw_age is not None else 0,
+        excuse_bug=excuse_bug,
+        blocked_by=(
+            intern(entry.get("dependencies", {}).get("blocked-by", [])[0])
+            if entry.get("dependencies", {}).get("blocked-by")
+            else ""
+        ),
+        block_bug=block_bug,
+        migrate_after=tuple(
+            intern(pkg) for pkg in
+            entry.get('dependencies', {}).get('migrate-after', [])
+        ),
+        excuses=excuses,
+        regressions=tuple(regressions),
+        waiting=waiting,
+        source=intern(entry.get("source", ""))
+    )
+
+
+def open_excuses(file_path: str) -> TextIO:
+    """Opens an excuses YAML file, decompressing it on the fly if needed.
+
+    Args:
+        file_path (str): Path to the YAML file, optionally compressed with
+        xz (.xz) or gzip (.gz).
+
+    Returns:
+        TextIO: The YAML text stream.
+    """
+    name = str(file_path)
+    if name.endswith(".xz"):
+        return lzma.open(file_path, "rt")
+    if name.endswith(".gz"):
+        return gzip.open(file_path, "rt")
+    return open(file_path, "r")
+
+
+def iter_excuses(file_path: str) -> Iterator[Excuse]:
+    """Lazily yields Excuse objects from a YAML file.
+
+    Only one entry of the 'sources' list is held in memory at a time, so
+    excuses can be consumed before the whole file has been read.
+
+    Args:
+        file_path (str): Path to the YAML file, optionally compressed.
+
+    Yields:
+        Excuse: The parsed Excuse objects, in file order.
+
+    Raises:
+    yaml.YAMLError: If the file is not valid YAML.
+    ValueError: If 'sources' key is missing or not a list.
+    """
+    with open_excuses(file_path) as file:
+        loader = _StreamingLoader(file)
+        try:
+            # Stream start, document start, then the top level mapping
+            loader.get_event()
+            if not loader.check_event(DocumentStartEvent):
+                raise ValueError(f"{file_path} holds no excuses document")
+            loader.get_event()
+            if not loader.check_event(MappingStartEvent):
+                raise ValueError(f"{file_path} is not an excuses mapping")
+            loader.get_event()
+
+            sources = False
+            while not loader.check_event(MappingEndEvent):
+                key = loader.next_value()
+                if key != "sources":
+                    loader.skip_value()
+                    continue
+                if not loader.check_event(SequenceStartEvent):
+                    raise ValueError(
+                        f"The 'sources' of {file_path} are not a list")
+
+                sources = True
+                loader.get_event()
+                while not loader.check_event(SequenceEndEvent):
+                    yield excuse_from_entry(loader.next_value())
+                loader.get_event()
+
+            if not sources:
+                raise ValueError(f"{file_path} has no 'sources' key")
+        finally:
+            loader.dispose()
 
 
 def load_excuses(file_path: str) -> List[Excuse]:
     """Loads excuses from a YAML file and returns a list of Excuse objects.
 
     Args:
-        file_path (str): Path to the YAML file.
+        file_path (str): Path to the YAML file, optionally compressed.
 
     Returns:
         List[Excuse]: A list of parsed Excuse objects.
 
     Raises:
+    yaml.YAMLError: If the file is not valid YAML.
     ValueError: If 'sources' key is missing or not a list.
     """
-    with open(file_path, "r") as file:
-        data = yaml.load(file, Loader=yaml.CSafeLoader)
-
-    excuses_list = []
-
-    for entry in data["sources"]:
-        raw_age = (
-            entry.get('policy_info', {})
-            .get('age', {})
-            .get('current-age')
-        )
-        excuse_bug = ""
-        for key in entry.get(
-                'policy_info', {}).get('update-excuse', {}).keys():
-            if key and key != "verdict":
-                excuse_bug = "LP: #" + key
-        block_bug = ""
-        for key in entry.get('policy_info', {}).get('block-bugs', {}).keys():
-            if key and key != "verdict":
-                block_bug = "LP: #" + key
-
-        excuses_list.append(
-            Excuse(
-                item_name=entry.get("item-name", ""),
-                component=entry.get("component", "main"),
-                old_version=str(entry.get("old-version", "")),
-                new_version=str(entry.get("new-version", "")),
-                missing_builds=(
-                    entry.get("missing-builds", {}).get("on-architectures", [])
-                ),
-                reasons=entry.get("reason", []),
-                age=int(raw_age) if raw_age is not None else 0,
-                excuse_bug=excuse_bug,
-                blocked_by=(
-                    entry.get("dependencies", {}).get("blocked-by", [])[0]
-                    if entry.get("dependencies", {}).get("blocked-by")
-                    else ""
-                ),
-                block_bug=block_bug,
-                migrate_after=(
-                    entry.get('dependencies', {}).get('migrate-after', [])
-                ),
-                excuses=entry.get("excuses", [])
-            )
-        )
-
-    return excuses_list
+    return list(iter_excuses(file_path))